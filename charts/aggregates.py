@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from member.constants import AGE_GROUP_CHOICES
+from music_videos.models import History
+
+
+def viewer_histories(username):
+    return History.objects.filter(mv_id__username=username, mv_id__is_deleted=False)
+
+
+def count_viewers_by(username, field, histories=None):
+    # 채널의 고유 시청자를 field 기준으로 한 번에 그룹 집계
+    histories = histories if histories is not None else viewer_histories(username)
+    return dict(
+        histories
+        .values(field)
+        .annotate(viewers=Count('username', distinct=True))
+        .values_list(field, 'viewers')
+    )
+
+
+def age_group_expression(current_year=None, field='username__birthday__year'):
+    # Member.get_age_group 과 같은 구간을 DB 에서 계산
+    current_year = current_year or datetime.now().year
+    whens = [
+        When(**{f'{field}__gte': current_year - (index + 1) * 10 - 9}, then=Value(index))
+        for index in range(len(AGE_GROUP_CHOICES) - 1)
+    ]
+    return Case(*whens, default=Value(len(AGE_GROUP_CHOICES) - 1), output_field=IntegerField())
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from member.models import Member
+from charts.audience import rebuild_audience
+from charts.snapshots import rebuild_snapshot
+
+
+class Command(BaseCommand):
+    help = '채널 분석 스냅샷을 MySQL 기준으로 다시 만듭니다. (username 을 생략하면 전체 회원)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='다시 만들 회원의 username')
+        parser.add_argument('--audience', action='store_true', help='고유 시청자 HyperLogLog 도 시청 기록으로 다시 채웁니다.')
+
+    def handle(self, *args, **options):
+        members = Member.objects.all()
+        if options['usernames']:
+            members = members.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for member in members.iterator():
+            if options['audience']:
+                rebuild_audience(member.username)
+            rebuild_snapshot(member)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'rebuilt {rebuilt} chart snapshots'))
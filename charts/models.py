@@ -1,3 +1,17 @@
 from django.db import models
+from music_videos.models import MusicVideo
 
-# Create your models here.
+
+class DailyViewRollup(models.Model):
+    id = models.AutoField(primary_key=True)
+    mv_id = models.ForeignKey(MusicVideo, on_delete=models.CASCADE, db_column='mv_id')
+    day = models.DateField()
+    views = models.IntegerField(default=0)
+    unique_viewers = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mv_id', 'day'], name='unique_daily_view_rollup'),
+        ]
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+import logging
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from config.redis_client import get_redis
+from music_videos.events import VIEW_EVENTS_STREAM
+from music_videos.models import MusicVideo
+from .models import DailyViewRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_CURSOR_KEY = 'charts:rollup:cursor'
+ROLLUP_LOCK_KEY = 'charts:rollup:lock'
+DAILY_VIEWERS_KEY = 'charts:rollup:viewers:{}:{}'
+# 하루가 지난 뒤에도 늦게 도착한 이벤트의 고유 시청자를 구분할 수 있도록 이틀간 보관
+DAILY_VIEWERS_TTL = 2 * 24 * 60 * 60
+ROLLUP_BATCH_SIZE = 10000
+
+INTERVALS = ('day', 'week', 'month')
+
+
+def rollup_view_events():
+    # 스트림에서 마지막 커서 이후의 시청 이벤트를 읽어 (mv_id, day) 단위로 누적한다
+    redis_client = get_redis()
+    lock = redis_client.lock(ROLLUP_LOCK_KEY, timeout=10 * 60)
+    if not lock.acquire(blocking=False):
+        return 0
+    processed = 0
+    try:
+        cursor = redis_client.get(ROLLUP_CURSOR_KEY) or '0-0'
+        while True:
+            response = redis_client.xread({VIEW_EVENTS_STREAM: cursor}, count=ROLLUP_BATCH_SIZE)
+            if not response:
+                break
+            entries = response[0][1]
+            cursor = entries[-1][0]
+            _apply_events(redis_client, entries, cursor)
+            processed += len(entries)
+            if len(entries) < ROLLUP_BATCH_SIZE:
+                break
+    finally:
+        lock.release()
+    if processed:
+        logger.info(f'rolled up {processed} view events')
+    return processed
+
+
+def _apply_events(redis_client, entries, cursor):
+    views = defaultdict(int)
+    viewers = defaultdict(set)
+    for _, fields in entries:
+        viewed_at = datetime.fromtimestamp(float(fields['ts']), tz=dt_timezone.utc)
+        key = (int(fields['mv_id']), timezone.localtime(viewed_at).date())
+        views[key] += 1
+        viewers[key].add(fields['username'])
+
+    existing_mv_ids = set(MusicVideo.all_objects.filter(id__in={mv_id for mv_id, _ in views}).values_list('id', flat=True))
+    keys = [key for key in views if key[0] in existing_mv_ids]
+
+    # 같은 날 이미 집계된 시청자는 제외하고 새 고유 시청자만 더한다
+    # (집합에는 DB 커밋 후에 넣으므로, 실패한 배치를 다시 처리해도 시청자가 이미 센 것으로 보이지 않는다)
+    pairs = [(key, viewer) for key in keys for viewer in viewers[key]]
+    pipe = redis_client.pipeline(transaction=False)
+    for (mv_id, day), viewer in pairs:
+        pipe.sismember(DAILY_VIEWERS_KEY.format(mv_id, day.isoformat()), viewer)
+    new_viewers = defaultdict(int)
+    for (key, _), seen in zip(pairs, pipe.execute()):
+        if not seen:
+            new_viewers[key] += 1
+
+    with transaction.atomic():
+        if keys:
+            current = {
+                (rollup.mv_id_id, rollup.day): rollup
+                for rollup in DailyViewRollup.objects.select_for_update().filter(
+                    mv_id__in={mv_id for mv_id, _ in keys},
+                    day__in={day for _, day in keys},
+                )
+            }
+            rollups = []
+            for mv_id, day in keys:
+                rollup = current.get((mv_id, day)) or DailyViewRollup(mv_id_id=mv_id, day=day)
+                rollup.views += views[(mv_id, day)]
+                rollup.unique_viewers += new_viewers[(mv_id, day)]
+                rollups.append(rollup)
+            DailyViewRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                update_fields=['views', 'unique_viewers', 'updated_at'],
+            )
+        transaction.on_commit(lambda: _commit_batch(redis_client, keys, viewers, cursor))
+
+
+def _commit_batch(redis_client, keys, viewers, cursor):
+    # 집계가 커밋된 배치의 시청자 기록과 커서를 한 번에 옮긴다
+    pipe = redis_client.pipeline(transaction=True)
+    for mv_id, day in keys:
+        viewers_key = DAILY_VIEWERS_KEY.format(mv_id, day.isoformat())
+        pipe.sadd(viewers_key, *viewers[(mv_id, day)])
+        pipe.expire(viewers_key, DAILY_VIEWERS_TTL)
+    pipe.set(ROLLUP_CURSOR_KEY, cursor)
+    pipe.execute()
+
+
+def _bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day, interval):
+    if interval == 'week':
+        return day + timedelta(days=7)
+    if interval == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def build_series(daily_counts, start_date, end_date, interval='day'):
+    # {day: (views, unique_viewers)} 를 구간(day/week/month) 단위의 연속된 시리즈로 변환
+    buckets = defaultdict(lambda: [0, 0])
+    for day, (views, unique_viewers) in daily_counts.items():
+        if start_date <= day <= end_date:
+            bucket = buckets[_bucket_start(day, interval)]
+            bucket[0] += views
+            bucket[1] += unique_viewers
+
+    series = []
+    bucket = _bucket_start(start_date, interval)
+    while bucket <= end_date:
+        views, unique_viewers = buckets.get(bucket, (0, 0))
+        series.append({
+            "daily_views_date": bucket.strftime('%Y-%m-%d'),
+            "daily_views_views": views,
+            "daily_views_unique_viewers": unique_viewers,
+        })
+        bucket = _next_bucket(bucket, interval)
+    return series
+
+
+def get_daily_counts(username, start_date=None, end_date=None):
+    # 집계 테이블을 한 번의 인덱스 범위 조회로 읽는다
+    rollups = DailyViewRollup.objects.filter(mv_id__username=username, mv_id__is_deleted=False)
+    if start_date:
+        rollups = rollups.filter(day__gte=start_date)
+    if end_date:
+        rollups = rollups.filter(day__lte=end_date)
+    return {
+        row['day']: (row['views'], row['unique_viewers'])
+        for row in rollups.values('day').annotate(views=Sum('views'), unique_viewers=Sum('unique_viewers'))
+    }
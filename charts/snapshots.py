@@ -0,0 +1,312 @@
+from datetime import date
+import logging
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+from member.constants import AGE_GROUP_CHOICES
+from member.models import Country
+from music_videos.counters import get_pending_views
+from music_videos.models import MusicVideo
+from .aggregates import age_group_expression, count_viewers_by, viewer_histories
+from .audience import count_segments
+from .rollups import get_daily_counts
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'chart:snapshot:{}'
+SNAPSHOT_MVS_KEY = 'chart:snapshot:{}:mvs'
+SNAPSHOT_VIEWERS_KEY = 'chart:snapshot:{}:viewers'
+SNAPSHOT_SEEN_KEY = 'chart:snapshot:seen:{}:{}'
+# 스냅샷은 주기적으로 새로 만들어 점진 갱신에서 생긴 오차(시청자 프로필 변경 등)를 정리한다
+SNAPSHOT_TTL = 7 * 24 * 60 * 60
+SEEN_TTL = 2 * 24 * 60 * 60
+
+# 스냅샷이 존재할 때만 시청 이벤트를 반영한다 (없으면 다음 조회 때 새로 만든다)
+APPLY_VIEW_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'daily:' .. ARGV[4], 1)
+if redis.call('SADD', KEYS[4], ARGV[2]) == 1 then
+    redis.call('HINCRBY', KEYS[1], 'daily_unique:' .. ARGV[4], 1)
+end
+redis.call('EXPIRE', KEYS[4], ARGV[8])
+if ARGV[3] == '1' then
+    redis.call('HINCRBY', KEYS[1], 'total_views', 1)
+    redis.call('ZINCRBY', KEYS[2], 1, ARGV[1])
+    -- hll 모드에서는 고유 시청자를 조회 시 HyperLogLog 로 센다 (mode 가 없는 이전 스냅샷은 exact)
+    local mode = redis.call('HGET', KEYS[1], 'mode')
+    if (mode == false or mode == 'exact') and redis.call('SADD', KEYS[3], ARGV[2]) == 1 then
+        redis.call('HINCRBY', KEYS[1], 'unique_viewers', 1)
+        for i = 5, 7 do
+            if ARGV[i] ~= '' then
+                redis.call('HINCRBY', KEYS[1], ARGV[i], 1)
+            end
+        end
+        if redis.call('SCARD', KEYS[3]) > tonumber(ARGV[9]) then
+            redis.call('HSET', KEYS[1], 'mode', 'hll')
+            redis.call('DEL', KEYS[3])
+        end
+    end
+end
+return 1
+"""
+
+_scripts = {}
+
+
+def _snapshot_keys(username):
+    return [
+        SNAPSHOT_KEY.format(username),
+        SNAPSHOT_MVS_KEY.format(username),
+        SNAPSHOT_VIEWERS_KEY.format(username),
+    ]
+
+
+def _segment_fields(country_ids):
+    return (['gender:M', 'gender:F']
+            + [f'country:{country_id}' for country_id in country_ids]
+            + [f'age:{index}' for index, _ in AGE_GROUP_CHOICES])
+
+
+def _apply_segment_counts(snapshot, unique_viewers, counts):
+    snapshot['unique_viewers'] = unique_viewers
+    for field, count in counts.items():
+        name, _, key = field.partition(':')
+        if name == 'gender':
+            snapshot['genders'][key] = count
+        elif name == 'country':
+            country_name, _ = snapshot['countries'][int(key)]
+            snapshot['countries'][int(key)] = (country_name, count)
+        elif name == 'age':
+            snapshot['ages'][int(key)] = count
+
+
+def build_snapshot(member, exact=None):
+    # MySQL 에서 헤더와 성별/국가/연령/일별 시리즈를 한 번에 계산한다
+    username = member.username
+    music_videos = list(MusicVideo.objects.filter(username=username).values_list('id', 'subject', 'views'))
+    pending = get_pending_views(mv_id for mv_id, _, _ in music_videos)
+    mv_views = {mv_id: views + pending.get(mv_id, 0) for mv_id, _, views in music_videos}
+    country_names = dict(Country.objects.filter(is_deleted=False).values_list('id', 'name'))
+
+    # 고유 시청자가 한도를 넘는 채널은 시청자 목록 대신 HyperLogLog 추정치를 쓴다
+    if exact is None:
+        unique_viewers, segment_counts = count_segments(username, _segment_fields(country_names))
+        exact = unique_viewers <= settings.CHART_EXACT_VIEWER_LIMIT
+
+    snapshot = {
+        'created_on': member.created_at.date(),
+        'mode': 'exact' if exact else 'hll',
+        'total_mv': len(music_videos),
+        'total_views': sum(mv_views.values()),
+        'mv_views': mv_views,
+        'subjects': {mv_id: subject for mv_id, subject, _ in music_videos},
+        'genders': {},
+        'countries': {country_id: (name, 0) for country_id, name in country_names.items()},
+        'ages': {},
+        'daily': get_daily_counts(username),
+        'viewers': [],
+    }
+    if not exact:
+        _apply_segment_counts(snapshot, unique_viewers, segment_counts)
+        return snapshot
+
+    histories = viewer_histories(username)
+    genders = count_viewers_by(username, 'username__sex', histories)
+    countries = count_viewers_by(username, 'username__country', histories)
+    ages = count_viewers_by(
+        username, 'age_group',
+        histories.filter(username__birthday__isnull=False).annotate(age_group=age_group_expression())
+    )
+    snapshot['viewers'] = list(histories.values_list('username', flat=True).distinct())
+    _apply_segment_counts(snapshot, len(snapshot['viewers']), {
+        **{f'gender:{sex}': count for sex, count in genders.items() if sex},
+        **{f'country:{country_id}': count for country_id, count in countries.items() if country_id in country_names},
+        **{f'age:{index}': count for index, count in ages.items()},
+    })
+    return snapshot
+
+
+def store_snapshot(username, snapshot):
+    fields = {
+        'created_on': snapshot['created_on'].isoformat(),
+        'mode': snapshot['mode'],
+        'total_mv': snapshot['total_mv'],
+        'total_views': snapshot['total_views'],
+        'unique_viewers': snapshot['unique_viewers'],
+    }
+    fields.update({f'subject:{mv_id}': subject for mv_id, subject in snapshot['subjects'].items()})
+    fields.update({f'gender:{sex}': count for sex, count in snapshot['genders'].items()})
+    for country_id, (name, count) in snapshot['countries'].items():
+        fields[f'country:{country_id}'] = count
+        fields[f'country_name:{country_id}'] = name
+    fields.update({f'age:{index}': count for index, count in snapshot['ages'].items()})
+    for day, (views, unique_viewers) in snapshot['daily'].items():
+        fields[f'daily:{day.isoformat()}'] = views
+        fields[f'daily_unique:{day.isoformat()}'] = unique_viewers
+
+    # 임시 키에 만든 뒤 rename 으로 교체해 읽는 쪽이 만들어지는 도중의 스냅샷을 보지 않게 한다
+    redis_client = get_redis()
+    keys = _snapshot_keys(username)
+    temp_keys = [f'{key}:building' for key in keys]
+    built = [(temp_keys[0], keys[0])]
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(*temp_keys)
+    pipe.hset(temp_keys[0], mapping=fields)
+    if snapshot['mv_views']:
+        pipe.zadd(temp_keys[1], snapshot['mv_views'])
+        built.append((temp_keys[1], keys[1]))
+    for i in range(0, len(snapshot['viewers']), 1000):
+        pipe.sadd(temp_keys[2], *snapshot['viewers'][i:i + 1000])
+    if snapshot['viewers']:
+        built.append((temp_keys[2], keys[2]))
+    pipe.execute()
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(*keys)
+    for temp_key, key in built:
+        pipe.rename(temp_key, key)
+        pipe.expire(key, SNAPSHOT_TTL)
+    pipe.execute()
+
+
+def rebuild_snapshot(member):
+    snapshot = build_snapshot(member)
+    store_snapshot(member.username, snapshot)
+    return snapshot
+
+
+def invalidate_snapshot(username):
+    try:
+        get_redis().delete(*_snapshot_keys(username))
+    except RedisError as e:
+        logger.warning(f'chart snapshot invalidation failed: {str(e)}')
+
+
+def _parse_snapshot(fields, mv_views):
+    snapshot = {
+        'created_on': date.fromisoformat(fields['created_on']),
+        'mode': fields.get('mode', 'exact'),
+        'total_mv': int(fields.get('total_mv', 0)),
+        'total_views': int(fields.get('total_views', 0)),
+        'unique_viewers': int(fields.get('unique_viewers', 0)),
+        'mv_views': {int(mv_id): int(views) for mv_id, views in mv_views},
+        'subjects': {},
+        'genders': {},
+        'countries': {},
+        'ages': {},
+        'daily': {},
+    }
+    country_names = {}
+    country_counts = {}
+    daily_views = {}
+    daily_unique = {}
+    for field, value in fields.items():
+        name, _, key = field.partition(':')
+        if name == 'subject':
+            snapshot['subjects'][int(key)] = value
+        elif name == 'gender':
+            snapshot['genders'][key] = int(value)
+        elif name == 'country':
+            country_counts[int(key)] = int(value)
+        elif name == 'country_name':
+            country_names[int(key)] = value
+        elif name == 'age':
+            snapshot['ages'][int(key)] = int(value)
+        elif name == 'daily':
+            daily_views[date.fromisoformat(key)] = int(value)
+        elif name == 'daily_unique':
+            daily_unique[date.fromisoformat(key)] = int(value)
+    snapshot['countries'] = {
+        country_id: (name, country_counts.get(country_id, 0))
+        for country_id, name in country_names.items()
+    }
+    snapshot['daily'] = {
+        day: (views, daily_unique.get(day, 0))
+        for day, views in daily_views.items()
+    }
+    return snapshot
+
+
+def get_snapshot(member):
+    # 대시보드 조회는 Redis 한 번의 왕복으로 끝나고, 스냅샷이 없을 때만 MySQL 에서 만든다
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hgetall(SNAPSHOT_KEY.format(member.username))
+        pipe.zrange(SNAPSHOT_MVS_KEY.format(member.username), 0, -1, withscores=True)
+        fields, mv_views = pipe.execute()
+        if not fields:
+            return rebuild_snapshot(member)
+        snapshot = _parse_snapshot(fields, mv_views)
+        if snapshot['mode'] == 'hll':
+            segments = [field for field in fields if field.startswith(('gender:', 'country:', 'age:'))]
+            _apply_segment_counts(snapshot, *count_segments(member.username, segments))
+        return snapshot
+    except RedisError as e:
+        logger.warning(f'chart snapshot unavailable: {str(e)}')
+        return build_snapshot(member, exact=True)
+
+
+def apply_view(music_video, viewer, first_view):
+    try:
+        if 'apply_view' not in _scripts:
+            _scripts['apply_view'] = get_redis().register_script(APPLY_VIEW_SCRIPT)
+        age_group = viewer.get_age_group()
+        _scripts['apply_view'](
+            keys=_snapshot_keys(music_video.username_id) + [
+                SNAPSHOT_SEEN_KEY.format(music_video.id, date.today().isoformat())
+            ],
+            args=[
+                music_video.id,
+                viewer.username,
+                1 if first_view else 0,
+                date.today().isoformat(),
+                f'gender:{viewer.sex}' if viewer.sex else '',
+                f'country:{viewer.country_id}' if viewer.country_id else '',
+                f'age:{age_group}' if age_group is not None else '',
+                SEEN_TTL,
+                settings.CHART_EXACT_VIEWER_LIMIT,
+            ],
+        )
+    except RedisError as e:
+        logger.warning(f'chart snapshot update failed: {str(e)}')
+
+
+def get_summary(snapshot):
+    popular_mv_subject = ""
+    popular_mv_views = 0
+    for mv_id, views in sorted(snapshot['mv_views'].items()):
+        if views >= popular_mv_views and views != 0:
+            popular_mv_subject = snapshot['subjects'].get(mv_id, "")
+            popular_mv_views = views
+    return {
+        "total_mv": snapshot['total_mv'],
+        "total_views": snapshot['total_views'],
+        "unique_viewers": snapshot['unique_viewers'],
+        "popular_mv_subject": popular_mv_subject or "No views",
+        "popular_mv_views": popular_mv_views,
+    }
+
+
+def get_gender_list(snapshot):
+    return [
+        {'gender_name': 'Male', 'gender_number': snapshot['genders'].get('M', 0)},
+        {'gender_name': 'Female', 'gender_number': snapshot['genders'].get('F', 0)},
+    ]
+
+
+def get_country_list(snapshot):
+    return [
+        {'country_id': country_id, 'country_name': name, 'country_views': count}
+        for country_id, (name, count) in sorted(snapshot['countries'].items())
+    ]
+
+
+def get_age_list(snapshot):
+    return [
+        {'age_group': label, 'age_views': snapshot['ages'].get(index, 0)}
+        for index, label in AGE_GROUP_CHOICES
+    ]
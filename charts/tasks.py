@@ -0,0 +1,8 @@
+from config.celery import app
+
+from .rollups import rollup_view_events
+
+
+@app.task
+def rollup_daily_views():
+    rollup_view_events()
@@ -1,3 +1,71 @@
+from datetime import date
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from charts.snapshots import invalidate_snapshot
+from member.models import Country, Member
+from music_videos.models import History, MusicVideo
+
+
+class ChartQueryCountTest(TestCase):
+    # 차트 API 의 쿼리 수는 뮤직비디오/시청자 수와 관계없이 일정해야 한다
+    endpoints = ('genders', 'countries', 'ages', 'dashboard')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.countries = [Country.objects.create(name=f'country-{index}', code=str(index)) for index in range(3)]
+        self.creator = Member.objects.create(username='chart-creator', email='chart-creator@example.com')
+        invalidate_snapshot(self.creator.username)
+        self.addCleanup(invalidate_snapshot, self.creator.username)
+
+    def add_audience(self, music_videos, viewers):
+        start = Member.objects.count()
+        videos = [
+            MusicVideo.objects.create(
+                username=self.creator, subject=f'chart mv {start}-{index}', lyrics='', tempo='', language='', vocal='',
+                length=0, cover_image='', mv_file='', views=index,
+            )
+            for index in range(music_videos)
+        ]
+        for index in range(start, start + viewers):
+            viewer = Member.objects.create(
+                username=f'chart-viewer-{index}', email=f'chart-viewer-{index}@example.com',
+                sex='MF'[index % 2], country=self.countries[index % len(self.countries)],
+                birthday=date(1960 + index % 50, 1, 1),
+            )
+            History.objects.bulk_create([History(username=viewer, mv_id=video) for video in videos])
+        invalidate_snapshot(self.creator.username)
+
+    def get_chart(self, endpoint):
+        response = self.client.get(f'/api/v1/charts/{self.creator.username}/{endpoint}')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_snapshot_build_query_count_is_fixed(self):
+        # 스냅샷이 없을 때: 회원 1 + 뮤직비디오 1 + 국가 1 + 일별 집계 1 + 성별/국가/연령/시청자 목록 4
+        for music_videos, viewers in ((1, 2), (5, 20)):
+            self.add_audience(music_videos, viewers)
+            for endpoint in self.endpoints:
+                with self.subTest(endpoint=endpoint, viewers=viewers):
+                    invalidate_snapshot(self.creator.username)
+                    with self.assertNumQueries(8):
+                        self.get_chart(endpoint)
+
+    def test_cached_snapshot_needs_only_member_lookup(self):
+        self.add_audience(5, 20)
+        self.get_chart('dashboard')
+        for endpoint in self.endpoints:
+            with self.subTest(endpoint=endpoint):
+                with self.assertNumQueries(1):
+                    self.get_chart(endpoint)
 
-# Create your tests here.
+    def test_summary_counts_viewers_once(self):
+        self.add_audience(3, 4)
+        response = self.get_chart('genders')
+        self.assertEqual(response.data['total_mv'], 3)
+        self.assertEqual(response.data['unique_viewers'], 4)
+        self.assertEqual(
+            response.data['gender_list'],
+            [{'gender_name': 'Male', 'gender_number': 2}, {'gender_name': 'Female', 'gender_number': 2}],
+        )
@@ -10,4 +10,6 @@ urlpatterns = [
     path('/<str:username>/countries', CountryChartView.as_view(),
          name='chart-countries'),
     path('/<str:username>/ages', AgeChartView.as_view(), name='chart-ages'),
+    path('/<str:username>/dashboard', DashboardChartView.as_view(),
+         name='chart-dashboard'),
 ]
\ No newline at end of file
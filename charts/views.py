@@ -2,28 +2,48 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from datetime import timedelta
-
-from django.db.models import Count
-from django.db.models.functions import TruncDate
+from django.utils.http import parse_etags, quote_etag
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
-from oauth.mixins import ApiAuthMixin, PublicApiMixin
+from oauth.mixins import ApiAuthMixin
 
-from member.models import Member, Country
-from music_videos.models import History, MusicVideo
+from member.models import Member
+from .rollups import INTERVALS, build_series
+from .snapshots import get_age_list, get_country_list, get_gender_list, get_snapshot, get_summary
 
 from datetime import datetime
+import hashlib
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _parse_chart_range(request, member):
+    # 조회 구간과 묶음 단위 (기본값: 가입일부터 오늘까지, 일 단위), 잘못된 값이면 (None, None, None)
+    interval = request.query_params.get('interval', 'day')
+    try:
+        start_param = request.query_params.get('start', None)
+        end_param = request.query_params.get('end', None)
+        start_date = datetime.strptime(start_param, '%Y-%m-%d').date() if start_param else member.created_at.date()
+        end_date = datetime.strptime(end_param, '%Y-%m-%d').date() if end_param else datetime.now().date()
+    except ValueError:
+        return None, None, None
+    if interval not in INTERVALS or start_date > end_date:
+        return None, None, None
+    return interval, start_date, end_date
+
 class DailyChartView(ApiAuthMixin, APIView):
     @swagger_auto_schema(
         operation_summary="날짜별 조회수 통계 차트 조회 API",
         operation_description="사용자의 채널을 날짜별 조회수를 통계로 분석할 수 있습니다.",
+        manual_parameters=[
+            openapi.Parameter('interval', openapi.IN_QUERY, description="묶음 단위 (day, week, month / 기본값: day)", type=openapi.TYPE_STRING),
+            openapi.Parameter('start', openapi.IN_QUERY, description="시작일 yyyy-mm-dd (기본값: 가입일)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end', openapi.IN_QUERY, description="종료일 yyyy-mm-dd (기본값: 오늘)", type=openapi.TYPE_STRING),
+        ],
         responses={
             200: openapi.Response(
                 description="날짜별 조회수 통계 차트 조회 성공",
@@ -111,24 +131,23 @@ class DailyChartView(ApiAuthMixin, APIView):
             return Response(response_data, status=404)
 
         member_name = member.nickname
-        music_videos = MusicVideo.objects.filter(username=member)
-
-        start_date = member.created_at.date()
-        end_date = datetime.now().date()
-        date_range = (end_date - start_date).days + 1
-        daily_views = {(start_date + timedelta(days=i)).strftime('%Y-%m-%d'): 0 for i in range(date_range)}
 
-        history_data = (History.objects
-                        .filter(mv_id__in=music_videos)
-                        .annotate(day=TruncDate('created_at'))
-                        .values('day')
-                        .annotate(views=Count('id'))
-                        .order_by('day'))
+        interval, start_date, end_date = _parse_chart_range(request, member)
+        if interval is None:
+            response_data = {
+                "code": "C001_3",
+                "status": 400,
+                "message": "잘못된 조회 구간입니다."
+            }
+            logger.warning(f'{client_ip} GET /charts/{username}/daily 400 invalid range')
+            return Response(response_data, status=400)
 
-        for data in history_data:
-            daily_views[data['day'].strftime('%Y-%m-%d')] = data['views']
+        # 헤더와 시리즈는 모두 채널 스냅샷 한 번의 조회로 만든다
+        snapshot = get_snapshot(member)
+        daily_views = build_series(snapshot['daily'], start_date, end_date, interval)
+        summary = get_summary(snapshot)
 
-        if not music_videos.exists():
+        if not summary['total_mv']:
             response_data = {
                 "code": "C001_1",
                 "status": 200,
@@ -138,45 +157,20 @@ class DailyChartView(ApiAuthMixin, APIView):
                 "total_views": 0,
                 "popular_mv_subject": "No video",
                 "popular_mv_views": 0,
-                "daily_views": [
-                    {
-                        "daily_views_date": date,
-                        "daily_views_views": views
-                    } for date, views in daily_views.items()
-                ],
+                "interval": interval,
+                "daily_views": daily_views,
             }
             logger.info(f'{client_ip} GET /charts/{username}/daily 200 No music videos')
             return Response(response_data, status=200)
 
-        total_mv = music_videos.count()
-        total_views = 0
-        popular_mv_subject = ""
-        popular_mv_views = 0
-
-        for music_video in music_videos:
-            total_views += music_video.views
-            if music_video.views >= popular_mv_views and music_video.views != 0:
-                popular_mv_subject = music_video.subject
-                popular_mv_views = music_video.views
-
-        if popular_mv_subject == "":
-            popular_mv_subject = "No views"
-
         response_data = {
             "code": "C001",
             "status": 200,
             "message": "날짜별 조회수 통계 차트 조회 성공",
             "member_name": member_name,
-            "total_mv": total_mv,
-            "total_views": total_views,
-            "popular_mv_subject": popular_mv_subject,
-            "popular_mv_views": popular_mv_views,
-            "daily_views": [
-                    {
-                        "daily_views_date": date,
-                        "daily_views_views": views,
-                    } for date, views in daily_views.items()
-                ],
+            **summary,
+            "interval": interval,
+            "daily_views": daily_views,
         }
         logger.info(f'{client_ip} GET /charts/{username}/daily 200 day views success')
         return Response(response_data, status=status.HTTP_200_OK)
@@ -256,28 +250,11 @@ class GenderChartView(ApiAuthMixin, APIView):
             return Response(response_data, status=404)
 
         member_name = member.nickname
-        music_videos = MusicVideo.objects.filter(username=member.username).values_list('id', flat=True)
-
-        gender_list = [
-            {'gender_name': 'Male', 'gender_number': 0},
-            {'gender_name': 'Female', 'gender_number': 0},
-        ]
-
-        processed_viewers = set()
-
-        for video in music_videos:
-            viewers = History.objects.filter(mv_id=video).values_list('username', flat=True)
-            for viewer in viewers:
-                if viewer in processed_viewers:
-                    continue
-                processed_viewers.add(viewer)
-                member_gender = Member.objects.get(username=viewer).sex
-                if member_gender == "M":
-                    gender_list[0]['gender_number'] += 1
-                elif member_gender == "F":
-                    gender_list[1]['gender_number'] += 1
-
-        if not music_videos.exists():
+        snapshot = get_snapshot(member)
+        gender_list = get_gender_list(snapshot)
+        summary = get_summary(snapshot)
+
+        if not summary['total_mv']:
             response_data = {
                 "code": "C002_1",
                 "status": 200,
@@ -287,46 +264,18 @@ class GenderChartView(ApiAuthMixin, APIView):
                 "total_views": 0,
                 "popular_mv_subject": "No video",
                 "popular_mv_views": 0,
-                "gender_list": [
-                    {
-                        "gender_name": item['gender_name'],
-                        "gender_number": item['gender_number']
-                    } for item in gender_list
-                ],
+                "gender_list": gender_list,
             }
             logger.info(f'{client_ip} GET /charts/{username}/genders 200 No music videos')
             return Response(response_data, status=200)
 
-        total_mv = music_videos.count()
-        total_views = 0
-        popular_mv_subject = ""
-        popular_mv_views = 0
-
-        for music_video in music_videos:
-            mv_views = MusicVideo.objects.get(id=music_video).views
-            total_views += mv_views
-            if mv_views >= popular_mv_views and mv_views != 0:
-                popular_mv_subject = MusicVideo.objects.get(id=music_video).subject
-                popular_mv_views = mv_views
-
-        if popular_mv_subject == "":
-            popular_mv_subject = "No views"
-
         response_data = {
             "code": "C002",
             "status": 200,
             "message": "성별 통계 차트 조회 성공",
             "member_name": member_name,
-            "total_mv": total_mv,
-            "total_views": total_views,
-            "popular_mv_subject": popular_mv_subject,
-            "popular_mv_views": popular_mv_views,
-            "gender_list": [
-                    {
-                        "gender_name": item['gender_name'],
-                        "gender_number": item['gender_number']
-                    } for item in gender_list
-                ],
+            **summary,
+            "gender_list": gender_list,
         }
         logger.info(f'{client_ip} GET /charts/{username}/genders 200 gender views success')
         return Response(response_data, status=status.HTTP_200_OK)
@@ -428,31 +377,11 @@ class CountryChartView(ApiAuthMixin, APIView):
             return Response(response_data, status=404)
 
         member_name = member.nickname
-        music_videos = MusicVideo.objects.filter(username=member.username).values_list('id', flat=True)
-
-        countries = Country.objects.filter(is_deleted=False)
-        country_list = []
-        for country in countries:
-            country_list.append({
-                'country_id': country.id,
-                'country_name': country.name,
-                'country_views': 0
-            })
-
-        processed_viewers = set()
-
-        for video in music_videos:
-            viewers = History.objects.filter(mv_id=video).values_list('username', flat=True)
-            for viewer in viewers:
-                if viewer in processed_viewers:
-                    continue
-                processed_viewers.add(viewer)
-                member_country = Member.objects.get(username=viewer).country
-                for country in country_list:
-                    if member_country.name == country['country_name']:
-                        country['country_views'] += 1
-
-        if not music_videos.exists():
+        snapshot = get_snapshot(member)
+        country_list = get_country_list(snapshot)
+        summary = get_summary(snapshot)
+
+        if not summary['total_mv']:
             response_data = {
                 "code": "C003_1",
                 "status": 200,
@@ -462,48 +391,18 @@ class CountryChartView(ApiAuthMixin, APIView):
                 "total_views": 0,
                 "popular_mv_subject": "No video",
                 "popular_mv_views": 0,
-                "country_list": [
-                    {
-                        'country_id': item['country_id'],
-                        'country_name': item['country_name'],
-                        'country_views': item['country_views']
-                    } for item in country_list
-                ],
+                "country_list": country_list,
             }
             logger.info(f'{client_ip} GET /charts/{username}/countries 200 No music videos')
             return Response(response_data, status=200)
 
-        total_mv = music_videos.count()
-        total_views = 0
-        popular_mv_subject = ""
-        popular_mv_views = 0
-
-        for music_video in music_videos:
-            mv_views = MusicVideo.objects.get(id=music_video).views
-            total_views += mv_views
-            if mv_views >= popular_mv_views and mv_views != 0:
-                popular_mv_subject = MusicVideo.objects.get(id=music_video).subject
-                popular_mv_views = mv_views
-
-        if popular_mv_subject == "":
-            popular_mv_subject = "No views"
-
         response_data = {
             "code": "C003",
             "status": 200,
             "message": "국가별 통계 차트 조회 성공",
             "member_name": member_name,
-            "total_mv": total_mv,
-            "total_views": total_views,
-            "popular_mv_subject": popular_mv_subject,
-            "popular_mv_views": popular_mv_views,
-            "country_list": [
-                {
-                    'country_id': item['country_id'],
-                    'country_name': item['country_name'],
-                    'country_views': item['country_views']
-                } for item in country_list
-            ],
+            **summary,
+            "country_list": country_list,
         }
         logger.info(f'{client_ip} GET /charts/{username}/countries 200 country views success')
         return Response(response_data, status=status.HTTP_200_OK)
@@ -583,41 +482,11 @@ class AgeChartView(ApiAuthMixin, APIView):
             return Response(response_data, status=404)
 
         member_name = member.nickname
-        music_videos = MusicVideo.objects.filter(username=member.username).values_list('id', flat=True)
-
-        age_list = [
-            {'age_group': '10s and under', 'age_views': 0},
-            {'age_group': '20s', 'age_views': 0},
-            {'age_group': '30s', 'age_views': 0},
-            {'age_group': '40s', 'age_views': 0},
-            {'age_group': '50s and above', 'age_views': 0}
-        ]
-
-        current_year = datetime.now().year
-        processed_viewers = set()
-
-        for video in music_videos:
-            viewers = History.objects.filter(mv_id=video).values_list('username', flat=True)
-            for viewer in viewers:
-                if viewer in processed_viewers:
-                    continue
-                processed_viewers.add(viewer)
-                viewer_member = Member.objects.get(username=viewer)
-                birth_date = viewer_member.birthday
-                birth_year = birth_date.year
-                age = current_year - birth_year
-                if age < 20:
-                    age_list[0]['age_views'] += 1
-                elif age < 30:
-                    age_list[1]['age_views'] += 1
-                elif age < 40:
-                    age_list[2]['age_views'] += 1
-                elif age < 50:
-                    age_list[3]['age_views'] += 1
-                else:
-                    age_list[4]['age_views'] += 1
-
-        if not music_videos.exists():
+        snapshot = get_snapshot(member)
+        age_list = get_age_list(snapshot)
+        summary = get_summary(snapshot)
+
+        if not summary['total_mv']:
             response_data = {
                 "code": "C004_1",
                 "status": 200,
@@ -627,47 +496,163 @@ class AgeChartView(ApiAuthMixin, APIView):
                 "total_views": 0,
                 "popular_mv_subject": "No video",
                 "popular_mv_views": 0,
-                "age_list": [
-                    {
-                        'age_group': item['age_group'],
-                        'age_views': item['age_views']
-                    } for item in age_list
-                ],
+                "age_list": age_list,
             }
             logger.info(f'{client_ip} GET /charts/{username}/ages 200 No music videos')
             return Response(response_data, status=200)
 
-        total_mv = music_videos.count()
-        total_views = 0
-        popular_mv_subject = ""
-        popular_mv_views = 0
-
-        for music_video in music_videos:
-            mv_views = MusicVideo.objects.get(id=music_video).views
-            total_views += mv_views
-            if mv_views >= popular_mv_views and mv_views != 0:
-                popular_mv_subject = MusicVideo.objects.get(id=music_video).subject
-                popular_mv_views = mv_views
-
-        if popular_mv_subject == "":
-            popular_mv_subject = "No views"
-
         response_data = {
             "code": "C004",
             "status": 200,
             "message": "연령별 통계 차트 조회 성공",
             "member_name": member_name,
-            "total_mv": total_mv,
-            "total_views": total_views,
-            "popular_mv_subject": popular_mv_subject,
-            "popular_mv_views": popular_mv_views,
-            "age_list": [
-                {
-                    'age_group': item['age_group'],
-                    'age_views': item['age_views']
-                } for item in age_list
-            ],
+            **summary,
+            "age_list": age_list,
         }
         logger.info(f'{client_ip} GET /charts/{username}/ages 200 age views success')
         return Response(response_data, status=status.HTTP_200_OK)
 
+
+
+
+DASHBOARD_FIELDS = ('daily', 'genders', 'countries', 'ages')
+
+
+class DashboardChartView(ApiAuthMixin, APIView):
+    @swagger_auto_schema(
+        operation_summary="채널 대시보드 통계 조회 API",
+        operation_description="날짜별/성별/국가별/연령별 통계를 한 번에 조회합니다. 변경이 없으면 304 를 반환합니다.",
+        manual_parameters=[
+            openapi.Parameter('fields', openapi.IN_QUERY, description="조회할 통계 (daily, genders, countries, ages / 쉼표로 구분, 기본값: 전체)", type=openapi.TYPE_STRING),
+            openapi.Parameter('interval', openapi.IN_QUERY, description="묶음 단위 (day, week, month / 기본값: day)", type=openapi.TYPE_STRING),
+            openapi.Parameter('start', openapi.IN_QUERY, description="시작일 yyyy-mm-dd (기본값: 가입일)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end', openapi.IN_QUERY, description="종료일 yyyy-mm-dd (기본값: 오늘)", type=openapi.TYPE_STRING),
+            openapi.Parameter('If-None-Match', openapi.IN_HEADER, description="이전 응답의 ETag", type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: openapi.Response(
+                description="채널 대시보드 통계 조회 성공",
+                examples={
+                    "application/json": {
+                        "code": "C005",
+                        "status": 200,
+                        "message": "채널 대시보드 통계 조회 성공",
+                        "data": {
+                            "member_name": "string",
+                            "total_mv": 0,
+                            "total_views": 0,
+                            "popular_mv_subject": "string",
+                            "popular_mv_views": 0,
+                            "interval": "day",
+                            "daily_views": [
+                                {
+                                    "daily_views_date": "yyyy-mm-dd",
+                                    "daily_views_views": 0,
+                                    "daily_views_unique_viewers": 0,
+                                },
+                            ],
+                            "gender_list": [
+                                {
+                                    "gender_name": "string",
+                                    "gender_number": 0,
+                                },
+                            ],
+                            "country_list": [
+                                {
+                                    "country_id": 0,
+                                    "country_name": "string",
+                                    "country_views": 0,
+                                },
+                            ],
+                            "age_list": [
+                                {
+                                    "age_group": "string",
+                                    "age_views": 0
+                                },
+                            ]
+                        }
+                    }
+                }
+            ),
+            304: openapi.Response(description="변경 없음"),
+            400: openapi.Response(
+                description="채널 대시보드 통계 조회 실패",
+                examples={
+                    "application/json": {
+                        "code": "C005_3",
+                        "status": 400,
+                        "message": "잘못된 조회 조건입니다."
+                    }
+                }
+            ),
+            404: openapi.Response(
+                description="채널 대시보드 통계 조회 실패",
+                examples={
+                    "application/json": {
+                        "code": "C005_2",
+                        "status": 404,
+                        "message": "회원 정보를 찾을 수 없습니다."
+                    }
+                }
+            )
+        }
+    )
+    def get(self, request, username):
+        client_ip = request.META.get('REMOTE_ADDR', None)
+        try:
+            member = Member.objects.get(username=username)
+        except Member.DoesNotExist:
+            response_data = {
+                "code": "C005_2",
+                "status": 404,
+                "message": "회원 정보를 찾을 수 없습니다."
+            }
+            logger.warning(f'{client_ip} GET /charts/{username}/dashboard 404 Member Not Found')
+            return Response(response_data, status=404)
+
+        fields_param = request.query_params.get('fields', None)
+        fields = [field.strip() for field in fields_param.split(',') if field.strip()] if fields_param else list(DASHBOARD_FIELDS)
+        interval, start_date, end_date = _parse_chart_range(request, member)
+        if not fields or any(field not in DASHBOARD_FIELDS for field in fields) or interval is None:
+            response_data = {
+                "code": "C005_3",
+                "status": 400,
+                "message": "잘못된 조회 조건입니다."
+            }
+            logger.warning(f'{client_ip} GET /charts/{username}/dashboard 400 invalid query')
+            return Response(response_data, status=400)
+
+        # 모든 통계를 채널 스냅샷 한 번의 조회로 만든다
+        snapshot = get_snapshot(member)
+        summary = get_summary(snapshot)
+        if not summary['total_mv']:
+            summary["popular_mv_subject"] = "No video"
+
+        response_data = {
+            "code": "C005" if summary['total_mv'] else "C005_1",
+            "status": 200,
+            "message": "채널 대시보드 통계 조회 성공" if summary['total_mv'] else "사용자 뮤직 비디오 개수가 0개입니다.",
+            "member_name": member.nickname,
+            **summary,
+        }
+        if 'daily' in fields:
+            response_data["interval"] = interval
+            response_data["daily_views"] = build_series(snapshot['daily'], start_date, end_date, interval)
+        if 'genders' in fields:
+            response_data["gender_list"] = get_gender_list(snapshot)
+        if 'countries' in fields:
+            response_data["country_list"] = get_country_list(snapshot)
+        if 'ages' in fields:
+            response_data["age_list"] = get_age_list(snapshot)
+
+        # 응답 본문으로 ETag 를 만들어 변경이 없으면 본문 없이 304 를 돌려준다
+        etag = quote_etag(hashlib.md5(
+            json.dumps(response_data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest())
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH', None)
+        if if_none_match and (etag in parse_etags(if_none_match) or '*' in parse_etags(if_none_match)):
+            logger.info(f'{client_ip} GET /charts/{username}/dashboard 304 not modified')
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        logger.info(f'{client_ip} GET /charts/{username}/dashboard 200 dashboard success')
+        return Response(response_data, status=status.HTTP_200_OK, headers={'ETag': etag})
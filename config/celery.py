@@ -5,6 +5,8 @@ from celery.schedules import crontab
 from kombu import Exchange, Queue  # kombu에서 Queue와 Exchange 임포트
 import logging
 
+from .worker_profiles import WORKER_PROFILES
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 app = Celery('config')
@@ -15,18 +17,47 @@ app.autodiscover_tasks()
 
 # 비트 스케줄 설정
 app.conf.beat_schedule = {
-    'reset-recently-viewed-every-week': {
+    'compact-trending-scores-every-hour': {
         'task': 'music_videos.tasks.hot_music_video_scheduled',
-        'schedule': crontab(minute=0, hour=0, day_of_week='monday'),  # 매주 월요일 자정에 실행
+        'schedule': crontab(minute=15, hour='*'),  # 매시간 인기 급상승 점수 압축
+    },
+    'sync-search-index-every-minute': {
+        'task': 'music_videos.tasks.sync_search_index',
+        'schedule': crontab(minute='*'),  # 매분 변경된 뮤직비디오만 검색 색인에 반영
+    },
+    'dispatch-generation-jobs-every-minute': {
+        'task': 'music_videos.tasks.dispatch_generation_jobs',
+        'schedule': crontab(minute='*'),  # 매분 멈춘 생성 작업 슬롯을 정리하고 대기 중인 작업을 보냄
+    },
+    'flush-view-counters-every-minute': {
+        'task': 'music_videos.tasks.flush_view_counters',
+        'schedule': crontab(minute='*'),  # 매분 Redis 에 누적된 조회수를 MySQL 에 반영
+    },
+    'flush-playback-positions-every-minute': {
+        'task': 'music_videos.tasks.flush_playback_positions',
+        'schedule': crontab(minute='*'),  # 매분 Redis 에 모인 재생 위치를 MySQL 에 반영
     },
-    'rebuild_elasticsearch_index': {
-        'task': 'music_videos.tasks.rebuild_elasticsearch_index',
-        'schedule': crontab(minute=0, hour='*'),  # 매시간 정각에 실행
+    'rollup-view-events-every-5-minutes': {
+        'task': 'charts.tasks.rollup_daily_views',
+        'schedule': crontab(minute='*/5'),  # 5분마다 시청 이벤트를 일별 집계 테이블에 반영
+    },
+    'reconcile-kakaopay-payments-every-5-minutes': {
+        'task': 'member.tasks.reconcile_kakaopay_payments',
+        'schedule': crontab(minute='*/5'),  # 5분마다 승인 결과를 받지 못한 결제를 주문 조회로 확정
+    },
+    'resume-youtube-uploads-every-10-minutes': {
+        'task': 'oauth.tasks.resume_youtube_uploads',
+        'schedule': crontab(minute='*/10'),  # 10분마다 멈춘 유튜브 업로드를 이어서 진행
+    },
+    'refresh-demographic-feeds-every-day': {
+        'task': 'music_videos.tasks.refresh_demographic_feeds',
+        'schedule': crontab(minute=30, hour=4),  # 매일 새벽 4시 30분에 국가/연령대 랭킹 재생성
     },
 }
 
 # 큐 설정
 app.conf.task_queues = (
+    Queue('default', Exchange('default', type='direct'), routing_key='default'),
     Queue('music_queue', Exchange('music', type='direct'), routing_key='music_queue'),
     Queue('video_queue', Exchange('videos', type='direct'), routing_key='video_queue'),
     Queue('final_queue', Exchange('final', type='direct'), routing_key='final_queue'),
@@ -34,9 +65,9 @@ app.conf.task_queues = (
 
 # 라우팅 설정
 app.conf.task_routes = {
-    'tasks.suno_music': {'queue': 'music_queue'},
-    'tasks.create_video': {'queue': 'video_queue'},
-    'tasks.mv_create': {'queue': 'final_queue'},
+    'music_videos.tasks.suno_music': {'queue': 'music_queue'},
+    'music_videos.tasks.create_video': {'queue': 'video_queue'},
+    'music_videos.tasks.mv_create': {'queue': 'final_queue'},
 }
 
 # 기본 큐 설정
@@ -44,5 +75,10 @@ app.conf.task_default_queue = 'default'
 app.conf.task_default_exchange = 'default'
 app.conf.task_default_routing_key = 'default'
 
+# 워커 설정 (CELERY_WORKER_PROFILE 이 없으면 Celery 기본값)
+worker_profile = WORKER_PROFILES.get(os.environ.get('CELERY_WORKER_PROFILE'))
+if worker_profile:
+    app.conf.update(worker_profile['conf'])
+
 logger = logging.getLogger(__name__)
 logger.info("Current Celery Beat schedule: %s", app.conf.beat_schedule)
\ No newline at end of file
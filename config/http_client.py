@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 외부 API 호출 지연 시간 (django_prometheus 의 /metrics 에 함께 노출된다)
+REQUEST_LATENCY = Histogram(
+    'http_client_request_latency_seconds',
+    '외부 API 호출 지연 시간',
+    ['provider', 'host', 'method', 'status'],
+)
+CIRCUIT_OPEN_REJECTIONS = Counter(
+    'http_client_circuit_open_total',
+    '회로 차단기가 열려 보내지 않은 외부 API 호출 수',
+    ['provider', 'host'],
+)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    # 요청을 보내지 않고 실패시킨 경우 (연결 실패와 같이 다룰 수 있도록 ConnectionError 를 상속)
+    pass
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold 번 쌓이면 reset_timeout 동안 요청을 막고,
+    그 뒤 한 번의 시험 요청이 성공하면 다시 연다. (프로세스 로컬)
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class HttpClient:
+    """
+    외부 서비스별 HTTP 클라이언트.
+    호스트별 keep-alive 커넥션 풀, 기본 타임아웃, 재시도, 회로 차단기, 지연 시간 지표를 제공한다.
+    """
+
+    def __init__(self, name, timeout=(3.05, 30), retry=None, pool_maxsize=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        # 재시도는 연결 실패 전체와, 멱등한 메서드(GET 등)의 읽기 실패/일시적 5xx 에만 적용된다 (POST 는 다시 보내지 않는다)
+        retry = retry or Retry(total=3, connect=3, read=2, status=2, other=0, backoff_factor=0.5,
+                               status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+
+    def _breaker(self, host):
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._breakers[host] = breaker
+            return breaker
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        breaker = self._breaker(host)
+        if not breaker.allow():
+            CIRCUIT_OPEN_REJECTIONS.labels(self.name, host).inc()
+            raise CircuitOpenError(f'{self.name} circuit is open for {host}')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            REQUEST_LATENCY.labels(self.name, host, method, 'error').observe(time.perf_counter() - started)
+            breaker.record_failure()
+            raise
+        REQUEST_LATENCY.labels(self.name, host, method, response.status_code).observe(time.perf_counter() - started)
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    async def arequest(self, method, url, **kwargs):
+        # 블로킹 호출을 스레드에서 실행한다 (세션/커넥션 풀은 sync 호출과 공유)
+        return await asyncio.to_thread(self.request, method, url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await self.arequest('GET', url, **kwargs)
+
+    async def apost(self, url, **kwargs):
+        return await self.arequest('POST', url, **kwargs)
+
+
+def _provider_settings():
+    return {
+        'suno': {'timeout': (3.05, 30)},
+        'runway': {'timeout': (3.05, 30)},
+        'google': {'timeout': (3.05, 10)},
+        'kakaopay': {
+            'timeout': (settings.KAKAOPAY_CONNECT_TIMEOUT, settings.KAKAOPAY_READ_TIMEOUT),
+            'pool_maxsize': 20,
+        },
+        # 생성된 오디오/영상 파일 다운로드 (스트리밍으로 받으므로 읽기 타임아웃은 청크 사이 간격)
+        'media': {'timeout': (3.05, 60)},
+    }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name):
+    # 프로세스마다 서비스별로 하나씩 만든다 (prefork 워커는 fork 이후 처음 호출할 때 만들어진다)
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = HttpClient(name, **_provider_settings()[name])
+            _clients[name] = client
+        return client
+
+
+def download_to_file(url, file, chunk_size=1024 * 1024):
+    # 응답 전체를 메모리에 올리지 않고 파일 객체에 나눠 쓴다
+    with get_client('media').get(url, stream=True) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            file.write(chunk)
@@ -107,7 +107,7 @@ TEMPLATES = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth.authenticate.SafeJWTAuthentication',
+        'oauth.authenticate.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -203,6 +203,8 @@ ELASTICSEARCH_DSL = {
         }
     },
 }
+# 저장할 때마다 동기로 색인하지 않고 search_sync outbox 로 모아서 bulk 색인
+ELASTICSEARCH_DSL_AUTOSYNC = False
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -316,6 +318,32 @@ CELERY_TIMEZONE = 'Asia/Seoul'
 CELERY_ENABLE_UTC = False
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Redis 설정 (랭킹, 카운터 버퍼 등)
+REDIS_URL = env('REDIS_URL', default='redis://redis:6379/1')
+# 인기 급상승 점수 반감기 (시간)
+TRENDING_HALF_LIFE_HOURS = env.int('TRENDING_HALF_LIFE_HOURS', default=72)
+# 인증된 회원 캐시 (프로세스 로컬 LRU / Redis, 초)
+AUTH_LOCAL_CACHE_SIZE = env.int('AUTH_LOCAL_CACHE_SIZE', default=1024)
+AUTH_LOCAL_CACHE_TTL = env.int('AUTH_LOCAL_CACHE_TTL', default=30)
+AUTH_REDIS_CACHE_TTL = env.int('AUTH_REDIS_CACHE_TTL', default=5 * 60)
+# 고유 시청자가 이 수를 넘는 채널은 정확한 시청자 목록 대신 HyperLogLog 로 집계
+CHART_EXACT_VIEWER_LIMIT = env.int('CHART_EXACT_VIEWER_LIMIT', default=10000)
+# 외부 생성 API 제출 속도 제한 (분당 요청 수, 한 번에 몰아서 보낼 수 있는 최대 요청 수) - 모든 워커가 Redis 토큰 버킷을 공유
+RUNWAY_RATE_LIMIT_PER_MINUTE = env.int('RUNWAY_RATE_LIMIT_PER_MINUTE', default=10)
+RUNWAY_RATE_LIMIT_BURST = env.int('RUNWAY_RATE_LIMIT_BURST', default=5)
+SUNO_RATE_LIMIT_PER_MINUTE = env.int('SUNO_RATE_LIMIT_PER_MINUTE', default=20)
+SUNO_RATE_LIMIT_BURST = env.int('SUNO_RATE_LIMIT_BURST', default=5)
+# 뮤직비디오 생성 작업 분배 (회원별 동시 실행 수, 전체 동시 실행 수, 우선 처리 연속 허용 횟수, 진행 중으로 보는 최대 시간(초))
+GENERATION_USER_INFLIGHT_LIMIT = env.int('GENERATION_USER_INFLIGHT_LIMIT', default=1)
+GENERATION_MAX_INFLIGHT = env.int('GENERATION_MAX_INFLIGHT', default=8)
+GENERATION_PRIORITY_WEIGHT = env.int('GENERATION_PRIORITY_WEIGHT', default=3)
+GENERATION_INFLIGHT_TIMEOUT = env.int('GENERATION_INFLIGHT_TIMEOUT', default=2 * 60 * 60)
+
 #Kakao Pay 설정
 KAKAO_APP_ADMIN_KEY = env('KAKAO_APP_ADMIN_KEY')
-CID = env('CID')
\ No newline at end of file
+CID = env('CID')
+# 로컬 테스트에서는 fake_kakaopay 서버 주소로 바꿔서 사용
+KAKAOPAY_API_BASE_URL = env('KAKAOPAY_API_BASE_URL', default='https://open-api.kakaopay.com')
+# (연결, 응답) 타임아웃 초
+KAKAOPAY_CONNECT_TIMEOUT = env.float('KAKAOPAY_CONNECT_TIMEOUT', default=3.05)
+KAKAOPAY_READ_TIMEOUT = env.float('KAKAOPAY_READ_TIMEOUT', default=10)
\ No newline at end of file
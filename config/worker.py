@@ -0,0 +1,28 @@
+import os
+import sys
+
+from .worker_profiles import WORKER_PROFILES
+
+
+def main(argv):
+    # python -m config.worker <profile> [celery worker 옵션...]
+    # -P 옵션을 명령행으로 넘겨야 celery 가 gevent monkey patch 를 가장 먼저 적용한다
+    if len(argv) < 1 or argv[0] not in WORKER_PROFILES:
+        sys.stderr.write(f'usage: python -m config.worker {{{",".join(WORKER_PROFILES)}}} [celery worker options]\n')
+        return 2
+    name, extra = argv[0], argv[1:]
+    profile = WORKER_PROFILES[name]
+    os.environ['CELERY_WORKER_PROFILE'] = name
+    command = [
+        'celery', '-A', 'config', 'worker',
+        '-n', f'{name}@%h',
+        '-Q', ','.join(profile['queues']),
+        '-P', profile['pool'],
+        '-c', str(os.environ.get('CELERY_WORKER_CONCURRENCY', profile['concurrency'])),
+        '--loglevel', 'info',
+    ] + extra
+    os.execvp(command[0], command)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
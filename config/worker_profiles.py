@@ -0,0 +1,46 @@
+# 큐 성격별 Celery 워커 설정
+# - polling: 외부 API 를 오래 기다리는 작업 (suno_music, create_video) -> gevent 로 한 프로세스에서 많은 작업을 동시에 대기
+# - render: MoviePy 렌더링 (mv_create) -> CPU/메모리를 많이 쓰므로 prefork, 한 번에 하나씩 가져가고 메모리가 커진 프로세스는 교체
+# - default: 비트 작업, 색인/집계, 유튜브 업로드 등
+# CELERY_WORKER_PROFILE 환경 변수로 선택하며, `python -m config.worker <profile>` 로 실행한다.
+WORKER_PROFILES = {
+    'polling': {
+        'queues': ['music_queue', 'video_queue'],
+        'pool': 'gevent',
+        'concurrency': 100,
+        'conf': {
+            'worker_prefetch_multiplier': 1,
+            # 작업 도중 워커가 죽었을 때 다시 실행하면 생성 요청이 중복 제출되므로 받는 즉시 ack 한다
+            'task_acks_late': False,
+            # create_video 의 상태 조회(최대 30분) 보다 길게
+            'task_soft_time_limit': 40 * 60,
+            'task_time_limit': 45 * 60,
+        },
+    },
+    'render': {
+        'queues': ['final_queue'],
+        'pool': 'prefork',
+        'concurrency': 2,
+        'conf': {
+            'worker_prefetch_multiplier': 1,
+            # 렌더링 중 워커가 죽으면(OOM 등) 메시지를 다시 받아 처음부터 렌더링한다
+            'task_acks_late': True,
+            'task_reject_on_worker_lost': True,
+            # KB 단위, 작업이 끝난 뒤 이 크기를 넘긴 프로세스는 새로 띄운다
+            'worker_max_memory_per_child': 1536 * 1024,
+            'worker_max_tasks_per_child': 20,
+            'task_soft_time_limit': 25 * 60,
+            'task_time_limit': 30 * 60,
+        },
+    },
+    'default': {
+        'queues': ['default'],
+        'pool': 'prefork',
+        'concurrency': 4,
+        'conf': {
+            'worker_prefetch_multiplier': 4,
+            'task_soft_time_limit': 30 * 60,
+            'task_time_limit': 35 * 60,
+        },
+    },
+}
@@ -1,6 +1,5 @@
 from urllib.parse import parse_qs
 
-from .constants import PAY_STATUS_FAIL
 from .payment import KakaoPayClient
 from rest_framework.views import APIView
 from .models import KakaoPaymentRequest
@@ -17,9 +16,7 @@ class KakaoPayFailCallbackAPIView(APIView):
     def get(self, request, pk):
         try:
             payment_req = KakaoPaymentRequest.objects.get(id=pk)
-            payment_req.status = PAY_STATUS_FAIL
-
-            payment_req.save()
+            KakaoPayClient().fail(payment_req)
 
             response_data = {
                 'message': "결제가 실패하였습니다. 다시 시도해 주세요."
@@ -47,14 +47,26 @@ PAY_STATUS_CHOICES = (
     (1, "성공"),
     (2, "실패"),
     (3, "취소"),
-    (4, "에러케이스")
+    (4, "에러케이스"),
+    (5, "결제 준비 완료"),
+    (6, "승인 중"),
 )
 
 
+PAY_STATUS_PENDING = 0
 PAY_STATUS_SUCCESS = 1
 PAY_STATUS_FAIL = 2
 PAY_STATUS_CANCEL = 3
 PAY_STATUS_ERROR = 4
+PAY_STATUS_READY = 5
+PAY_STATUS_APPROVING = 6
+
+# 카카오페이 주문 조회(/online/v1/payment/order)의 결제 상태
+KAKAOPAY_ORDER_CANCELED_STATUSES = ('CANCEL_PAYMENT', 'QUIT_PAYMENT')
+KAKAOPAY_ORDER_FAILED_STATUSES = ('FAIL_AUTH_PASSWORD', 'FAIL_PAYMENT')
+KAKAOPAY_ORDER_IN_PROGRESS_STATUSES = (
+    'READY', 'SEND_TMS', 'OPEN_PAYMENT', 'SELECT_METHOD', 'ARS_WAITING', 'AUTH_PASSWORD', 'ISSUED_SID',
+)
 
 
 PAY_TYPE_CHOICES = (
@@ -65,4 +77,24 @@ PAY_TYPE_CHOICES = (
 PAY_TYPE = {
     "CARD": 0,
     "MONEY": 1
-}
\ No newline at end of file
+}
+
+AGE_GROUP_CHOICES = (
+    (0, "10s and under"),
+    (1, "20s"),
+    (2, "30s"),
+    (3, "40s"),
+    (4, "50s and above"),
+)
+
+CREDIT_REASON_CHOICES = (
+    (0, "충전"),
+    (1, "뮤직비디오 생성"),
+    (2, "뮤직비디오 생성 실패 환불"),
+)
+
+CREDIT_REASON_CHARGE = 0
+CREDIT_REASON_MUSIC_VIDEO = 1
+CREDIT_REASON_REFUND = 2
+
+MUSIC_VIDEO_CREDIT_COST = 20
@@ -0,0 +1,51 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from oauth.user_cache import invalidate_member
+from .constants import CREDIT_REASON_REFUND
+from .models import CreditLedger, Member
+
+
+class InsufficientCredits(Exception):
+    pass
+
+
+def _apply(username, amount, reason, reference):
+    # 잔액 변경과 내역 기록을 한 트랜잭션에서 처리한다 (update() 는 post_save 를 보내지 않으므로 캐시는 직접 무효화)
+    user_id, balance = Member.objects.filter(username=username).values_list('id', 'credits').get()
+    CreditLedger.objects.create(
+        username_id=username,
+        amount=amount,
+        balance_after=balance,
+        reason=reason,
+        reference=reference,
+    )
+    transaction.on_commit(lambda: invalidate_member(user_id))
+    return balance
+
+
+def debit(username, amount, reason, reference=None):
+    # UPDATE ... SET credits = credits - amount WHERE credits >= amount 로 잔액 확인과 차감을 원자적으로 처리
+    with transaction.atomic():
+        updated = (Member.objects
+                   .filter(username=username, credits__gte=amount)
+                   .update(credits=F('credits') - amount))
+        if not updated:
+            raise InsufficientCredits(username)
+        return _apply(username, -amount, reason, reference)
+
+
+def credit(username, amount, reason, reference=None):
+    # reference 가 같은 충전/환불은 한 번만 반영하고 이후 호출은 None 을 반환한다
+    try:
+        with transaction.atomic():
+            Member.objects.filter(username=username).update(credits=F('credits') + amount)
+            return _apply(username, amount, reason, reference)
+    except IntegrityError:
+        if reference and CreditLedger.objects.filter(reason=reason, reference=reference).exists():
+            return None
+        raise
+
+
+def refund(username, amount, reference):
+    return credit(username, amount, CREDIT_REASON_REFUND, reference)
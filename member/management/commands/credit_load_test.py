@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.models import Sum
+
+from member.constants import CREDIT_REASON_MUSIC_VIDEO, MUSIC_VIDEO_CREDIT_COST
+from member.credits import InsufficientCredits, debit, refund
+from member.models import CreditLedger, Member
+
+
+class Command(BaseCommand):
+    help = ('임시 회원에게 동시에 크레딧 차감/환불을 요청해 잔액이 음수가 되거나 갱신이 유실되지 않는지 확인합니다. '
+            '(실제 DB 에서 실행되며 끝나면 임시 회원을 삭제합니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--balance', type=int, default=200, help='시작 크레딧')
+        parser.add_argument('--requests', type=int, default=100, help='동시 차감 요청 수')
+        parser.add_argument('--workers', type=int, default=20, help='동시 실행 스레드 수')
+
+    def attempt(self, username, index):
+        close_old_connections()
+        try:
+            task_id = f'load-test-{username}-{index}'
+            debit(username, MUSIC_VIDEO_CREDIT_COST, CREDIT_REASON_MUSIC_VIDEO, task_id)
+            # 일부 요청은 실패한 작업처럼 환불 (같은 환불을 두 번 요청해도 한 번만 반영되어야 한다)
+            if index % 5 == 0:
+                refund(username, MUSIC_VIDEO_CREDIT_COST, task_id)
+                refund(username, MUSIC_VIDEO_CREDIT_COST, task_id)
+                return 'refunded'
+            return 'debited'
+        except InsufficientCredits:
+            return 'rejected'
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        username = f'credit-load-test-{uuid.uuid4().hex[:12]}'
+        member = Member.objects.create(username=username, email=f'{username}@example.com', credits=options['balance'])
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                results = list(executor.map(lambda index: self.attempt(username, index), range(options['requests'])))
+
+            debited = results.count('debited')
+            refunded = results.count('refunded')
+            rejected = results.count('rejected')
+            balance = Member.objects.values_list('credits', flat=True).get(username=username)
+            ledger_total = CreditLedger.objects.filter(username=username).aggregate(total=Sum('amount'))['total'] or 0
+            expected = options['balance'] - debited * MUSIC_VIDEO_CREDIT_COST
+
+            self.stdout.write(f'debited {debited}, refunded {refunded}, rejected {rejected}')
+            self.stdout.write(f'balance {balance} (expected {expected}), ledger total {ledger_total}')
+            if balance != expected or balance < 0 or options['balance'] + ledger_total != balance:
+                raise CommandError('lost or duplicated credit updates detected')
+            self.stdout.write(self.style.SUCCESS('no lost updates'))
+        finally:
+            member.delete()
@@ -0,0 +1,120 @@
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+
+class FakeKakaoPayHandler(BaseHTTPRequestHandler):
+    # ready 에서 받은 결제 정보 {tid: params}
+    payments = {}
+    # 승인된 결제의 승인 응답 {tid: response}
+    approvals = {}
+    delay = 0
+    fail_approve = False
+
+    def _send(self, status, body):
+        if self.delay and not self.path.endswith('/payment/order'):
+            # 요청은 처리한 뒤 응답만 늦춘다 (승인 응답 유실 상황 재현, 주문 조회는 지연 없음)
+            time.sleep(self.delay)
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        params = json.loads(self.rfile.read(length) or b'{}')
+        now = datetime.now().isoformat(timespec='seconds')
+
+        if self.path.endswith('/payment/order'):
+            # 승인 응답을 받지 못한 결제의 상태 확인용
+            tid = params.get('tid')
+            if tid not in self.payments:
+                return self._send(400, {'error_code': -703, 'error_message': 'payment not found'})
+            approval = self.approvals.get(tid)
+            if approval is None:
+                return self._send(200, {'tid': tid, 'status': 'AUTH_PASSWORD', 'payment_action_details': []})
+            return self._send(200, {
+                **approval,
+                'status': 'SUCCESS_PAYMENT',
+                'payment_action_details': [{
+                    'aid': approval['aid'],
+                    'approved_at': approval['approved_at'],
+                    'amount': approval['amount']['total'],
+                    'payment_action_type': 'PAYMENT',
+                }],
+            })
+
+        if self.path.endswith('/payment/ready'):
+            tid = f'T{uuid.uuid4().hex[:18]}'
+            self.payments[tid] = params
+            redirect_url = f"{params['approval_url']}?pg_token=fake-{tid}"
+            return self._send(200, {
+                'tid': tid,
+                'next_redirect_pc_url': redirect_url,
+                'next_redirect_mobile_url': redirect_url,
+                'next_redirect_app_url': redirect_url,
+                'android_app_scheme': '',
+                'ios_app_scheme': '',
+                'created_at': now,
+            })
+
+        if self.path.endswith('/payment/approve'):
+            payment = self.payments.get(params.get('tid'))
+            if payment is None or self.fail_approve:
+                return self._send(400, {
+                    'error_code': -780,
+                    'error_message': 'approval failure!',
+                    'extras': {'method_result_code': 'USER_LOCKED', 'method_result_message': '결제 승인 실패 (fake)'},
+                })
+            approval = {
+                'aid': f'A{uuid.uuid4().hex[:18]}',
+                'tid': params['tid'],
+                'cid': params.get('cid'),
+                'partner_order_id': payment['partner_order_id'],
+                'partner_user_id': payment['partner_user_id'],
+                'payment_method_type': 'MONEY',
+                'item_name': payment['item_name'],
+                'quantity': payment['quantity'],
+                'amount': {
+                    'total': payment['total_amount'],
+                    'tax_free': payment['tax_free_amount'],
+                    'vat': payment['vat_amount'],
+                },
+                'created_at': now,
+                'approved_at': now,
+            }
+            self.approvals[params['tid']] = approval
+            return self._send(200, approval)
+
+        if self.path.endswith('/payment/cancel'):
+            return self._send(200, {'tid': params.get('tid'), 'status': 'QUIT_PAYMENT'})
+
+        return self._send(404, {'error_message': 'not found'})
+
+
+class Command(BaseCommand):
+    help = ('로컬 테스트용 카카오페이 결제 API 서버 (ready/approve/cancel/order). '
+            'KAKAOPAY_API_BASE_URL=http://localhost:<port> 로 설정해서 사용합니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--delay', type=float, default=0, help='응답 지연(초), 타임아웃 확인용')
+        parser.add_argument('--fail-approve', action='store_true', help='승인 요청을 항상 실패시킵니다.')
+
+    def handle(self, *args, **options):
+        FakeKakaoPayHandler.delay = options['delay']
+        FakeKakaoPayHandler.fail_approve = options['fail_approve']
+        server = ThreadingHTTPServer(('0.0.0.0', options['port']), FakeKakaoPayHandler)
+        self.stdout.write(f"fake kakaopay listening on http://localhost:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
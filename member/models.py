@@ -3,6 +3,7 @@ from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.base_user import BaseUserManager
 
 from .constants import *
+from datetime import datetime
 
 
 class Country(models.Model):
@@ -62,6 +63,14 @@ class Member(AbstractUser):
     def __str__(self):
         return self.username
 
+    def get_age_group(self, current_year=None):
+        # AGE_GROUP_CHOICES 의 인덱스 (10대 이하 ~ 50대 이상)
+        if self.birthday is None:
+            return None
+        current_year = current_year or datetime.now().year
+        age = current_year - self.birthday.year
+        return min(max(age // 10 - 1, 0), len(AGE_GROUP_CHOICES) - 1)
+
 class KakaoPaymentRequest(models.Model):
     username = models.ForeignKey(Member, to_field='username', on_delete=models.CASCADE)
     credits = models.IntegerField()
@@ -89,3 +98,22 @@ class KakaoPaymentApprovalResult(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
+
+
+class CreditLedger(models.Model):
+    # 크레딧 변경 내역 (추가만 하고 수정/삭제하지 않는다)
+    username = models.ForeignKey(Member, to_field='username', on_delete=models.CASCADE)
+    amount = models.IntegerField()
+    balance_after = models.IntegerField()
+    reason = models.IntegerField(choices=CREDIT_REASON_CHOICES)
+    reference = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # 같은 결제/작업에 대한 충전·환불이 두 번 반영되지 않도록 한다
+            models.UniqueConstraint(fields=['reason', 'reference'], name='unique_credit_ledger_reason_reference'),
+        ]
+        indexes = [
+            models.Index(fields=['username', 'created_at']),
+        ]
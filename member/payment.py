@@ -2,20 +2,46 @@ from .models import KakaoPaymentApprovalResult, KakaoPaymentRequest
 import requests
 from django.conf import settings
 from django.db import transaction, DatabaseError
-from member.constants import PAY_STATUS_CANCEL, PAY_STATUS_ERROR, PAY_STATUS_SUCCESS, PAY_TYPE
+from django.utils import timezone
+from member.constants import (
+    CREDIT_REASON_CHARGE, KAKAOPAY_ORDER_CANCELED_STATUSES, KAKAOPAY_ORDER_FAILED_STATUSES,
+    KAKAOPAY_ORDER_IN_PROGRESS_STATUSES, PAY_STATUS_APPROVING, PAY_STATUS_CANCEL, PAY_STATUS_ERROR, PAY_STATUS_FAIL,
+    PAY_STATUS_READY, PAY_STATUS_SUCCESS, PAY_TYPE,
+)
+from member.credits import credit
+from config.http_client import CircuitOpenError, get_client
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
 import json
+import logging
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+def _request_not_sent(error):
+    # 연결을 맺기 전에 실패해(연결 거부, DNS 실패, 연결 타임아웃) 또는 회로 차단기가 막아 요청이 전송되지 않은 경우
+    if isinstance(error, (requests.ConnectTimeout, CircuitOpenError)):
+        return True
+    if isinstance(error, requests.ConnectionError):
+        # 연결 후 끊긴 경우(ProtocolError)는 요청이 전달되었을 수 있으므로 제외한다
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
 
 
 class KakaoPayClient(object):
+    """
+    결제 요청 상태: 대기중 -> 결제 준비 완료 -> 승인 중 -> 성공 (실패 시 에러케이스)
+    카카오페이 API 호출은 DB 트랜잭션 밖에서 하고, 상태 전이는 조건부 UPDATE 로 처리한다.
+    """
     BASE_URL = settings.BASE_BACKEND_URL + "api/v1/members/"
 
     ADMIN_KEY = settings.KAKAO_APP_ADMIN_KEY
-    READY_URL = 'https://open-api.kakaopay.com/online/v1/payment/ready'
-    APPROVE_URL = 'https://open-api.kakaopay.com/online/v1/payment/approve'
-    CANCEL_URL = 'https://open-api.kakaopay.com/online/v1/payment/cancel'
+    READY_URL = settings.KAKAOPAY_API_BASE_URL + '/online/v1/payment/ready'
+    APPROVE_URL = settings.KAKAOPAY_API_BASE_URL + '/online/v1/payment/approve'
+    CANCEL_URL = settings.KAKAOPAY_API_BASE_URL + '/online/v1/payment/cancel'
+    ORDER_URL = settings.KAKAOPAY_API_BASE_URL + '/online/v1/payment/order'
     cid = settings.CID
 
     headers = {
@@ -23,52 +49,66 @@ class KakaoPayClient(object):
         "Content-type": "application/json",
     }
 
+    def _post(self, url, params):
+        # 결제 API 는 POST 만 사용하므로 공용 클라이언트는 요청이 전송되기 전인 연결 실패만 재시도한다
+        return get_client('kakaopay').post(url, headers=self.headers, data=json.dumps(params))
+
+    def _transition(self, payment_req, from_status, to_status, **fields):
+        # 현재 상태가 from_status 일 때만 바꾼다 (콜백 중복 호출 등 동시 처리 방지)
+        fields['updated_at'] = timezone.now()
+        updated = KakaoPaymentRequest.objects.filter(pk=payment_req.pk, status=from_status).update(status=to_status, **fields)
+        if updated:
+            payment_req.status = to_status
+            for name, value in fields.items():
+                setattr(payment_req, name, value)
+        return bool(updated)
+
     def ready(self, user, credits, price):
         try:
-            with transaction.atomic():
-                payment_req = KakaoPaymentRequest.objects.create(
-                    username=user, credits=credits, price=price)
-
-                req_obj_id = payment_req.id
-
-                params = {
-                    "cid": f"{self.cid}",    # 테스트용 코드
-                    "partner_order_id": f"{payment_req.pk}",     # 주문번호
-                    "partner_user_id": f"{user.pk}",    # 유저 아이디
-                    "item_name": "credits",        # 구매 물품 이름
-                    "quantity": credits,                # 구매 물품 수량
-                    "total_amount": price,  # 구매 물품 가격
-                    "tax_free_amount": 0,         # 구매 물품 비과세
-                    "vat_amount": 100,
-                    "approval_url": self.BASE_URL + f"payments/callback/{req_obj_id}/success",
-                    "cancel_url": self.BASE_URL + f"payments/callback/{req_obj_id}/cancel",
-                    "fail_url": self.BASE_URL + f"payments/callback/{req_obj_id}/fail",
-                }
-                params = json.dumps(params)
-
-                res = requests.post(
-                    self.READY_URL, headers=self.headers, data=params)
-                if res.status_code == 200:
-                    res_json = res.json()
-                    tid = res_json.pop('tid')
-                    created_at = res_json.pop('created_at')
-
-                    res_json.pop("next_redirect_mobile_url")
-                    res_json.pop("ios_app_scheme")
-
-                    payment_req.tid = tid
-                    payment_req.ready_requested_at = created_at
-
-                    payment_req.save()
-
-                    return True, res_json
-                else:
-                    return False, "fail"
-
+            payment_req = KakaoPaymentRequest.objects.create(
+                username=user, credits=credits, price=price)
         except DatabaseError as e:
             success = False
             return success, str(e)
 
+        req_obj_id = payment_req.id
+
+        params = {
+            "cid": f"{self.cid}",    # 테스트용 코드
+            "partner_order_id": f"{payment_req.pk}",     # 주문번호
+            "partner_user_id": f"{user.pk}",    # 유저 아이디
+            "item_name": "credits",        # 구매 물품 이름
+            "quantity": credits,                # 구매 물품 수량
+            "total_amount": price,  # 구매 물품 가격
+            "tax_free_amount": 0,         # 구매 물품 비과세
+            "vat_amount": 100,
+            "approval_url": self.BASE_URL + f"payments/callback/{req_obj_id}/success",
+            "cancel_url": self.BASE_URL + f"payments/callback/{req_obj_id}/cancel",
+            "fail_url": self.BASE_URL + f"payments/callback/{req_obj_id}/fail",
+        }
+
+        try:
+            res = self._post(self.READY_URL, params)
+        except requests.RequestException as e:
+            logger.warning(f'kakaopay ready request failed for payment {payment_req.pk}: {str(e)}')
+            self._transition(payment_req, payment_req.status, PAY_STATUS_ERROR)
+            return False, "fail"
+
+        if res.status_code == 200:
+            res_json = res.json()
+            tid = res_json.pop('tid')
+            created_at = res_json.pop('created_at')
+
+            res_json.pop("next_redirect_mobile_url", None)
+            res_json.pop("ios_app_scheme", None)
+
+            self._transition(payment_req, payment_req.status, PAY_STATUS_READY, tid=tid, ready_requested_at=created_at)
+
+            return True, res_json
+        else:
+            self._transition(payment_req, payment_req.status, PAY_STATUS_ERROR)
+            return False, "fail"
+
     def cancel(self, payment_req):
         params = {
             "cid": f"{self.cid}",
@@ -77,30 +117,35 @@ class KakaoPayClient(object):
             "cancel_tax_free_amount": 0,
             "cancel_vat_amount": 100,
         }
-        params = json.dumps(params)
-        print(params)
-
-        res = requests.post(
-            self.CANCEL_URL, headers=self.headers, data=params)
 
-        print(res.json())
+        try:
+            res = self._post(self.CANCEL_URL, params)
+        except requests.RequestException as e:
+            logger.warning(f'kakaopay cancel request failed for payment {payment_req.pk}: {str(e)}')
+            return False, "fail"
 
         if res.status_code == 200:
             res_json = res.json()
 
             status = res_json.get('status')
             if status == "QUIT_PAYMENT":
-                payment_req.status = PAY_STATUS_CANCEL
-                payment_req.save()
+                self._transition(payment_req, payment_req.status, PAY_STATUS_CANCEL)
 
                 return True, "결제가 취소되었습니다."
             else:
-                payment_req.status = PAY_STATUS_ERROR
-                payment_req.save()
+                self._transition(payment_req, payment_req.status, PAY_STATUS_ERROR)
 
                 return False, status
+        return False, "fail"
 
     def approve(self, pg_token, payment_req):
+        # 승인은 결제 준비 완료 상태에서 한 번만 진행한다
+        if not self._transition(payment_req, PAY_STATUS_READY, PAY_STATUS_APPROVING):
+            payment_req.refresh_from_db(fields=['status'])
+            if payment_req.status == PAY_STATUS_SUCCESS:
+                return True, "결제가 완료되었습니다."
+            return False, "이미 처리된 결제 요청입니다."
+
         params = {
             "cid": f"{self.cid}",
             "tid": f"{payment_req.tid}",
@@ -108,54 +153,117 @@ class KakaoPayClient(object):
             "partner_user_id": f"{payment_req.username.pk}",    # 유저 아이디
             "pg_token": f"{pg_token}"
         }
-        params = json.dumps(params)
 
-        res = requests.post(
-            self.APPROVE_URL, headers=self.headers, data=params)
+        try:
+            res = self._post(self.APPROVE_URL, params)
+        except requests.RequestException as e:
+            if _request_not_sent(e):
+                # 요청이 전송되지 않았으므로 다시 승인할 수 있게 되돌린다
+                logger.warning(f'kakaopay approve request failed for payment {payment_req.pk}: {str(e)}')
+                self._transition(payment_req, PAY_STATUS_APPROVING, PAY_STATUS_READY)
+                return False, "결제 승인 요청에 실패했습니다."
+            # 승인 여부를 알 수 없으므로 승인 중 상태로 남기고, 주기 작업이 주문 조회로 확정한다
+            logger.error(f'kakaopay approve response lost for payment {payment_req.pk}: {str(e)}')
+            return False, "결제 승인 결과를 확인할 수 없습니다."
 
-        res_json = res.json()
+        try:
+            res_json = res.json()
+        except ValueError:
+            logger.error(f'kakaopay approve returned a non-JSON {res.status_code} response for payment {payment_req.pk}')
+            self._transition(payment_req, PAY_STATUS_APPROVING, PAY_STATUS_ERROR)
+            return False, "결제 승인 결과를 확인할 수 없습니다."
 
         if res.status_code == 200:
+            self._complete(payment_req, res_json)
+            return True, "결제가 완료되었습니다."
 
-            aid = res_json.get('aid')
-            payment_type = res_json.get('payment_method_type')
-            item_name = res_json.get('item_name')
-            quantity = res_json.get('quantity')
+        else:
+            extras = res_json.get('extras') or {}
+            message = extras.get('method_result_message')
 
-            amount = res_json.get('amount')
-            total_amount = amount.get('total')
-            tax_free_amount = amount.get('tax_free')
-            vat_amount = amount.get('vat')
+            self._transition(payment_req, PAY_STATUS_APPROVING, PAY_STATUS_ERROR)
 
-            card_info = amount.get('card_info')
+            return False, message
 
-            if not card_info == None:
-                card_info = str(card_info)
+    def _complete(self, payment_req, res_json):
+        # 승인 결과를 저장하고 크레딧을 지급한다 (승인 중 상태에서 한 번만)
+        aid = res_json.get('aid')
+        payment_type = res_json.get('payment_method_type')
+        item_name = res_json.get('item_name')
+        quantity = res_json.get('quantity')
 
-            ready_requested_at = res_json.get('created_at')
-            approved_at = res_json.get('approved_at')
+        amount = res_json.get('amount')
+        total_amount = amount.get('total')
+        tax_free_amount = amount.get('tax_free')
+        vat_amount = amount.get('vat')
 
-            with transaction.atomic():
-                KakaoPaymentApprovalResult.objects.create(aid=aid, quantity=quantity , payment_type=PAY_TYPE[payment_type], total_amount=total_amount, tax_free_amount=tax_free_amount,
-                                                             vat_amount=vat_amount, card_info=card_info, item_name=item_name, ready_requested_at=ready_requested_at, approved_at=approved_at, payment_request=payment_req)
+        card_info = res_json.get('card_info') or amount.get('card_info')
 
-                request_user = payment_req.username
-                user = User.objects.filter(username=request_user).first()
-                user.credits += quantity
+        if not card_info == None:
+            card_info = str(card_info)
 
-                # 결제가 완료되면 유저의 크레딧을 증가
-                # user.save()
+        ready_requested_at = res_json.get('created_at')
+        approved_at = res_json.get('approved_at')
 
-                payment_req.status = PAY_STATUS_SUCCESS
-                payment_req.save()
+        with transaction.atomic():
+            if not self._transition(payment_req, PAY_STATUS_APPROVING, PAY_STATUS_SUCCESS):
+                return False
 
-                return True, "결제가 완료되었습니다."
+            KakaoPaymentApprovalResult.objects.create(aid=aid, quantity=quantity , payment_type=PAY_TYPE[payment_type], total_amount=total_amount, tax_free_amount=tax_free_amount,
+                                                         vat_amount=vat_amount, card_info=card_info, item_name=item_name, ready_requested_at=ready_requested_at, approved_at=approved_at, payment_request=payment_req)
 
-        else:
-            extras = res_json.get('extras')
-            message = extras.get('method_result_message')
+            # 결제가 완료되면 유저의 크레딧을 증가 (결제 요청당 한 번만 반영)
+            credit(payment_req.username_id, quantity, CREDIT_REASON_CHARGE, f'kakaopay:{payment_req.pk}')
+        return True
 
-            payment_req.status = PAY_STATUS_ERROR
-            payment_req.save()
+    def fail(self, payment_req):
+        # 실패 콜백은 결제 준비 완료 상태에서만 반영한다 (늦게 도착해도 성공한 결제를 덮어쓰지 않는다)
+        return self._transition(payment_req, PAY_STATUS_READY, PAY_STATUS_FAIL)
 
-            return False, message
\ No newline at end of file
+    def order(self, payment_req):
+        # 카카오페이 주문 조회 (응답을 해석할 수 없으면 None)
+        res = self._post(self.ORDER_URL, {"cid": f"{self.cid}", "tid": f"{payment_req.tid}"})
+        if res.status_code != 200:
+            logger.warning(f'kakaopay order lookup returned {res.status_code} for payment {payment_req.pk}')
+            return None
+        try:
+            return res.json()
+        except ValueError:
+            logger.warning(f'kakaopay order lookup returned a non-JSON response for payment {payment_req.pk}')
+            return None
+
+    def reconcile(self, payment_req):
+        """
+        승인 응답을 받지 못해 승인 중으로 남은 결제를 주문 조회 결과로 확정한다.
+        바뀐 상태를 돌려주고, 아직 확정할 수 없으면 None 을 돌려준다.
+        """
+        try:
+            order = self.order(payment_req)
+        except requests.RequestException as e:
+            logger.warning(f'kakaopay order lookup failed for payment {payment_req.pk}: {str(e)}')
+            return None
+        if order is None:
+            return None
+
+        order_status = order.get('status')
+        if order_status == 'SUCCESS_PAYMENT':
+            payment = next((action for action in order.get('payment_action_details') or []
+                            if action.get('payment_action_type') == 'PAYMENT'), {})
+            approval = {
+                **order,
+                'aid': payment.get('aid'),
+                'approved_at': order.get('approved_at') or payment.get('approved_at'),
+                'card_info': order.get('selected_card_info'),
+            }
+            return PAY_STATUS_SUCCESS if self._complete(payment_req, approval) else None
+        if order_status in KAKAOPAY_ORDER_CANCELED_STATUSES:
+            to_status = PAY_STATUS_CANCEL
+        elif order_status in KAKAOPAY_ORDER_FAILED_STATUSES:
+            to_status = PAY_STATUS_FAIL
+        elif order_status in KAKAOPAY_ORDER_IN_PROGRESS_STATUSES:
+            # 승인 요청이 반영되지 않았으므로 다시 승인할 수 있게 되돌린다
+            to_status = PAY_STATUS_READY
+        else:
+            logger.warning(f'kakaopay order status {order_status} for payment {payment_req.pk} needs manual check')
+            return None
+        return to_status if self._transition(payment_req, PAY_STATUS_APPROVING, to_status) else None
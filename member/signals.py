@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from oauth.user_cache import invalidate_member
+from .models import Member
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_member_cache(sender, instance, **kwargs):
+    # 회원 정보가 바뀌거나 탈퇴하면 인증 캐시에 남은 회원 정보를 지운다
+    invalidate_member(instance.id)
@@ -0,0 +1,38 @@
+from config.celery import app
+from django.utils import timezone
+
+from .constants import MUSIC_VIDEO_CREDIT_COST, PAY_STATUS_APPROVING
+from .credits import refund
+from .models import KakaoPaymentRequest
+from .payment import KakaoPayClient
+
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 승인 요청 응답을 기다리는 시간보다 충분히 지난 결제만 확인한다
+APPROVING_RECONCILE_AFTER = timedelta(minutes=5)
+RECONCILE_BATCH_SIZE = 100
+
+
+@app.task
+def refund_music_video_credits(username, task_id):
+    # 뮤직비디오 생성 chord 가 실패하면 차감한 크레딧을 돌려준다 (task_id 기준으로 한 번만)
+    balance = refund(username, MUSIC_VIDEO_CREDIT_COST, task_id)
+    if balance is not None:
+        logger.info(f'refunded {MUSIC_VIDEO_CREDIT_COST} credits to {username} for failed task {task_id}')
+
+
+@app.task
+def reconcile_kakaopay_payments():
+    # 승인 응답을 받지 못해 승인 중으로 남은 결제를 카카오페이 주문 조회로 확정한다
+    cutoff = timezone.now() - APPROVING_RECONCILE_AFTER
+    payment_reqs = (KakaoPaymentRequest.objects.select_related('username')
+                    .filter(status=PAY_STATUS_APPROVING, updated_at__lt=cutoff)
+                    .order_by('updated_at')[:RECONCILE_BATCH_SIZE])
+    kakao_pay = KakaoPayClient()
+    for payment_req in payment_reqs:
+        status = kakao_pay.reconcile(payment_req)
+        if status is not None:
+            logger.info(f'reconciled kakaopay payment {payment_req.pk} to status {status}')
@@ -1,3 +1,52 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from member.constants import CREDIT_REASON_MUSIC_VIDEO, CREDIT_REASON_REFUND, MUSIC_VIDEO_CREDIT_COST
+from member.credits import InsufficientCredits, debit, refund
+from member.models import CreditLedger, Member
+
+
+class CreditConcurrencyTest(TransactionTestCase):
+    # 동시에 차감/환불해도 잔액이 음수가 되거나 갱신이 유실되지 않아야 한다 (credit_load_test 와 같은 시나리오)
+    balance = 200
+    requests = 30
+    workers = 10
+
+    def setUp(self):
+        self.member = Member.objects.create(username='credit-member', email='credit-member@example.com',
+                                            credits=self.balance)
+
+    def attempt(self, barrier, index):
+        try:
+            barrier.wait()
+            task_id = f'credit-test-{index}'
+            debit(self.member.username, MUSIC_VIDEO_CREDIT_COST, CREDIT_REASON_MUSIC_VIDEO, task_id)
+            # 일부 요청은 실패한 작업처럼 환불 (같은 환불을 두 번 요청해도 한 번만 반영되어야 한다)
+            if index % 5 == 0:
+                refund(self.member.username, MUSIC_VIDEO_CREDIT_COST, task_id)
+                refund(self.member.username, MUSIC_VIDEO_CREDIT_COST, task_id)
+                return 'refunded'
+            return 'debited'
+        except InsufficientCredits:
+            return 'rejected'
+        finally:
+            connection.close()
+
+    def test_parallel_debits_and_refunds_keep_balance_and_ledger_in_sync(self):
+        barrier = threading.Barrier(self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(lambda index: self.attempt(barrier, index), range(self.requests)))
+
+        debited = results.count('debited')
+        refunded = results.count('refunded')
+        self.member.refresh_from_db()
+        ledger = CreditLedger.objects.filter(username=self.member)
+        self.assertGreater(results.count('rejected'), 0)
+        self.assertEqual(self.member.credits, self.balance - debited * MUSIC_VIDEO_CREDIT_COST)
+        self.assertGreaterEqual(self.member.credits, 0)
+        self.assertEqual(self.balance + ledger.aggregate(total=Sum('amount'))['total'], self.member.credits)
+        self.assertEqual(ledger.filter(reason=CREDIT_REASON_REFUND).count(), refunded)
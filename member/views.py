@@ -16,6 +16,7 @@ from oauth.mixins import ApiAuthMixin, PublicApiMixin
 
 from .models import Member, Country
 from music_videos.s3_utils import upload_file_to_s3
+from music_videos.search_sync import mark_member_dirty
 from .serializers import MemberDetailSerializer, CountrySerializer, RegisterSerializer
 from .payment import KakaoPayClient
 
@@ -483,6 +484,7 @@ class MemberDetailView(ApiAuthMixin, APIView):
 
         if serializer.is_valid():
             serializer.save()
+            mark_member_dirty(member.username)
             response_data = {
                 "data": serializer.data,
                 "code": "A007",
@@ -531,6 +533,7 @@ class MemberDetailView(ApiAuthMixin, APIView):
         signup_path = user.profile.signup_path
 
         if signup_path == "kakao" or signup_path == "google":
+            mark_member_dirty(user.username)
             user.delete()
             response_data = {
                 "code": "A008",
@@ -545,6 +548,7 @@ class MemberDetailView(ApiAuthMixin, APIView):
                 _("passwords do not match")
             )
 
+        mark_member_dirty(user.username)
         user.delete()
         response_data = {
             "code": "A008",
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MusicVideosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'music_videos'
+
+    def ready(self):
+        from prometheus_client import REGISTRY
+        from .dispatcher import GenerationQueueCollector
+        from .rate_limits import ProviderQueueCollector
+
+        # 외부 생성 API / 생성 작업 대기열 길이를 /metrics 에 노출
+        REGISTRY.register(ProviderQueueCollector())
+        REGISTRY.register(GenerationQueueCollector())
@@ -0,0 +1,94 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from redis.exceptions import RedisError, ResponseError
+
+from config.redis_client import get_redis
+from .models import MusicVideo
+from .search_sync import mark_views_dirty
+
+logger = logging.getLogger(__name__)
+
+PENDING_VIEWS_KEY = 'mv:views:pending'
+FLUSHING_VIEWS_KEY = 'mv:views:flushing'
+FLUSH_LOCK_KEY = 'mv:views:flush:lock'
+FLUSH_CHUNK_SIZE = 500
+
+
+def incr_view(mv_id, count=1):
+    # 조회수는 Redis 에 누적한 뒤 주기적으로 MySQL 에 반영한다
+    try:
+        get_redis().hincrby(PENDING_VIEWS_KEY, mv_id, count)
+    except RedisError as e:
+        logger.warning(f'view counter buffer unavailable, writing through: {str(e)}')
+        MusicVideo.all_objects.filter(id=mv_id).update(views=F('views') + count)
+
+
+def get_pending_views(mv_ids):
+    # 아직 MySQL 에 반영되지 않은 조회수 (flush 진행 중인 값 포함)
+    mv_ids = list(mv_ids)
+    if not mv_ids:
+        return {}
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hmget(PENDING_VIEWS_KEY, mv_ids)
+        pipe.hmget(FLUSHING_VIEWS_KEY, mv_ids)
+        pending, flushing = pipe.execute()
+    except RedisError as e:
+        logger.warning(f'view counter buffer unavailable: {str(e)}')
+        return {}
+    return {
+        mv_id: int(a or 0) + int(b or 0)
+        for mv_id, a, b in zip(mv_ids, pending, flushing)
+    }
+
+
+def apply_pending_views(music_videos):
+    # 응답 직전에 대기 중인 조회수를 더해 실시간 값처럼 보이게 한다
+    music_videos = list(music_videos)
+    pending = get_pending_views(mv.id for mv in music_videos)
+    for music_video in music_videos:
+        music_video.views += pending.get(music_video.id, 0)
+    return music_videos
+
+
+def flush_pending_views():
+    # 누적된 조회수를 rename 으로 분리한 뒤 CASE 문으로 한 번에 반영한다
+    redis_client = get_redis()
+    # 실행이 겹치면 같은 FLUSHING 값을 두 번 반영하게 되므로 한 번에 하나만 진행한다
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=10 * 60)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        if not redis_client.exists(FLUSHING_VIEWS_KEY):
+            try:
+                redis_client.rename(PENDING_VIEWS_KEY, FLUSHING_VIEWS_KEY)
+            except ResponseError:
+                # 누적된 조회수가 없음
+                return 0
+
+        deltas = {int(mv_id): int(count) for mv_id, count in redis_client.hgetall(FLUSHING_VIEWS_KEY).items()}
+        items = list(deltas.items())
+        with transaction.atomic():
+            for i in range(0, len(items), FLUSH_CHUNK_SIZE):
+                chunk = items[i:i + FLUSH_CHUNK_SIZE]
+                delta = Case(
+                    *[When(id=mv_id, then=Value(count)) for mv_id, count in chunk],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+                MusicVideo.all_objects.filter(id__in=[mv_id for mv_id, _ in chunk]).update(views=F('views') + delta)
+            # 커밋 직후 바로 FLUSHING 을 지워, 반영된 값이 재시도나 다음 실행에서 다시 더해지지 않게 한다
+            # (롤백되면 FLUSHING 이 남아 다음 실행에서 그대로 다시 반영된다)
+            transaction.on_commit(lambda: _finish_flush(redis_client, deltas.keys()))
+    finally:
+        lock.release()
+    logger.info(f'flushed pending views for {len(items)} music videos')
+    return len(items)
+
+
+def _finish_flush(redis_client, mv_ids):
+    redis_client.delete(FLUSHING_VIEWS_KEY)
+    # 색인된 조회수(정렬 기준)도 함께 갱신한다 (검색 결과 캐시는 유지)
+    mark_views_dirty(*mv_ids)
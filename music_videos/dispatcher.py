@@ -0,0 +1,221 @@
+import json
+import logging
+import time
+
+from celery import signature
+from django.conf import settings
+from prometheus_client import Histogram
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+
+from config.celery import app
+from config.redis_client import get_redis
+from member.constants import CREDIT_REASON_CHARGE, MUSIC_VIDEO_CREDIT_COST
+from member.credits import refund
+from member.models import CreditLedger
+
+logger = logging.getLogger(__name__)
+
+# 뮤직비디오 생성 작업을 회원별 대기열에 넣고, 회원 사이를 돌아가며(round-robin) 하나씩 Celery 로 보낸다.
+# 회원마다 동시에 진행하는 작업 수를 제한해 한 회원의 대량 요청이 다른 회원의 작업을 밀어내지 않게 한다.
+PRIORITY_LANE = 'priority'
+NORMAL_LANE = 'normal'
+LANES = (PRIORITY_LANE, NORMAL_LANE)
+
+USER_QUEUE_KEY = 'dispatch:queue:{}:{}'
+# 대기 중인 작업이 있는 회원 순서 (list) 와 중복 방지용 set
+RING_KEY = 'dispatch:ring:{}'
+RING_MEMBERS_KEY = 'dispatch:ring:{}:members'
+# 진행 중인 작업 (score = 보낸 시각)
+INFLIGHT_KEY = 'dispatch:inflight'
+USER_INFLIGHT_KEY = 'dispatch:inflight:user:{}'
+INFLIGHT_OWNERS_KEY = 'dispatch:inflight:owners'
+PRIORITY_STREAK_KEY = 'dispatch:priority:streak'
+# 최근 대기 시간 기록 (부하 테스트/모니터링용)
+RECENT_WAITS_KEY = 'dispatch:waits'
+RECENT_WAITS_SIZE = 1000
+DISPATCH_LOCK_KEY = 'dispatch:lock'
+
+QUEUE_WAIT = Histogram(
+    'generation_queue_wait_seconds',
+    '뮤직비디오 생성 요청부터 작업 시작까지 대기 시간',
+    ['lane'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+
+
+def is_priority_member(username):
+    # 크레딧을 결제한 적이 있는 회원은 우선 처리
+    return CreditLedger.objects.filter(username_id=username, reason=CREDIT_REASON_CHARGE).exists()
+
+
+def _lock(redis_client):
+    return redis_client.lock(DISPATCH_LOCK_KEY, timeout=60, blocking_timeout=10)
+
+
+def _activate(redis_client, lane, username):
+    if redis_client.sadd(RING_MEMBERS_KEY.format(lane), username):
+        redis_client.rpush(RING_KEY.format(lane), username)
+
+
+def enqueue(username, task_id, job_signature, priority=False):
+    # 생성 작업(chord)을 회원 대기열에 넣는다 (task_id 는 미리 정해 둔 결과 id)
+    lane = PRIORITY_LANE if priority else NORMAL_LANE
+    job = json.dumps({
+        'task_id': task_id,
+        'username': username,
+        'lane': lane,
+        'enqueued_at': time.time(),
+        'signature': job_signature,
+    })
+    redis_client = get_redis()
+    with _lock(redis_client):
+        redis_client.rpush(USER_QUEUE_KEY.format(lane, username), job)
+        _activate(redis_client, lane, username)
+
+
+def _lane_order(redis_client):
+    # 우선 처리 작업이 연속으로 GENERATION_PRIORITY_WEIGHT 번 나가면 일반 작업에 한 번 차례를 준다
+    streak = int(redis_client.get(PRIORITY_STREAK_KEY) or 0)
+    if streak >= settings.GENERATION_PRIORITY_WEIGHT:
+        return NORMAL_LANE, PRIORITY_LANE
+    return PRIORITY_LANE, NORMAL_LANE
+
+
+def _next_job(redis_client, now):
+    for lane in _lane_order(redis_client):
+        ring_key = RING_KEY.format(lane)
+        for _ in range(redis_client.llen(ring_key)):
+            username = redis_client.lpop(ring_key)
+            if username is None:
+                break
+            queue_key = USER_QUEUE_KEY.format(lane, username)
+            inflight = redis_client.zcard(USER_INFLIGHT_KEY.format(username))
+            raw = redis_client.lpop(queue_key) if inflight < settings.GENERATION_USER_INFLIGHT_LIMIT else None
+            if raw is None:
+                # 한도에 걸린 회원은 진행 중인 작업이 끝날 때 release 가 다시 순서에 넣는다
+                redis_client.srem(RING_MEMBERS_KEY.format(lane), username)
+                continue
+            if redis_client.llen(queue_key) and inflight + 1 < settings.GENERATION_USER_INFLIGHT_LIMIT:
+                # 남은 작업이 있으면 맨 뒤로 보내 다른 회원에게 차례를 넘긴다
+                redis_client.rpush(ring_key, username)
+            else:
+                redis_client.srem(RING_MEMBERS_KEY.format(lane), username)
+
+            job = json.loads(raw)
+            pipe = redis_client.pipeline()
+            pipe.zadd(INFLIGHT_KEY, {job['task_id']: now})
+            pipe.zadd(USER_INFLIGHT_KEY.format(username), {job['task_id']: now})
+            pipe.expire(USER_INFLIGHT_KEY.format(username), settings.GENERATION_INFLIGHT_TIMEOUT)
+            pipe.hset(INFLIGHT_OWNERS_KEY, job['task_id'], username)
+            if lane == PRIORITY_LANE:
+                pipe.incr(PRIORITY_STREAK_KEY)
+            else:
+                pipe.set(PRIORITY_STREAK_KEY, 0)
+            pipe.lpush(RECENT_WAITS_KEY, json.dumps({'lane': lane, 'username': username, 'wait': now - job['enqueued_at']}))
+            pipe.ltrim(RECENT_WAITS_KEY, 0, RECENT_WAITS_SIZE - 1)
+            pipe.execute()
+            return job
+    return None
+
+
+def _send(job):
+    try:
+        signature(job['signature'], app=app).apply_async(task_id=job['task_id'])
+    except Exception as e:
+        logger.error(f'failed to dispatch generation job {job["task_id"]}: {str(e)}')
+        refund(job['username'], MUSIC_VIDEO_CREDIT_COST, job['task_id'])
+        _release(job['username'], job['task_id'])
+        return False
+    QUEUE_WAIT.labels(job['lane']).observe(time.time() - job['enqueued_at'])
+    return True
+
+
+def dispatch():
+    # 전체 동시 실행 한도 안에서 대기 중인 작업을 보낸다 (보낸 작업 수)
+    redis_client = get_redis()
+    jobs = []
+    with _lock(redis_client):
+        now = time.time()
+        while redis_client.zcard(INFLIGHT_KEY) < settings.GENERATION_MAX_INFLIGHT:
+            job = _next_job(redis_client, now)
+            if job is None:
+                break
+            jobs.append(job)
+    return sum(1 for job in jobs if _send(job))
+
+
+def _release(username, task_id):
+    redis_client = get_redis()
+    with _lock(redis_client):
+        pipe = redis_client.pipeline()
+        pipe.zrem(INFLIGHT_KEY, task_id)
+        pipe.zrem(USER_INFLIGHT_KEY.format(username), task_id)
+        pipe.hdel(INFLIGHT_OWNERS_KEY, task_id)
+        pipe.execute()
+        for lane in LANES:
+            if redis_client.llen(USER_QUEUE_KEY.format(lane, username)):
+                _activate(redis_client, lane, username)
+
+
+def release(username, task_id):
+    # 작업이 끝나면(성공/실패) 슬롯을 돌려주고 다음 작업을 보낸다
+    _release(username, task_id)
+    return dispatch()
+
+
+def release_stale():
+    # 완료 알림을 받지 못한 작업은 GENERATION_INFLIGHT_TIMEOUT 이 지나면 끝난 것으로 본다
+    redis_client = get_redis()
+    cutoff = time.time() - settings.GENERATION_INFLIGHT_TIMEOUT
+    stale = redis_client.zrangebyscore(INFLIGHT_KEY, '-inf', cutoff)
+    for task_id in stale:
+        username = redis_client.hget(INFLIGHT_OWNERS_KEY, task_id)
+        logger.warning(f'generation job {task_id} of {username} exceeded inflight timeout')
+        if username is None:
+            redis_client.zrem(INFLIGHT_KEY, task_id)
+        else:
+            _release(username, task_id)
+    return len(stale)
+
+
+def queue_depths():
+    # lane 별 (대기 중인 작업 수, 진행 중인 작업 수)
+    redis_client = get_redis()
+    depths = {}
+    for lane in LANES:
+        waiting = 0
+        for username in redis_client.smembers(RING_MEMBERS_KEY.format(lane)):
+            waiting += redis_client.llen(USER_QUEUE_KEY.format(lane, username))
+        depths[lane] = waiting
+    return depths, redis_client.zcard(INFLIGHT_KEY)
+
+
+def recent_waits():
+    return [json.loads(item) for item in get_redis().lrange(RECENT_WAITS_KEY, 0, -1)]
+
+
+class GenerationQueueCollector:
+    # /metrics 를 조회할 때마다 Redis 에서 대기열 길이를 읽는다
+    def _families(self):
+        return (
+            GaugeMetricFamily('generation_queue_waiting_jobs', '시작을 기다리는 뮤직비디오 생성 작업 수', labels=['lane']),
+            GaugeMetricFamily('generation_queue_inflight_jobs', '진행 중인 뮤직비디오 생성 작업 수'),
+        )
+
+    def describe(self):
+        # 등록할 때 collect() 가 불려 Redis 를 조회하지 않도록 메트릭 이름만 알린다
+        return self._families()
+
+    def collect(self):
+        try:
+            depths, inflight = queue_depths()
+        except RedisError as e:
+            logger.warning(f'generation queue depth unavailable: {str(e)}')
+            return
+        waiting, inflight_jobs = self._families()
+        for lane, depth in depths.items():
+            waiting.add_metric([lane], depth)
+        inflight_jobs.add_metric([], inflight)
+        yield waiting
+        yield inflight_jobs
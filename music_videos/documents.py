@@ -1,17 +1,33 @@
 from django_elasticsearch_dsl import Document, Index, fields
 from django_elasticsearch_dsl.registries import registry
 from .models import MusicVideo
+from .serializers import clean_lyrics
 
 # Define the Elasticsearch index
 music_video_index = Index('music_video')
 @music_video_index.doc_type
 class MusicVideoDocument(Document):
-    name = fields.TextField(
+    # 검색 목록 카드에 필요한 값을 모두 색인해 MySQL 조회 없이 응답을 만든다
+    subject = fields.TextField(
         analyzer='nori_analyzer',
         fields={
-            'raw': fields.KeywordField()
+            'raw': fields.KeywordField(),
+            # 검색어 자동 완성용 접두어(edge n-gram) 색인
+            'suggest': fields.TextField(analyzer='autocomplete_analyzer', search_analyzer='autocomplete_search_analyzer'),
         }
     )
+    username = fields.KeywordField()
+    member_name = fields.KeywordField()
+    profile_image = fields.KeywordField(index=False)
+    cover_image = fields.KeywordField(index=False)
+    mv_file = fields.KeywordField(index=False)
+    lyrics = fields.TextField(analyzer='nori_analyzer')
+    genres = fields.KeywordField(multi=True)
+    instruments = fields.KeywordField(multi=True)
+    style_name = fields.KeywordField()
+    language = fields.KeywordField()
+    vocal = fields.KeywordField()
+    tempo = fields.KeywordField()
 
     class Index:
         name = 'music_video'
@@ -23,11 +39,27 @@ class MusicVideoDocument(Document):
                     "nori_analyzer": {
                         "type": "custom",
                         "tokenizer": "nori_tokenizer"
+                    },
+                    "autocomplete_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "autocomplete_tokenizer",
+                        "filter": ["lowercase"]
+                    },
+                    "autocomplete_search_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "whitespace",
+                        "filter": ["lowercase"]
                     }
                 },
                 "tokenizer": {
                     "nori_tokenizer": {
                         "type": "nori_tokenizer"
+                    },
+                    "autocomplete_tokenizer": {
+                        "type": "edge_ngram",
+                        "min_gram": 1,
+                        "max_gram": 20,
+                        "token_chars": ["letter", "digit"]
                     }
                 }
             }
@@ -36,5 +68,34 @@ class MusicVideoDocument(Document):
         model = MusicVideo
         fields = [
             'id',
-            'subject',
-        ]
\ No newline at end of file
+            'length',
+            'views',
+            'created_at',
+        ]
+        queryset_pagination = 500
+
+    def get_queryset(self):
+        return (super().get_queryset()
+                .select_related('username', 'style_id')
+                .prefetch_related('genre_id', 'instrument_id'))
+
+    def prepare_username(self, instance):
+        return instance.username_id
+
+    def prepare_member_name(self, instance):
+        return instance.username.nickname
+
+    def prepare_profile_image(self, instance):
+        return instance.username.profile_image
+
+    def prepare_lyrics(self, instance):
+        return clean_lyrics(instance.lyrics)
+
+    def prepare_genres(self, instance):
+        return [genre.name for genre in instance.genre_id.all()]
+
+    def prepare_instruments(self, instance):
+        return [instrument.name for instrument in instance.instrument_id.all()]
+
+    def prepare_style_name(self, instance):
+        return instance.style_id.name if instance.style_id else None
@@ -0,0 +1,25 @@
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+VIEW_EVENTS_STREAM = 'mv:view-events'
+# 집계가 밀리더라도 스트림이 무한히 커지지 않도록 대략적인 길이를 제한
+VIEW_EVENTS_MAXLEN = 1000000
+
+
+def record_view_event(mv_id, username):
+    # 시청할 때마다 append-only 이벤트를 남기고 집계는 주기 작업에서 처리한다
+    try:
+        get_redis().xadd(
+            VIEW_EVENTS_STREAM,
+            {'mv_id': mv_id, 'username': username, 'ts': time.time()},
+            maxlen=VIEW_EVENTS_MAXLEN,
+            approximate=True,
+        )
+    except RedisError as e:
+        logger.warning(f'view event stream unavailable: {str(e)}')
@@ -0,0 +1,142 @@
+from datetime import datetime
+import logging
+
+from django.db.models import Case, When
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+from member.models import Member
+from .models import MusicVideo
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_FEED_KEY = 'feed:country:{}'
+AGE_FEED_KEY = 'feed:age:{}'
+REBUILD_CHUNK_SIZE = 5000
+
+
+def get_feed_keys(member):
+    # 제작자가 속한 국가/연령대 랭킹 키 목록
+    keys = []
+    if member.country_id:
+        keys.append(COUNTRY_FEED_KEY.format(member.country_id))
+    age_group = member.get_age_group()
+    if age_group is not None:
+        keys.append(AGE_FEED_KEY.format(age_group))
+    return keys
+
+
+def get_viewer_feed_key(user, sort):
+    # sort=countries / sort=ages 요청에 대응하는 랭킹 키
+    if sort == 'countries' and user.country_id:
+        return COUNTRY_FEED_KEY.format(user.country_id)
+    if sort == 'ages':
+        age_group = user.get_age_group()
+        if age_group is not None:
+            return AGE_FEED_KEY.format(age_group)
+    return None
+
+
+def add_music_video(music_video):
+    # 새 뮤직비디오를 조회수 0으로 랭킹에 등록
+    pipe = get_redis().pipeline(transaction=False)
+    for key in get_feed_keys(music_video.username):
+        pipe.zadd(key, {music_video.id: music_video.views}, nx=True)
+    _execute_quietly(pipe)
+
+
+def add_view(music_video, count=1):
+    # 조회가 발생할 때마다 제작자 그룹 랭킹의 점수를 증가
+    pipe = get_redis().pipeline(transaction=False)
+    for key in get_feed_keys(music_video.username):
+        pipe.zincrby(key, count, music_video.id)
+    _execute_quietly(pipe)
+
+
+def remove_music_video(music_video):
+    pipe = get_redis().pipeline(transaction=False)
+    for key in get_feed_keys(music_video.username):
+        pipe.zrem(key, music_video.id)
+    _execute_quietly(pipe)
+
+
+def _execute_quietly(pipe):
+    # 랭킹은 주기적으로 재생성되므로 Redis 장애가 요청 실패로 이어지지 않게 한다
+    try:
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f'demographic feed update failed: {str(e)}')
+
+
+def rebuild_feeds():
+    # 전체 뮤직비디오를 한 번 훑어 임시 키에 적재한 뒤 rename 으로 교체한다
+    redis_client = get_redis()
+    current_year = datetime.now().year
+    suffix = f':rebuild:{datetime.now().strftime("%Y%m%d%H%M%S")}'
+    built_keys = set()
+
+    rows = (MusicVideo.objects
+            .values_list('id', 'views', 'username__country', 'username__birthday')
+            .iterator(chunk_size=REBUILD_CHUNK_SIZE))
+
+    pipe = redis_client.pipeline(transaction=False)
+    pending = 0
+    for mv_id, views, country_id, birthday in rows:
+        keys = []
+        if country_id:
+            keys.append(COUNTRY_FEED_KEY.format(country_id))
+        if birthday:
+            age_group = Member(birthday=birthday).get_age_group(current_year)
+            keys.append(AGE_FEED_KEY.format(age_group))
+        for key in keys:
+            pipe.zadd(key + suffix, {mv_id: views})
+            built_keys.add(key)
+        pending += 1
+        if pending >= REBUILD_CHUNK_SIZE:
+            pipe.execute()
+            pending = 0
+    pipe.execute()
+
+    stale_keys = {key for pattern in ('feed:country:*', 'feed:age:*')
+                  for key in redis_client.scan_iter(match=pattern)
+                  if ':rebuild:' not in key} - built_keys
+
+    pipe = redis_client.pipeline(transaction=True)
+    for key in built_keys:
+        pipe.rename(key + suffix, key)
+    for key in stale_keys:
+        pipe.delete(key)
+    pipe.execute()
+    logger.info(f'demographic feeds rebuilt: {len(built_keys)} keys')
+
+
+class RankedMusicVideos:
+    """
+    Redis sorted set 에 저장된 랭킹을 Paginator 가 다룰 수 있는 목록으로 감싼다.
+    한 페이지에 해당하는 ID 만 읽어 MySQL 에서 조회한다.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = get_redis().zcard(self.key)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        if stop <= start:
+            return []
+        ids = [int(mv_id) for mv_id in get_redis().zrevrange(self.key, start, stop - 1)]
+        if not ids:
+            return []
+        preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(ids)])
+        return list(MusicVideo.objects.filter(id__in=ids).order_by(preserved_order))
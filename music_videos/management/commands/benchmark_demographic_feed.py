@@ -0,0 +1,140 @@
+from datetime import date
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from member.models import Country, Member
+from music_videos.feeds import RankedMusicVideos, get_viewer_feed_key, rebuild_feeds
+from music_videos.models import MusicVideo
+
+BULK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('임시 회원/뮤직비디오를 만들어 국가/연령대 정렬(sort=countries, sort=ages)을 '
+            '변경 전 MySQL 쿼리와 Redis 랭킹으로 조회할 때의 지연 시간과 쿼리 수를 비교합니다. '
+            '(실제 DB/Redis 에서 실행되며 끝나면 임시 데이터를 삭제하고 랭킹을 다시 만듭니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--videos', type=int, default=1000000, help='임시 뮤직비디오 수')
+        parser.add_argument('--members', type=int, default=100000, help='임시 회원 수')
+        parser.add_argument('--countries', type=int, default=20, help='임시 국가 수')
+        parser.add_argument('--size', type=int, default=10, help='페이지 크기')
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def orm_path(self, viewer, sort, page):
+        # 변경 전 MusicVideoView.get 의 처리 방식
+        queryset = MusicVideo.objects.all()
+        if sort == 'countries':
+            members = Member.objects.filter(country=viewer.country)
+        else:
+            current_year = date.today().year
+            age = current_year - viewer.birthday.year
+            if age < 20:
+                members = Member.objects.filter(birthday__year__gte=current_year - 19)
+            elif age < 30:
+                members = Member.objects.filter(birthday__year__gte=current_year - 29, birthday__year__lte=current_year - 20)
+            elif age < 40:
+                members = Member.objects.filter(birthday__year__gte=current_year - 39, birthday__year__lte=current_year - 30)
+            elif age < 50:
+                members = Member.objects.filter(birthday__year__gte=current_year - 49, birthday__year__lte=current_year - 40)
+            else:
+                members = Member.objects.filter(birthday__year__lte=current_year - 50)
+        queryset = queryset.filter(username__in=members).order_by('-views')
+        queryset.exists()
+        return list(Paginator(queryset, self.size).get_page(page))
+
+    def feed_path(self, viewer, sort, page):
+        ranked_music_videos = RankedMusicVideos(get_viewer_feed_key(viewer, sort))
+        ranked_music_videos.count()
+        return list(Paginator(ranked_music_videos, self.size).get_page(page))
+
+    def measure(self, label, func, *args):
+        timings = []
+        # 쿼리 로그는 9000개까지만 남으므로 매번 비우고 센다
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(self.runs):
+                started = time.perf_counter()
+                func(*args)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<24} p50 {statistics.median(timings):9.2f}ms  '
+            f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:9.2f}ms  '
+            f'mysql queries/run {len(queries) / self.runs:.1f}'
+        )
+
+    def create_data(self, prefix, options):
+        rng = random.Random(options['seed'])
+        countries = Country.objects.bulk_create(
+            [Country(name=f'{prefix}-{index}', code=prefix) for index in range(options['countries'])])
+        if not all(country.id for country in countries):
+            countries = list(Country.objects.filter(code=prefix))
+
+        today = date.today()
+        usernames = []
+        for start in range(0, options['members'], BULK_SIZE):
+            members = []
+            for index in range(start, min(start + BULK_SIZE, options['members'])):
+                username = f'{prefix}-{index}'
+                usernames.append(username)
+                members.append(Member(
+                    username=username, email=f'{username}@example.com', password='!',
+                    country=rng.choice(countries),
+                    birthday=date(today.year - rng.randint(12, 70), rng.randint(1, 12), rng.randint(1, 28)),
+                ))
+            Member.objects.bulk_create(members)
+
+        for start in range(0, options['videos'], BULK_SIZE):
+            MusicVideo.objects.bulk_create([
+                MusicVideo(
+                    username_id=rng.choice(usernames), subject=f'{prefix}-{index}', lyrics='', tempo='',
+                    language='', vocal='', length=0, cover_image='', mv_file='',
+                    views=int(rng.paretovariate(1.2)) - 1,
+                )
+                for index in range(start, min(start + BULK_SIZE, options['videos']))
+            ])
+        return Member.objects.select_related('country').get(username=usernames[0])
+
+    def delete_data(self, prefix):
+        while True:
+            ids = list(MusicVideo.all_objects.filter(username__username__startswith=f'{prefix}-')
+                       .values_list('id', flat=True)[:BULK_SIZE])
+            if not ids:
+                break
+            MusicVideo.all_objects.filter(id__in=ids).delete()
+        Member.objects.filter(username__startswith=f'{prefix}-').delete()
+        Country.objects.filter(code=prefix).delete()
+
+    def handle(self, *args, **options):
+        self.runs = max(options['runs'], 1)
+        self.size = options['size']
+        prefix = f'feed-benchmark-{uuid.uuid4().hex[:12]}'
+        try:
+            started = time.perf_counter()
+            viewer = self.create_data(prefix, options)
+            self.stdout.write(f'created {options["members"]} members, {options["videos"]} music videos '
+                              f'in {time.perf_counter() - started:.1f}s')
+
+            started = time.perf_counter()
+            rebuild_feeds()
+            self.stdout.write(f'rebuild_feeds {time.perf_counter() - started:.1f}s')
+
+            for sort in ('countries', 'ages'):
+                # 워밍업 (커넥션, 캐시)
+                self.orm_path(viewer, sort, 1)
+                self.feed_path(viewer, sort, 1)
+                for page in (1, 50):
+                    self.measure(f'{sort} page {page} mysql', self.orm_path, viewer, sort, page)
+                    self.measure(f'{sort} page {page} redis', self.feed_path, viewer, sort, page)
+        finally:
+            self.delete_data(prefix)
+            rebuild_feeds()
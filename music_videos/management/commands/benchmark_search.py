@@ -0,0 +1,128 @@
+import statistics
+import time
+import uuid
+
+from django.core.paginator import Paginator
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from elasticsearch_dsl.query import MultiMatch
+
+from member.models import Member
+from music_videos.counters import apply_pending_views
+from music_videos.documents import MusicVideoDocument
+from music_videos.models import (
+    Genre, Instrument, MusicVideo, MusicVideoGenre, MusicVideoInstrument, Style,
+)
+from music_videos.search import search_music_videos
+from music_videos.serializers import MusicVideoDetailSerializer
+
+BULK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = ('검색 응답을 만드는 두 경로(ES id -> MySQL 재조회 / ES 문서로 바로 응답)의 지연 시간과 쿼리 수를 비교합니다. '
+            '(--seed 를 주면 임시 뮤직비디오를 만들어 색인하고, 끝나면 색인과 함께 삭제합니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('query', help='검색어')
+        parser.add_argument('--sort', default=None)
+        parser.add_argument('--size', type=int, default=10)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0, help='검색어가 제목에 들어간 임시 뮤직비디오 수')
+
+    def es_ids(self, query):
+        search = MusicVideoDocument.search().query(MultiMatch(query=query, fields=['subject'], fuzziness='auto'))
+        return [hit.meta.id for hit in search.execute()]
+
+    def hydrate(self, music_video_ids, sort, size):
+        queryset = MusicVideo.objects.filter(id__in=music_video_ids)
+        if sort:
+            queryset = queryset.order_by(f'-{sort}')
+        queryset.exists()
+        paginated_queryset = Paginator(queryset, size).get_page(1)
+        return MusicVideoDetailSerializer(apply_pending_views(paginated_queryset), many=True).data
+
+    def mysql_path(self, query, sort, size):
+        # 변경 전 MusicVideoSearchView 의 처리 방식
+        return self.hydrate(self.es_ids(query), sort, size)
+
+    def es_path(self, query, sort, size):
+        return search_music_videos(query, sort, 1, size)[0]
+
+    def measure(self, label, func, *args):
+        timings = []
+        # 쿼리 로그는 9000개까지만 남으므로 매번 비우고 센다
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(self.runs):
+                started = time.perf_counter()
+                func(*args)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<9} p50 {statistics.median(timings):7.2f}ms  '
+            f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:7.2f}ms  '
+            f'mysql queries/run {len(queries) / self.runs:.1f}'
+        )
+
+    def create_data(self, prefix, query, count):
+        # 카드에 필요한 관계(작성자, 스타일, 장르, 악기)를 모두 채운 임시 뮤직비디오
+        member = Member.objects.create(username=prefix, email=f'{prefix}@example.com', nickname=prefix)
+        style = Style.objects.create(name=prefix)
+        genres = [Genre.objects.create(name=f'{prefix}-{index}') for index in range(2)]
+        instrument = Instrument.objects.create(name=prefix)
+        for start in range(0, count, BULK_SIZE):
+            music_videos = MusicVideo.objects.bulk_create([
+                MusicVideo(
+                    username=member, subject=f'{query} {prefix}-{index}', lyrics='', tempo='', language='',
+                    vocal='', length=0, cover_image='', mv_file='', style_id=style, views=index,
+                )
+                for index in range(start, min(start + BULK_SIZE, count))
+            ])
+            if not all(music_video.id for music_video in music_videos):
+                # MySQL 의 bulk_create 는 id 를 채우지 않는다
+                music_videos = list(MusicVideo.objects.filter(username=member).order_by('id')[start:start + BULK_SIZE])
+            MusicVideoGenre.objects.bulk_create([
+                MusicVideoGenre(music_video=music_video, genre=genre)
+                for music_video in music_videos for genre in genres
+            ])
+            MusicVideoInstrument.objects.bulk_create([
+                MusicVideoInstrument(music_video=music_video, instrument=instrument) for music_video in music_videos
+            ])
+        return MusicVideo.objects.filter(username=member)
+
+    def delete_data(self, prefix):
+        MusicVideo.all_objects.filter(username_id=prefix).delete()
+        Member.objects.filter(username=prefix).delete()
+        Style.objects.filter(name=prefix).delete()
+        Genre.objects.filter(name__startswith=f'{prefix}-').delete()
+        Instrument.objects.filter(name=prefix).delete()
+
+    def handle(self, *args, **options):
+        self.runs = max(options['runs'], 1)
+        query, sort, size = options['query'], options['sort'], options['size']
+        prefix = f'search-benchmark-{uuid.uuid4().hex[:12]}'
+        seeded = None
+        try:
+            if options['seed']:
+                seeded = self.create_data(prefix, query, options['seed'])
+                document = MusicVideoDocument()
+                document.update(document.get_queryset().filter(username_id=prefix).iterator(chunk_size=500), refresh=True)
+                self.stdout.write(f'indexed {options["seed"]} music videos')
+
+            # 워밍업 (커넥션, 캐시)
+            self.mysql_path(query, sort, size)
+            self.es_path(query, sort, size)
+
+            self.measure('mysql', self.mysql_path, query, sort, size)
+            # 변경 전 경로 중 MySQL 재조회만 (ES 가 돌려준 id 는 고정)
+            self.measure('mysql db', self.hydrate, self.es_ids(query), sort, size)
+            self.measure('es', self.es_path, query, sort, size)
+        finally:
+            try:
+                if seeded is not None:
+                    MusicVideoDocument().update(seeded.iterator(), refresh=True, action='delete', raise_on_error=False)
+            finally:
+                if options['seed']:
+                    self.delete_data(prefix)
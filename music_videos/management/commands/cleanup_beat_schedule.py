@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django_celery_beat.models import PeriodicTask
+
+from config.celery import app
+
+# beat_schedule 에서 빠졌지만 DatabaseScheduler 가 지우지 않고 남겨 두는 PeriodicTask 행
+# - rebuild_elasticsearch_index: 전체 재색인 대신 outbox 로 변경분만 색인 (sync-search-index-every-minute)
+# - reset-recently-viewed-every-week: compact-trending-scores-every-hour 로 이름과 주기가 바뀜
+STALE_PERIODIC_TASKS = (
+    'rebuild_elasticsearch_index',
+    'reset-recently-viewed-every-week',
+)
+
+
+class Command(BaseCommand):
+    help = ('config/celery.py 의 beat_schedule 에서 빠진 주기 작업을 django_celery_beat 에서 삭제합니다. '
+            '(배포 후 celery beat 를 재시작하기 전에 실행합니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='삭제할 행만 출력합니다.')
+
+    def handle(self, *args, **options):
+        # 이름이 남아 있는 행 + 더 이상 등록되지 않은 작업을 보내는 beat_schedule 밖의 행
+        # (celery.backend_cleanup 같은 beat 내장 작업은 등록된 작업이므로 남는다)
+        registered = set(app.tasks.keys())
+        stale = [
+            periodic_task for periodic_task in PeriodicTask.objects.exclude(name__in=app.conf.beat_schedule.keys())
+            if periodic_task.name in STALE_PERIODIC_TASKS or periodic_task.task not in registered
+        ]
+        for periodic_task in stale:
+            self.stdout.write(f'{periodic_task.name}: {periodic_task.task}')
+        if options['dry_run']:
+            self.stdout.write(f'{len(stale)} stale periodic tasks (dry run)')
+            return
+
+        with transaction.atomic():
+            PeriodicTask.objects.filter(id__in=[periodic_task.id for periodic_task in stale]).delete()
+        self.stdout.write(self.style.SUCCESS(f'deleted {len(stale)} stale periodic tasks'))
@@ -0,0 +1,62 @@
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from music_videos import dispatcher
+from music_videos.tasks import generation_probe
+
+
+class Command(BaseCommand):
+    help = ('여러 회원이 동시에 생성 요청을 몰아서 보낸 상황을 가짜 작업(generation_probe)으로 재현해 '
+            'lane/회원별 대기 시간을 출력합니다. (Celery 워커와 Redis 가 실행 중이어야 합니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='요청을 보내는 회원 수')
+        parser.add_argument('--jobs', type=int, default=5, help='회원당 요청 수')
+        parser.add_argument('--heavy-users', type=int, default=1, help='한 번에 --heavy-jobs 개를 보내는 회원 수')
+        parser.add_argument('--heavy-jobs', type=int, default=20)
+        parser.add_argument('--priority-users', type=int, default=2, help='우선 처리 lane 으로 보내는 회원 수')
+        parser.add_argument('--seconds', type=float, default=2.0, help='가짜 작업 하나의 실행 시간')
+        parser.add_argument('--timeout', type=int, default=30 * 60)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        expected = 0
+        for index in range(options['users'] + options['heavy_users']):
+            username = f'burst-{run_id}-{index}'
+            heavy = index >= options['users']
+            priority = not heavy and index < options['priority_users']
+            for _ in range(options['heavy_jobs'] if heavy else options['jobs']):
+                task_id = str(uuid.uuid4())
+                dispatcher.enqueue(username, task_id, generation_probe.si(options['seconds'], username, task_id),
+                                   priority=priority)
+                expected += 1
+        dispatcher.dispatch()
+        self.stdout.write(f'enqueued {expected} jobs (run {run_id})')
+
+        started = time.monotonic()
+        while True:
+            waits = [wait for wait in dispatcher.recent_waits() if wait['username'].startswith(f'burst-{run_id}-')]
+            depths, inflight = dispatcher.queue_depths()
+            if len(waits) >= expected and inflight == 0:
+                break
+            if time.monotonic() - started > options['timeout']:
+                raise CommandError(f'timed out: {len(waits)}/{expected} started, waiting {depths}, inflight {inflight}')
+            time.sleep(1)
+
+        for lane in dispatcher.LANES:
+            timings = sorted(wait['wait'] for wait in waits if wait['lane'] == lane)
+            if not timings:
+                continue
+            self.stdout.write(
+                f'{lane:<8} jobs {len(timings):4d}  p50 {statistics.median(timings):7.1f}s  '
+                f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:7.1f}s  max {timings[-1]:7.1f}s'
+            )
+        # 회원별 첫 작업의 대기 시간 (대량 요청 회원이 다른 회원의 첫 작업을 밀어내지 않아야 한다)
+        first_waits = {}
+        for wait in waits:
+            first_waits[wait['username']] = min(first_waits.get(wait['username'], wait['wait']), wait['wait'])
+        self.stdout.write(f'first job wait per user: max {max(first_waits.values()):.1f}s '
+                          f'mean {statistics.mean(first_waits.values()):.1f}s')
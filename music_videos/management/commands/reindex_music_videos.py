@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from elasticsearch.helpers import bulk
+
+from music_videos.documents import MusicVideoDocument
+from music_videos.models import MusicVideo
+from music_videos.search_sync import mark_dirty, sync_dirty
+
+
+class Command(BaseCommand):
+    help = ('새 인덱스에 전체 뮤직비디오를 색인한 뒤 alias 를 교체합니다. '
+            '매핑(스키마)이 바뀔 때만 사용하고, 평소 변경은 증분 색인으로 반영됩니다.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-old', action='store_true', help='교체된 이전 인덱스를 삭제하지 않습니다.')
+
+    def handle(self, *args, **options):
+        # 모듈의 music_video_index 에는 분석기 설정이 없으므로 Document.Index 설정이 반영된 인덱스를 복제한다
+        index = MusicVideoDocument._index
+        alias = index._name
+        document = MusicVideoDocument()
+        client = document._get_connection()
+        started_at = timezone.now()
+
+        new_index_name = f'{alias}_{datetime.now().strftime("%Y%m%d%H%M%S")}'
+        new_index = index.clone(name=new_index_name)
+        new_index.create()
+
+        # 분석기 없이 만들어진 인덱스로 alias 를 옮기면 검색/자동 완성이 깨지므로 교체 전에 확인한다
+        analyzers = (client.indices.get_settings(index=new_index_name)[new_index_name]['settings']['index']
+                     .get('analysis', {}).get('analyzer', {}))
+        missing = {'nori_analyzer', 'autocomplete_analyzer', 'autocomplete_search_analyzer'} - set(analyzers)
+        if missing:
+            client.indices.delete(index=new_index_name, ignore=[404])
+            raise CommandError(f'{new_index_name} was created without analyzers: {", ".join(sorted(missing))}')
+
+        def actions():
+            for music_video in document.get_indexing_queryset():
+                yield {
+                    '_op_type': 'index',
+                    '_index': new_index_name,
+                    '_id': document.generate_id(music_video),
+                    '_source': document.prepare(music_video),
+                }
+
+        indexed, _ = bulk(client, actions(), chunk_size=500)
+        client.indices.refresh(index=new_index_name)
+
+        # alias 교체는 한 번의 요청으로 원자적으로 처리되어 검색이 비는 구간이 없다
+        old_indices = list(client.indices.get_alias(name=alias).keys()) if client.indices.exists_alias(name=alias) else []
+        alias_actions = [{'remove': {'index': index, 'alias': alias}} for index in old_indices]
+        if not old_indices and client.indices.exists(index=alias):
+            # alias 도입 전의 실제 인덱스는 교체와 동시에 삭제한다
+            alias_actions.append({'remove_index': {'index': alias}})
+        alias_actions.append({'add': {'index': new_index_name, 'alias': alias}})
+        client.indices.update_aliases(body={'actions': alias_actions})
+
+        if not options['keep_old']:
+            for index in old_indices:
+                client.indices.delete(index=index, ignore=[404])
+
+        # 색인하는 동안 바뀐 뮤직비디오를 새 인덱스에 다시 반영한다
+        mark_dirty(*MusicVideo.all_objects.filter(updated_at__gte=started_at).values_list('id', flat=True))
+        sync_dirty()
+
+        self.stdout.write(self.style.SUCCESS(f'indexed {indexed} music videos into {new_index_name}'))
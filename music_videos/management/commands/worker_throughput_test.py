@@ -0,0 +1,36 @@
+import statistics
+import time
+
+from celery import group
+from django.core.management.base import BaseCommand
+
+from music_videos.tasks import worker_probe
+
+
+class Command(BaseCommand):
+    help = ('큐에 가짜 작업을 한꺼번에 보내 워커 종류별 처리량을 측정합니다. '
+            '예) polling 워커: --queue video_queue --kind io, render 워커: --queue final_queue --kind cpu '
+            '(해당 큐의 워커가 실행 중이어야 합니다)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', required=True)
+        parser.add_argument('--kind', choices=['io', 'cpu'], default='io')
+        parser.add_argument('--tasks', type=int, default=200)
+        parser.add_argument('--amount', type=float, default=None,
+                            help='io: 작업당 대기 시간(초, 기본 5), cpu: 반복 횟수(기본 5000000)')
+        parser.add_argument('--timeout', type=int, default=30 * 60)
+
+    def handle(self, *args, **options):
+        amount = options['amount'] or (5 if options['kind'] == 'io' else 5000000)
+        sent_at = time.time()
+        result = group(worker_probe.s(options['kind'], amount).set(queue=options['queue'])
+                       for _ in range(options['tasks'])).apply_async()
+        timings = result.get(timeout=options['timeout'], interval=0.5)
+        elapsed = max(finished for _, finished in timings) - sent_at
+        waits = sorted(started - sent_at for started, _ in timings)
+        self.stdout.write(
+            f'{options["queue"]} {options["kind"]} x{options["tasks"]}: '
+            f'{len(timings) / elapsed:.2f} tasks/s over {elapsed:.1f}s, '
+            f'queue wait p50 {statistics.median(waits):.1f}s max {waits[-1]:.1f}s'
+        )
+        result.forget()
@@ -90,4 +90,10 @@ class History(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    objects = MusicVideoManager()
\ No newline at end of file
+    objects = MusicVideoManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['username', 'mv_id'], name='unique_history_username_mv'),
+        ]
@@ -0,0 +1,121 @@
+from datetime import datetime, timezone as dt_timezone
+import logging
+import time
+
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+from .models import History
+
+logger = logging.getLogger(__name__)
+
+HISTORY_OWNER_KEY = 'history:owner:{}'
+POSITIONS_KEY = 'history:positions:{}'
+DIRTY_USERS_KEY = 'history:positions:dirty'
+HISTORY_OWNER_TTL = 24 * 60 * 60
+FLUSH_USER_BATCH = 200
+
+
+def cache_history_owner(history_id, username):
+    try:
+        get_redis().set(HISTORY_OWNER_KEY.format(history_id), username, ex=HISTORY_OWNER_TTL)
+    except RedisError as e:
+        logger.warning(f'history owner cache unavailable: {str(e)}')
+
+
+def get_history_owner(history_id):
+    # 소유자 확인을 위해 매번 History 행을 읽지 않도록 username 을 캐싱한다
+    try:
+        owner = get_redis().get(HISTORY_OWNER_KEY.format(history_id))
+        if owner is not None:
+            return owner
+    except RedisError as e:
+        logger.warning(f'history owner cache unavailable: {str(e)}')
+    owner = History.objects.filter(id=history_id).values_list('username', flat=True).first()
+    if owner is not None:
+        cache_history_owner(history_id, owner)
+    return owner
+
+
+def save_position(username, history_id, current_play_time):
+    # 마지막으로 받은 재생 위치만 남기고, 주기적으로 MySQL 에 반영한다
+    now = time.time()
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.hset(POSITIONS_KEY.format(username), history_id, f'{current_play_time}:{now}')
+        pipe.sadd(DIRTY_USERS_KEY, username)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f'playback buffer unavailable, writing through: {str(e)}')
+        History.objects.filter(id=history_id).update(
+            current_play_time=current_play_time,
+            updated_at=timezone.now(),
+        )
+
+
+def _parse_position(value):
+    # 형식이 깨진 값은 None (건너뛴다)
+    try:
+        play_time, updated_at = value.split(':')
+        return int(play_time), datetime.fromtimestamp(float(updated_at), tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        logger.warning(f'malformed buffered playback position: {value!r}')
+        return None
+
+
+def get_pending_positions(username):
+    # {history_id: (current_play_time, updated_at)}
+    try:
+        positions = get_redis().hgetall(POSITIONS_KEY.format(username))
+    except RedisError as e:
+        logger.warning(f'playback buffer unavailable: {str(e)}')
+        return {}
+    pending = {}
+    for history_id, value in positions.items():
+        position = _parse_position(value)
+        if position is not None and history_id.isdigit():
+            pending[int(history_id)] = position
+    return pending
+
+
+def flush_positions():
+    redis_client = get_redis()
+    usernames = list(redis_client.smembers(DIRTY_USERS_KEY))
+    flushed = 0
+
+    for i in range(0, len(usernames), FLUSH_USER_BATCH):
+        batch = usernames[i:i + FLUSH_USER_BATCH]
+        # 대기 목록 제거와 버퍼 읽기/삭제를 한 트랜잭션으로 묶어 그 사이의 갱신이 유실되지 않게 한다
+        pipe = redis_client.pipeline(transaction=True)
+        for username in batch:
+            pipe.srem(DIRTY_USERS_KEY, username)
+            pipe.hgetall(POSITIONS_KEY.format(username))
+            pipe.delete(POSITIONS_KEY.format(username))
+        results = pipe.execute()
+
+        buffered = {}
+        for username, positions in zip(batch, results[1::3]):
+            for history_id, value in positions.items():
+                if history_id.isdigit() and _parse_position(value) is not None:
+                    buffered[int(history_id)] = (username, value)
+
+        histories = list(History.objects.filter(id__in=buffered.keys()))
+        for history in histories:
+            history.current_play_time, history.updated_at = _parse_position(buffered[history.id][1])
+
+        try:
+            History.objects.bulk_update(histories, ['current_play_time', 'updated_at'], batch_size=500)
+        except Exception:
+            # 반영에 실패하면 더 최신 값이 들어오지 않은 항목만 버퍼에 되돌린다
+            pipe = redis_client.pipeline(transaction=False)
+            for history_id, (username, value) in buffered.items():
+                pipe.hsetnx(POSITIONS_KEY.format(username), history_id, value)
+                pipe.sadd(DIRTY_USERS_KEY, username)
+            pipe.execute()
+            raise
+        flushed += len(histories)
+
+    if flushed:
+        logger.info(f'flushed playback positions for {flushed} histories')
+    return flushed
@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from prometheus_client.core import GaugeMetricFamily
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BUCKET_KEY = 'ratelimit:{}:bucket'
+# 토큰을 미리 예약하고 차례를 기다리는 작업 (score = 제출할 수 있는 시각)
+RESERVATIONS_KEY = 'ratelimit:{}:reservations'
+PROVIDERS = ('runway', 'suno')
+
+# 토큰 버킷 (모든 워커가 공유)
+# 토큰이 없으면 음수로 빌려 다음 빈 시각을 예약하고 기다릴 시간(초)을 돌려준다.
+# 예약한 순서대로 차례가 오므로 대기 중인 작업이 한꺼번에 다시 몰리지 않는다.
+RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+local wait = 0
+if tokens < 0 then
+    wait = -tokens / rate
+    redis.call('ZADD', KEYS[2], now + wait, ARGV[4])
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local ttl = math.ceil((capacity - tokens) / rate) + 60
+redis.call('EXPIRE', KEYS[1], ttl)
+redis.call('EXPIRE', KEYS[2], ttl)
+return tostring(wait)
+"""
+
+_reserve_script = None
+
+
+def _limits(provider):
+    # (초당 토큰, 버킷 크기)
+    if provider == 'runway':
+        return settings.RUNWAY_RATE_LIMIT_PER_MINUTE / 60, settings.RUNWAY_RATE_LIMIT_BURST
+    return settings.SUNO_RATE_LIMIT_PER_MINUTE / 60, settings.SUNO_RATE_LIMIT_BURST
+
+
+def reserve(provider, job_id):
+    # 제출 슬롯을 하나 예약하고 기다려야 할 시간(초)을 돌려준다 (0 이면 바로 제출)
+    global _reserve_script
+    rate, capacity = _limits(provider)
+    try:
+        if _reserve_script is None:
+            _reserve_script = get_redis().register_script(RESERVE_SCRIPT)
+        wait = _reserve_script(keys=[TOKEN_BUCKET_KEY.format(provider), RESERVATIONS_KEY.format(provider)],
+                               args=[rate, capacity, time.time(), job_id])
+    except RedisError as e:
+        # Redis 장애 시에는 제한 없이 제출하고, 공급자의 429 응답으로 속도를 맞춘다
+        logger.warning(f'{provider} rate limiter unavailable: {str(e)}')
+        return 0
+    return float(wait)
+
+
+def queue_depth(provider):
+    # 예약한 차례를 기다리는 작업 수와 가장 늦은 예약까지 남은 시간(초)
+    now = time.time()
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zcount(RESERVATIONS_KEY.format(provider), now, '+inf')
+    pipe.zrange(RESERVATIONS_KEY.format(provider), -1, -1, withscores=True)
+    waiting, last = pipe.execute()
+    return waiting, max(last[0][1] - now, 0) if last else 0
+
+
+class ProviderQueueCollector:
+    # /metrics 를 조회할 때마다 Redis 에서 대기열 길이를 읽는다
+    def _families(self):
+        return (
+            GaugeMetricFamily('provider_queue_waiting_jobs', '외부 생성 API 제출을 기다리는 작업 수', labels=['provider']),
+            GaugeMetricFamily('provider_queue_delay_seconds', '가장 늦게 예약된 작업이 제출될 때까지 남은 시간', labels=['provider']),
+        )
+
+    def describe(self):
+        # 등록할 때 collect() 가 불려 Redis 를 조회하지 않도록 메트릭 이름만 알린다
+        return self._families()
+
+    def collect(self):
+        waiting, delay = self._families()
+        for provider in PROVIDERS:
+            try:
+                depth, wait = queue_depth(provider)
+            except RedisError as e:
+                logger.warning(f'{provider} queue depth unavailable: {str(e)}')
+                continue
+            waiting.add_metric([provider], depth)
+            delay.add_metric([provider], wait)
+        yield waiting
+        yield delay
@@ -24,3 +24,28 @@ def upload_file_to_s3(file, key, ExtraArgs):
         except Exception as e:
             print(f"error : {e}")
             return None
+
+
+def get_s3_client():
+    return boto3.client('s3', region_name=settings.AWS_S3_REGION_NAME,
+                        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY)
+
+
+def s3_key_from_url(url):
+    # upload_file_to_s3 가 돌려준 URL 에서 객체 키를 꺼낸다
+    prefix = f"https://{settings.AWS_S3_CUSTOM_DOMAIN}"
+    if not url.startswith(prefix):
+        raise ValueError(f'not an object in {settings.AWS_STORAGE_BUCKET_NAME}: {url}')
+    return url[len(prefix):]
+
+
+def get_object_size(s3, key):
+    return s3.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key)['ContentLength']
+
+
+def get_object_range(s3, key, begin, length):
+    # [begin, begin + length) 범위만 내려받는다
+    response = s3.get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=key,
+                             Range=f'bytes={begin}-{begin + length - 1}')
+    return response['Body'].read()
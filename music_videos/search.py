@@ -0,0 +1,221 @@
+from datetime import date, timedelta
+import base64
+import binascii
+import hashlib
+import json
+import math
+
+import logging
+
+from elasticsearch_dsl.query import Match, MatchAll, MultiMatch
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+from .counters import get_pending_views
+from .documents import MusicVideoDocument
+from .search_sync import SEARCH_GENERATION_KEY
+
+# sort 파라미터 -> Elasticsearch 정렬 (모두 내림차순, 기존 order_by(f'-{sort}') 와 동일)
+SEARCH_SORT_FIELDS = {
+    'id': 'id',
+    'views': 'views',
+    'created_at': 'created_at',
+    'length': 'length',
+    'subject': 'subject.raw',
+}
+# from/size 로 조회할 수 있는 최대 깊이 (index.max_result_window), 더 깊은 결과는 cursor(search_after) 로 조회
+MAX_RESULT_WINDOW = 10000
+# v2: 캐시에 대기 중인 조회수를 더하지 않은 값만 둔다 (이전 형식의 항목을 다시 읽어 중복으로 더하지 않도록)
+SEARCH_CACHE_KEY = 'search:result:v2:{}:{}'
+SEARCH_CACHE_TTL = 10 * 60
+POPULAR_QUERIES_KEY = 'search:popular:{}'
+POPULAR_QUERIES_TTL = 2 * 24 * 60 * 60
+WARM_TOP_N = 20
+SUGGEST_CACHE_KEY = 'search:suggest:{}:{}'
+# 자주 입력되는 접두어는 짧은 시간 동안 Redis 에서 바로 응답한다
+SUGGEST_CACHE_TTL = 60
+SUGGEST_MAX_SIZE = 10
+SUGGEST_MAX_LENGTH = 50
+CARD_FIELDS = [
+    'id', 'username', 'subject', 'cover_image', 'mv_file', 'lyrics', 'member_name', 'profile_image',
+    'length', 'views', 'genres', 'instruments', 'style_name', 'language', 'vocal', 'tempo',
+]
+
+logger = logging.getLogger(__name__)
+
+
+def build_search(mv_name=None, sort=None):
+    if mv_name:
+        query = MultiMatch(query=mv_name, fields=['subject'], fuzziness='auto')
+    else:
+        query = MatchAll()
+    search = MusicVideoDocument.search().query(query).source(CARD_FIELDS).extra(track_total_hits=True)
+    # 기본은 관련도순, id 를 마지막 정렬 기준으로 두어 페이지 사이의 순서가 고정되게 한다
+    primary = {SEARCH_SORT_FIELDS[sort]: {'order': 'desc'}} if sort else '_score'
+    return search.sort(primary, {'id': {'order': 'desc'}})
+
+
+def encode_cursor(sort_values):
+    return base64.urlsafe_b64encode(json.dumps(sort_values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    # 잘못된 cursor 는 ValueError
+    try:
+        sort_values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, UnicodeError, json.JSONDecodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+    if not isinstance(sort_values, list):
+        raise ValueError('cursor must be a list')
+    return sort_values
+
+
+def hits_to_cards(hits):
+    # 검색 결과를 MusicVideoDetailSerializer 와 같은 모양으로 변환한다 (views 는 색인된 값 그대로)
+    cards = [{field: hit.to_dict().get(field) for field in CARD_FIELDS} for hit in hits]
+    for card in cards:
+        card['genres'] = card['genres'] or []
+        card['instruments'] = card['instruments'] or []
+        card['views'] = card['views'] or 0
+    return cards
+
+
+def add_pending_views(cards, sort=None):
+    # 대기 중인 조회수를 더한다 (캐시된 결과도 응답할 때마다 더해야 조회수가 실시간으로 보인다)
+    pending = get_pending_views(card['id'] for card in cards)
+    cards = [dict(card, views=card['views'] + pending.get(card['id'], 0)) for card in cards]
+    if sort == 'views':
+        # 페이지 안의 순서도 더한 조회수 기준으로 맞춘다 (동률은 색인과 같이 id 내림차순)
+        cards.sort(key=lambda card: (card['views'], card['id']), reverse=True)
+    return cards
+
+
+def _next_cursor(hits, size):
+    if len(hits) < size:
+        return None
+    return encode_cursor(list(hits[-1].meta.sort))
+
+
+def _search_music_videos(mv_name, sort, page, size):
+    if page * size > MAX_RESULT_WINDOW:
+        raise ValueError('page is beyond max_result_window')
+    search = build_search(mv_name, sort)
+    response = search[(page - 1) * size:page * size].execute()
+    total = response.hits.total.value
+    last_page = max(math.ceil(total / size), 1)
+    if page > last_page:
+        page = last_page
+        response = search[(page - 1) * size:page * size].execute()
+    return hits_to_cards(response.hits), total, page, _next_cursor(response.hits, size)
+
+
+def search_music_videos(mv_name=None, sort=None, page=1, size=10):
+    # (cards, total, page, next_cursor) - 범위를 벗어난 page 는 Paginator.get_page 처럼 마지막 페이지로 맞춘다
+    cards, total, page, next_cursor = _search_music_videos(mv_name, sort, page, size)
+    return add_pending_views(cards, sort), total, page, next_cursor
+
+
+def search_music_videos_after(cursor, mv_name=None, sort=None, size=10):
+    # 깊이와 상관없이 일정한 비용으로 다음 결과를 조회한다 (search_after)
+    search = build_search(mv_name, sort).extra(search_after=decode_cursor(cursor), size=size)
+    response = search.execute()
+    cards = add_pending_views(hits_to_cards(response.hits), sort)
+    return cards, response.hits.total.value, _next_cursor(response.hits, size)
+
+
+def normalize_query(query):
+    # nori 분석기는 소문자 변환을 하지 않으므로 공백만 정리한다
+    return ' '.join((query or '').split())
+
+
+def suggest_music_videos(prefix, size=SUGGEST_MAX_SIZE):
+    # 입력 중인 검색어로 시작하는 뮤직비디오 제목 (fuzzy 검색 없이 edge n-gram 색인만 조회)
+    prefix = normalize_query(prefix).lower()[:SUGGEST_MAX_LENGTH]
+    if not prefix:
+        return []
+    cache_key = SUGGEST_CACHE_KEY.format(size, prefix)
+    try:
+        cached = get_redis().get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+    except RedisError as e:
+        logger.warning(f'suggest cache unavailable: {str(e)}')
+
+    search = (MusicVideoDocument.search()
+              .query(Match(**{'subject.suggest': {'query': prefix, 'operator': 'and'}}))
+              .source(['id', 'subject'])
+              .sort('_score', {'views': {'order': 'desc'}})
+              .extra(track_total_hits=False))[:size]
+    suggestions = [{'id': hit.id, 'subject': hit.subject} for hit in search.execute().hits]
+
+    try:
+        get_redis().set(cache_key, json.dumps(suggestions, ensure_ascii=False), ex=SUGGEST_CACHE_TTL)
+    except RedisError as e:
+        logger.warning(f'suggest cache unavailable: {str(e)}')
+    return suggestions
+
+
+def _search_cache_key(generation, mv_name, sort, page, size):
+    digest = hashlib.sha1(json.dumps([mv_name, sort, page, size], ensure_ascii=False).encode('utf-8')).hexdigest()
+    return SEARCH_CACHE_KEY.format(generation, digest)
+
+
+def cached_search_music_videos(mv_name=None, sort=None, page=1, size=10):
+    # 같은 검색어/정렬/페이지는 색인이 바뀌기 전까지 Elasticsearch 를 다시 조회하지 않는다
+    # 캐시에는 색인된 조회수만 두고, 대기 중인 조회수는 캐시 여부와 관계없이 응답할 때 더한다
+    mv_name = normalize_query(mv_name) or None
+    try:
+        redis_client = get_redis()
+        generation = redis_client.get(SEARCH_GENERATION_KEY) or 0
+        cache_key = _search_cache_key(generation, mv_name, sort, page, size)
+        cached = redis_client.get(cache_key)
+    except RedisError as e:
+        logger.warning(f'search cache unavailable: {str(e)}')
+        return search_music_videos(mv_name, sort, page, size)
+
+    if cached is not None:
+        cards, total, page, next_cursor = json.loads(cached)
+    else:
+        cards, total, page, next_cursor = _search_music_videos(mv_name, sort, page, size)
+        try:
+            redis_client.set(cache_key, json.dumps([cards, total, page, next_cursor], ensure_ascii=False, default=str),
+                             ex=SEARCH_CACHE_TTL)
+        except RedisError as e:
+            logger.warning(f'search cache unavailable: {str(e)}')
+    return add_pending_views(cards, sort), total, page, next_cursor
+
+
+def record_query(mv_name):
+    # 일별 검색어 빈도 (캐시 예열 대상 선정용)
+    mv_name = normalize_query(mv_name)
+    if not mv_name:
+        return
+    key = POPULAR_QUERIES_KEY.format(date.today().isoformat())
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zincrby(key, 1, mv_name)
+        pipe.expire(key, POPULAR_QUERIES_TTL)
+        pipe.execute()
+    except RedisError as e:
+        logger.warning(f'popular query log unavailable: {str(e)}')
+
+
+def popular_queries(limit=WARM_TOP_N):
+    # 오늘과 어제의 검색 빈도를 합산한 상위 검색어
+    today = date.today()
+    pipe = get_redis().pipeline(transaction=False)
+    for day in (today, today - timedelta(days=1)):
+        pipe.zrevrange(POPULAR_QUERIES_KEY.format(day.isoformat()), 0, limit - 1, withscores=True)
+    counts = {}
+    for queries in pipe.execute():
+        for query, score in queries:
+            counts[query] = counts.get(query, 0) + score
+    return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+
+def warm_search_cache(limit=WARM_TOP_N):
+    # 인기 검색어의 첫 페이지(관련도순)를 미리 캐싱한다
+    queries = popular_queries(limit)
+    for mv_name in queries:
+        cached_search_music_videos(mv_name)
+    return len(queries)
@@ -0,0 +1,79 @@
+import logging
+
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+from .documents import MusicVideoDocument
+from .models import MusicVideo
+
+logger = logging.getLogger(__name__)
+
+# 검색 색인에 반영해야 할 뮤직비디오 id (outbox)
+SEARCH_DIRTY_KEY = 'search:mv:dirty'
+# 조회수만 바뀐 뮤직비디오 id (검색 결과 캐시는 무효화하지 않고 TTL 로 갱신한다)
+SEARCH_VIEWS_DIRTY_KEY = 'search:mv:dirty:views'
+SYNC_BATCH_SIZE = 500
+# 내용(등록/수정/삭제)이 바뀐 문서가 색인될 때마다 증가시켜 이전 세대의 검색 결과 캐시를 한 번에 무효화한다
+SEARCH_GENERATION_KEY = 'search:generation'
+
+
+def mark_dirty(*mv_ids):
+    # 변경된 뮤직비디오 id 만 기록하고 색인은 주기 작업에서 bulk 로 반영한다
+    if not mv_ids:
+        return
+    try:
+        get_redis().sadd(SEARCH_DIRTY_KEY, *mv_ids)
+    except RedisError as e:
+        logger.warning(f'search outbox unavailable: {str(e)}')
+
+
+def mark_views_dirty(*mv_ids):
+    # 조회수 반영은 매분 일어나므로 검색 결과 캐시를 비우지 않는 별도 목록에 기록한다
+    if not mv_ids:
+        return
+    try:
+        get_redis().sadd(SEARCH_VIEWS_DIRTY_KEY, *mv_ids)
+    except RedisError as e:
+        logger.warning(f'search outbox unavailable: {str(e)}')
+
+
+def mark_member_dirty(username):
+    # 회원 닉네임/프로필 이미지가 바뀌거나 탈퇴하면 그 회원의 뮤직비디오 문서를 모두 다시 색인한다
+    mark_dirty(*MusicVideo.all_objects.filter(username=username).values_list('id', flat=True))
+
+
+def _sync_outbox(redis_client, document, key):
+    synced = 0
+    while True:
+        mv_ids = [int(mv_id) for mv_id in redis_client.spop(key, SYNC_BATCH_SIZE)]
+        if not mv_ids:
+            break
+        try:
+            music_videos = list(document.get_queryset().filter(id__in=mv_ids))
+            live_ids = {music_video.id for music_video in music_videos}
+            if music_videos:
+                document.update(music_videos)
+            # 삭제(soft delete)되었거나 사라진 뮤직비디오는 색인에서 제거한다
+            deleted = [MusicVideo(id=mv_id) for mv_id in mv_ids if mv_id not in live_ids]
+            if deleted:
+                document.update(deleted, action='delete', raise_on_error=False)
+        except Exception:
+            redis_client.sadd(key, *mv_ids)
+            raise
+        synced += len(mv_ids)
+    return synced
+
+
+def sync_dirty():
+    # 내용이 바뀌어 검색 결과 캐시를 새 세대로 넘긴 문서 수를 돌려준다
+    redis_client = get_redis()
+    document = MusicVideoDocument()
+
+    changed = _sync_outbox(redis_client, document, SEARCH_DIRTY_KEY)
+    if changed:
+        redis_client.incr(SEARCH_GENERATION_KEY)
+    views_synced = _sync_outbox(redis_client, document, SEARCH_VIEWS_DIRTY_KEY)
+
+    if changed or views_synced:
+        logger.info(f'synced {changed} changed and {views_synced} viewed music videos to search index')
+    return changed
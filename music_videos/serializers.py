@@ -4,6 +4,12 @@ from .models import MusicVideo, Genre, Instrument, History, Style
 from member.models import Member
 
 
+def clean_lyrics(lyrics):
+    lyrics = lyrics.replace("[Verse]<br />", "")
+    lyrics = lyrics.replace("[Outro]<br />", "")
+    lyrics = lyrics.replace("<br />[End]<br /><br />", "")
+    return lyrics
+
 
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
@@ -116,11 +122,7 @@ class MusicVideoDetailSerializer(serializers.ModelSerializer):
     def get_profile_image(self, obj):
         return obj.username.profile_image
     def get_lyrics(self, obj):
-        lyrics = obj.lyrics
-        lyrics = lyrics.replace("[Verse]<br />", "")
-        lyrics = lyrics.replace("[Outro]<br />", "")
-        lyrics = lyrics.replace("<br />[End]<br /><br />", "")
-        return lyrics
+        return clean_lyrics(obj.lyrics)
 
 class HistorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,12 +1,21 @@
 # tasks.py
 
-from music_videos.models import MusicVideo
 from config.celery import app
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from .serializers import MusicVideoSerializer
 from .s3_utils import upload_file_to_s3
+from .feeds import add_music_video, rebuild_feeds
+from .counters import flush_pending_views
+from . import trending
+from .playback import flush_positions
+from .search_sync import mark_dirty, sync_dirty
+from . import search
+from charts.snapshots import invalidate_snapshot
+from config.http_client import download_to_file, get_client
+from .rate_limits import reserve
+from . import dispatcher
 
 from datetime import datetime
 import json
@@ -24,18 +33,80 @@ import numpy as np
 User = get_user_model()
 
 logger = logging.getLogger(__name__)
+
+# 실패한 장면을 다시 생성할 최대 횟수 (넘기면 뮤직비디오 생성을 실패시키고 크레딧을 환불)
+RUNWAY_MAX_ATTEMPTS = 3
+
+
+def _retry_after(response, default):
+    try:
+        return float(response.headers.get('Retry-After', default))
+    except ValueError:
+        return default
 @app.task
 def hot_music_video_scheduled():
-    MusicVideo.objects.update(recently_viewed=0)
-    print("All MusicVideo recently_viewed columns have been reset to 0.")
-    logger.info("All MusicVideo recently_viewed columns have been reset to 0.")
+    # 인기 급상승 점수의 기준 시각을 옮기고 충분히 감쇠된 항목을 정리한다
+    trending.compact()
+
+@app.task
+def flush_view_counters():
+    flush_pending_views()
+
+@app.task
+def flush_playback_positions():
+    flush_positions()
+
+@app.task
+def refresh_demographic_feeds():
+    rebuild_feeds()
+
+@app.task
+def sync_search_index():
+    if sync_dirty():
+        warm_search_cache.delay()
+
+@app.task
+def warm_search_cache():
+    search.warm_search_cache()
 
 @app.task
-def rebuild_elasticsearch_index():
-    os.system('python manage.py search_index --rebuild -f')
+def release_generation_slot(username, task_id):
+    # 생성 chord 가 끝나면(성공/실패) 회원의 슬롯을 돌려주고 다음 작업을 보낸다
+    dispatcher.release(username, task_id)
+
+@app.task
+def dispatch_generation_jobs():
+    # 완료 알림을 놓친 슬롯을 정리하고 대기 중인 작업을 보낸다 (release 가 실패한 경우의 안전장치)
+    dispatcher.release_stale()
+    dispatcher.dispatch()
+
+@app.task
+def worker_probe(kind, amount):
+    # worker_throughput_test 가 보내는 가짜 작업: io 는 외부 API 대기처럼 잠들고, cpu 는 렌더링처럼 계산만 한다
+    started = time.time()
+    if kind == 'io':
+        time.sleep(amount)
+    else:
+        total = 0
+        for i in range(int(amount)):
+            total += i * i
+    return started, time.time()
+
+@app.task
+def generation_probe(seconds, username, task_id):
+    # generation_burst_test 가 보내는 가짜 생성 작업 (외부 API 를 호출하지 않고 시간만 보낸다)
+    time.sleep(seconds)
+    dispatcher.release(username, task_id)
+
+# 제출 속도 제한으로 기다리는 재시도는 실패가 아니므로 횟수를 제한하지 않는다
+@app.task(bind=True, queue='music_queue', max_retries=None)
+def suno_music(self, genre_names_str, instruments_str, tempo, vocal, lyrics, subject, reserved=False):
+    if not reserved:
+        # 모든 워커가 공유하는 토큰 버킷에서 제출 차례를 예약하고 기다린다
+        wait = reserve('suno', self.request.id)
+        if wait:
+            raise self.retry(kwargs={'reserved': True}, countdown=wait)
 
-@app.task(queue='music_queue')
-def suno_music(genre_names_str, instruments_str, tempo, vocal, lyrics, subject):
     url = "https://api.sunoapi.com/api/v1/suno/create"
     headers = {
         "Content-Type": "application/json",
@@ -48,7 +119,9 @@ def suno_music(genre_names_str, instruments_str, tempo, vocal, lyrics, subject):
         "title": subject
     }
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
+        response = get_client('suno').post(url, headers=headers, data=json.dumps(data))
+        if response.status_code == 429:
+            raise self.retry(kwargs={'reserved': False}, countdown=_retry_after(response, 60))
         response.raise_for_status()
     except requests.RequestException as e:
         print(f"Error creating Suno task: {e}")
@@ -72,7 +145,7 @@ def suno_music(genre_names_str, instruments_str, tempo, vocal, lyrics, subject):
             headers = {
                 "Authorization": f"Bearer {settings.SUNO_API_KEY}"
             }
-            response = requests.get(url, headers=headers)
+            response = get_client('suno').get(url, headers=headers)
             if response.status_code == 200:
                 result = response.json()
                 suno_status = result['data']['status']
@@ -102,12 +175,9 @@ def time_mirror(clip):
     duration_per_frame = 1 / clip.fps
     return clip.fl_time(lambda t: np.max(clip.duration - t - duration_per_frame, 0), keep_duration=True)
 def create_reversed_video_clip(url, clip_count, last_clip_size):
-    # URL에서 비디오 파일 다운로드
-    response = requests.get(url)
-
-    # 임시 파일에 비디오 데이터 저장
+    # URL에서 비디오 파일을 임시 파일로 나눠 받는다
     with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_video_file:
-        temp_video_file.write(response.content)
+        download_to_file(url, temp_video_file)
         temp_video_path = temp_video_file.name
 
     # 비디오 파일 로드
@@ -139,8 +209,22 @@ def create_reversed_video_clip(url, clip_count, last_clip_size):
 
 
 
-@app.task(queue='video_queue')
-def create_video(line, style):
+def _requeue_scene(task, attempt, reason):
+    # 실패한 장면은 버리지 않고 다시 제출한다 (장면이 빠진 뮤직비디오를 만들지 않도록 횟수를 넘기면 실패)
+    if attempt + 1 >= RUNWAY_MAX_ATTEMPTS:
+        return RuntimeError(f'runway scene failed after {attempt + 1} attempts: {reason}')
+    logger.warning(f'create video task {task.request.id} attempt {attempt + 1} failed, requeued: {reason}')
+    return task.retry(kwargs={'reserved': False, 'attempt': attempt + 1}, countdown=30 * 2 ** attempt, throw=False)
+
+
+@app.task(bind=True, queue='video_queue', max_retries=None)
+def create_video(self, line, style, reserved=False, attempt=0):
+    if not reserved:
+        # 모든 워커가 공유하는 토큰 버킷에서 제출 차례를 예약하고 기다린다
+        wait = reserve('runway', self.request.id)
+        if wait:
+            raise self.retry(kwargs={'reserved': True, 'attempt': attempt}, countdown=wait)
+
     url = "https://api.aivideoapi.com/runway/generate/text"
 
     payload = {
@@ -160,17 +244,16 @@ def create_video(line, style):
         "Authorization": settings.RUNWAYML_API_KEY
     }
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        data = response.json()
-        uuid = data['uuid']
-    except Exception as e:
-        logger.error(f'create video task error data : {data} error : {str(e)}')
-        try:
-            response = requests.post(url, json=payload, headers=headers)
-            uuid = response.json()['uuid']
-        except Exception as e:
-            logger.error(f'create video task error data : {data} error : {str(e)}')
-            return False
+        response = get_client('runway').post(url, json=payload, headers=headers)
+    except requests.RequestException as e:
+        raise _requeue_scene(self, attempt, str(e))
+    if response.status_code == 429:
+        # 공급자 한도 초과는 실패 횟수로 세지 않고 차례를 다시 예약한다
+        raise self.retry(kwargs={'reserved': False, 'attempt': attempt}, countdown=_retry_after(response, 60))
+    try:
+        uuid = response.json()['uuid']
+    except (ValueError, KeyError):
+        raise _requeue_scene(self, attempt, f'{response.status_code} {response.text[:200]}')
 
     url = f"https://api.aivideoapi.com/status?uuid={uuid}"
 
@@ -188,17 +271,18 @@ def create_video(line, style):
         elapsed_time += polling_interval
 
         if elapsed_time > timeout:
-            return {"error": "Polling timeout exceeded 30 minutes"}
+            raise _requeue_scene(self, attempt, 'polling timeout exceeded 30 minutes')
         try:
-            response = requests.get(url, headers=headers).json()
-            if (response['status'] == 'success'):
-                break
-            elif(response['status'] == 'failed'):
-                return False
-        except Exception as e:
-            logger.error(f'create video task error data : {response.json()} error : {str(e)}')
-            return False
-    return response['url']
+            result = get_client('runway').get(url, headers=headers).json()
+        except (requests.RequestException, ValueError) as e:
+            # 상태 조회 실패는 다음 주기에 다시 조회한다
+            logger.warning(f'create video task {self.request.id} status check failed: {str(e)}')
+            continue
+        if (result.get('status') == 'success'):
+            break
+        elif(result.get('status') == 'failed'):
+            raise _requeue_scene(self, attempt, f'generation failed: {result}')
+    return result['url']
 
 
 
@@ -228,9 +312,8 @@ def mv_create(results, client_ip, current_time, subject, language, vocal, lyrics
 
     # Function to download an audio file from a URL
     def download_audio(url, filename):
-        response = requests.get(url)
         with open(filename, 'wb') as f:
-            f.write(response.content)
+            download_to_file(url, f)
 
     # Temporary filename for the downloaded audio file
     audio_filename = f'temp_audio_{timestamp}.mp3'
@@ -287,12 +370,15 @@ def mv_create(results, client_ip, current_time, subject, language, vocal, lyrics
         serializer = MusicVideoSerializer(data=data)
 
         if serializer.is_valid():
-            serializer.save()
+            music_video = serializer.save()
+            add_music_video(music_video)
+            mark_dirty(music_video.id)
+            invalidate_snapshot(music_video.username_id)
             logging.info(f'INFO {client_ip} {current_time} POST /music_videos 201 music_video created')
             return
-        return False
+        # 실패로 끝나야 chord 의 on_error 로 크레딧이 환불된다
+        raise ValueError(f'music video data is invalid: {serializer.errors}')
     else:
         os.remove(audio_filename)
         os.remove(video_filename)
-        print("유효한 이미지가 없어 비디오를 생성할 수 없습니다.")
-        return
\ No newline at end of file
+        raise ValueError("유효한 이미지가 없어 비디오를 생성할 수 없습니다.")
\ No newline at end of file
@@ -1,3 +1,41 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import threading
 
-# Create your tests here.
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from member.models import Member
+from music_videos.models import History, MusicVideo
+from music_videos.views import HistoryCreateView
+
+
+class HistoryCreateConcurrencyTest(TransactionTestCase):
+    # 같은 회원의 시청 기록 등록 요청이 동시에 들어와도 (username, mv_id) 당 한 행만 생겨야 한다
+    workers = 8
+
+    def setUp(self):
+        self.creator = Member.objects.create(username='history-creator', email='history-creator@example.com')
+        self.viewer = Member.objects.create(username='history-viewer', email='history-viewer@example.com')
+        self.music_video = MusicVideo.objects.create(
+            username=self.creator, subject='concurrent history', lyrics='', tempo='', language='', vocal='',
+            length=0, cover_image='', mv_file='',
+        )
+
+    def create_history(self, barrier):
+        try:
+            request = APIRequestFactory().post(f'/music-videos/histories/create/{self.music_video.id}')
+            force_authenticate(request, user=self.viewer)
+            barrier.wait()
+            return HistoryCreateView.as_view()(request, mv_id=self.music_video.id).status_code
+        finally:
+            connection.close()
+
+    def test_parallel_history_writes_create_one_row(self):
+        barrier = threading.Barrier(self.workers)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            statuses = list(executor.map(lambda _: self.create_history(barrier), range(self.workers)))
+
+        self.assertEqual(History.all_objects.filter(username=self.viewer, mv_id=self.music_video).count(), 1)
+        # 나머지 요청은 409 (SQLite 테스트 DB 에서는 쓰기 잠금 때문에 500 이 섞일 수 있다)
+        self.assertEqual(statuses.count(201), 1)
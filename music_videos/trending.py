@@ -0,0 +1,77 @@
+import logging
+import math
+import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+TRENDING_KEY = 'mv:trending'
+TRENDING_EPOCH_KEY = 'mv:trending:epoch'
+# 점수가 이 값 아래로 감쇠된 뮤직비디오는 압축 시 제거
+MIN_TRENDING_SCORE = 0.01
+
+# forward decay: 조회 시점 t 의 가중치를 exp(rate * (t - epoch)) 로 적립하면
+# 모든 점수에 공통 계수 exp(-rate * (now - epoch)) 만 곱하면 되므로 순위 비교에는 감쇠 계산이 필요 없다.
+ADD_VIEW_SCRIPT = """
+local epoch = redis.call('GET', KEYS[2])
+if not epoch then
+    redis.call('SET', KEYS[2], ARGV[1])
+    epoch = ARGV[1]
+end
+local score = tonumber(ARGV[3]) * math.exp(tonumber(ARGV[2]) * (tonumber(ARGV[1]) - tonumber(epoch)))
+return redis.call('ZINCRBY', KEYS[1], string.format('%.17g', score), ARGV[4])
+"""
+
+# epoch 를 현재 시각으로 옮기면서 모든 점수를 한 번에 감쇠시키고 작은 점수는 정리한다
+COMPACT_SCRIPT = """
+local epoch = redis.call('GET', KEYS[2])
+if epoch then
+    local factor = math.exp(-tonumber(ARGV[2]) * (tonumber(ARGV[1]) - tonumber(epoch)))
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', string.format('%.17g', factor))
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[3])
+end
+redis.call('SET', KEYS[2], ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+_scripts = {}
+
+
+def _get_script(name, source):
+    if name not in _scripts:
+        _scripts[name] = get_redis().register_script(source)
+    return _scripts[name]
+
+
+def _decay_rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def add_view(mv_id, count=1):
+    try:
+        _get_script('add_view', ADD_VIEW_SCRIPT)(
+            keys=[TRENDING_KEY, TRENDING_EPOCH_KEY],
+            args=[time.time(), _decay_rate(), count, mv_id],
+        )
+    except RedisError as e:
+        logger.warning(f'trending score update failed: {str(e)}')
+
+
+def remove_music_video(mv_id):
+    try:
+        get_redis().zrem(TRENDING_KEY, mv_id)
+    except RedisError as e:
+        logger.warning(f'trending score removal failed: {str(e)}')
+
+
+def compact():
+    remaining = _get_script('compact', COMPACT_SCRIPT)(
+        keys=[TRENDING_KEY, TRENDING_EPOCH_KEY],
+        args=[time.time(), _decay_rate(), MIN_TRENDING_SCORE],
+    )
+    logger.info(f'trending scores compacted: {remaining} music videos remain')
+    return remaining
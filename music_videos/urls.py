@@ -10,6 +10,7 @@ urlpatterns = [
     path('/status/<str:task_id>', views.MusicVideoStatusView.as_view(), name='music-video-status'),
     path('/<int:mv_id>', views.MusicVideoManageView.as_view(), name='music-video-detail'),
     path('/searches', views.MusicVideoSearchView.as_view(), name='music-video-search'),
+    path('/searches/suggest', views.MusicVideoSuggestView.as_view(), name='music-video-suggest'),
     path('/genres', views.GenreListView.as_view(), name='genres-list'),
     path('/instruments', views.InstrumentListView.as_view(), name='instruments-list'),
     path('/styles', views.StyleListView.as_view(), name='styles-list'),
@@ -11,28 +11,46 @@ from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 
 from member.models import Member
+from member.constants import CREDIT_REASON_MUSIC_VIDEO, MUSIC_VIDEO_CREDIT_COST
+from member.credits import InsufficientCredits, debit, refund
+from member.tasks import refund_music_video_credits
 from .models import Genre, Instrument, MusicVideo, History, Style
 from .serializers import GenreSerializer, InstrumentSerializer, MusicVideoDetailSerializer, MusicVideoDeleteSerializer, StyleSerializer, CoverImageSerializer
 
-from .tasks import suno_music, create_video, mv_create
+from .tasks import suno_music, create_video, mv_create, release_generation_slot
+from . import dispatcher
+from .counters import apply_pending_views, incr_view
+from .feeds import RankedMusicVideos, add_music_video, add_view, get_viewer_feed_key, remove_music_video
+from . import trending
+from .events import record_view_event
+from .search_sync import mark_dirty
+from .playback import cache_history_owner, get_history_owner, get_pending_positions, save_position
+from charts.snapshots import apply_view as apply_chart_view, invalidate_snapshot
+from charts.audience import record_viewer
+from redis.exceptions import RedisError
 from celery import group, chord
+from celery.utils import uuid
 from celery.result import AsyncResult
 
 from datetime import datetime
 import logging
+import math
 import openai
 import re
 import json
+from django.db import transaction
 from django.db.models import Case, When, Q
 
-from elasticsearch_dsl.query import MultiMatch
-from .documents import MusicVideoDocument
-from oauth.mixins import ApiAuthMixin, PublicApiMixin
+from .search import (
+    SEARCH_SORT_FIELDS, SUGGEST_MAX_SIZE, cached_search_music_videos, record_query,
+    search_music_videos_after, suggest_music_videos,
+)
+from oauth.mixins import ApiAuthMixin, LazyUserAuthMixin, PublicApiMixin
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
-class CreateLyricsView(ApiAuthMixin, APIView):
+class CreateLyricsView(LazyUserAuthMixin, APIView):
     @swagger_auto_schema(
         operation_summary="가사 생성 API",
         operation_description="이 API는 가사를 생성하는 데 사용됩니다.",
@@ -239,15 +257,6 @@ class MusicVideoView(ApiAuthMixin, APIView):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
             # Request Parameter 값 가져오기
-            user = request.user
-            if(user.credits<20):
-                response_data = {
-                    "code": "M002_3",
-                    "status": 400,
-                    "message": "크레딧이 부족합니다."
-                }
-                logger.error(f'{client_ip} POST /music-videos 400 not enough credits')
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
             username = request.user.username
             subject = request.data['subject']
             vocal = request.data['vocal']
@@ -291,16 +300,39 @@ class MusicVideoView(ApiAuthMixin, APIView):
                 create_video.s(line, style_name) for line in lyrics_eng
             )
 
-            # 뮤직비디오 생성 task
-            music_video_task = chord(
-                header=[music_task] + video_tasks.tasks,
-                body=mv_create.s(client_ip, current_time, subject, language, vocal, lyrics, genres_ids, instruments_ids,
-                                 tempo, username, style_id)
-            )
-            task_id = music_video_task.apply_async().id
+            # 크레딧 차감 (잔액 확인과 차감을 한 번의 UPDATE 로 처리해 동시 요청에서도 초과 사용되지 않는다)
+            task_id = uuid()
+            try:
+                debit(username, MUSIC_VIDEO_CREDIT_COST, CREDIT_REASON_MUSIC_VIDEO, task_id)
+            except InsufficientCredits:
+                response_data = {
+                    "code": "M002_3",
+                    "status": 400,
+                    "message": "크레딧이 부족합니다."
+                }
+                logger.error(f'{client_ip} POST /music-videos 400 not enough credits')
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
-            user.credits -= 20
-            user.save()
+            # 뮤직비디오 생성 task (실패하면 차감한 크레딧을 환불, 끝나면 회원의 생성 슬롯을 반환)
+            body = mv_create.s(client_ip, current_time, subject, language, vocal, lyrics, genres_ids, instruments_ids,
+                               tempo, username, style_id)
+            body.link(release_generation_slot.si(username, task_id))
+            body.on_error(refund_music_video_credits.si(username, task_id))
+            body.on_error(release_generation_slot.si(username, task_id))
+            music_video_task = chord(header=[music_task] + video_tasks.tasks, body=body)
+
+            # 회원별 대기열에 넣고 차례가 되면 dispatcher 가 task_id 로 실행한다
+            try:
+                dispatcher.enqueue(username, task_id, music_video_task,
+                                   priority=dispatcher.is_priority_member(username))
+            except Exception:
+                refund(username, MUSIC_VIDEO_CREDIT_COST, task_id)
+                raise
+            try:
+                dispatcher.dispatch()
+            except RedisError as e:
+                # 대기열에는 들어갔으므로 dispatch_generation_jobs 가 이어서 보낸다
+                logger.warning(f'{client_ip} POST /music-videos dispatch deferred: {str(e)}')
 
             response_data = {
                 "code": "M002",
@@ -421,8 +453,41 @@ class MusicVideoView(ApiAuthMixin, APIView):
             message = f'사용자 뮤직비디오 정보 조회 성공'
         # 정렬
         sort = request.query_params.get('sort', None)
-
-        if sort:
+        ranked_music_videos = None
+
+        if sort == 'recently_viewed':
+            # 주간 초기화 방식의 recently_viewed 는 감쇠 점수 기반 trending 으로 대체되었다
+            sort = 'trending'
+
+        if sort == 'trending':
+            if not username:
+                try:
+                    ranked_music_videos = RankedMusicVideos(trending.TRENDING_KEY)
+                    if not ranked_music_videos.count():
+                        ranked_music_videos = None
+                except RedisError as e:
+                    logger.warning(f'{client_ip} GET /music-videos trending unavailable {str(e)}')
+                    ranked_music_videos = None
+            if ranked_music_videos is None:
+                # 순위가 비어 있거나 멤버로 필터링된 경우 조회수 순으로 대체
+                sort = 'views'
+            else:
+                message = "뮤직비디오 trending순 정보 조회 성공"
+        elif sort in ('countries', 'ages') and not username:
+            # 백그라운드에서 미리 계산된 국가/연령대 랭킹 사용
+            feed_key = get_viewer_feed_key(user, sort)
+            if feed_key:
+                try:
+                    ranked_music_videos = RankedMusicVideos(feed_key)
+                    if not ranked_music_videos.count():
+                        ranked_music_videos = None
+                except RedisError as e:
+                    logger.warning(f'{client_ip} GET /music-videos feed unavailable {str(e)}')
+                    ranked_music_videos = None
+
+        if ranked_music_videos is not None:
+            queryset = ranked_music_videos
+        elif sort:
             if sort == 'countries':
                 country = user.country
                 members = Member.objects.filter(country=country)
@@ -449,7 +514,7 @@ class MusicVideoView(ApiAuthMixin, APIView):
                 message = f"뮤직비디오 {sort}순 정보 조회 성공"
 
         # 결과가 없는 경우 처리
-        if not queryset.exists():
+        if ranked_music_videos is None and not queryset.exists():
             response_data = {
                 "code": "M001_1",
                 "status": 404,
@@ -464,7 +529,7 @@ class MusicVideoView(ApiAuthMixin, APIView):
         paginator = Paginator(queryset, size)
         paginated_queryset = paginator.get_page(page)
 
-        serializer = MusicVideoDetailSerializer(paginated_queryset, many=True)
+        serializer = MusicVideoDetailSerializer(apply_pending_views(paginated_queryset), many=True)
 
         response_data = {
             "music_videos": serializer.data,
@@ -605,6 +670,9 @@ class MusicVideoDevelopView(APIView):
             # ManyToMany 필드 추가
             music_video.genre_id.set(genres)
             music_video.instrument_id.set(instruments)
+            add_music_video(music_video)
+            mark_dirty(music_video.id)
+            invalidate_snapshot(music_video.username_id)
 
             response_data = {
                 "code": "M002",
@@ -692,6 +760,7 @@ class MusicVideoManageView(ApiAuthMixin, APIView):
             logger.warning(f'{client_ip} GET /music-videos/{mv_id} 404 does not existing')
             return Response(response_data, status=404)
 
+        apply_pending_views([music_video])
         serializer = MusicVideoDetailSerializer(music_video)
         response_data = {
             "data": serializer.data,
@@ -746,7 +815,11 @@ class MusicVideoManageView(ApiAuthMixin, APIView):
             logger.warning(f'{client_ip} PATCH /music-videos/{mv_id} 404 does not existing')
             return Response(response_data, status=404)
         music_video.is_deleted = True
-        music_video.save()
+        music_video.save(update_fields=['is_deleted', 'updated_at'])
+        remove_music_video(music_video)
+        trending.remove_music_video(music_video.id)
+        mark_dirty(music_video.id)
+        invalidate_snapshot(music_video.username_id)
         serializer = MusicVideoDeleteSerializer(music_video)
         response_data = {
             "code": "M004",
@@ -1044,7 +1117,7 @@ class HistoryCreateView(ApiAuthMixin, APIView):
         member = request.user
 
         try:
-            mv = MusicVideo.objects.get(id=mv_id)
+            mv = MusicVideo.objects.select_related('username').get(id=mv_id)
         except MusicVideo.DoesNotExist:
             response_data = {
                 "code": "M008_2",
@@ -1054,7 +1127,7 @@ class HistoryCreateView(ApiAuthMixin, APIView):
             logger.warning(f'{client_ip} POST /music-videos/histories/create/{mv_id} 404 does not existing')
             return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
-        if mv.username == member:
+        if mv.username_id == member.username:
             response_data = {
                 "code": "M008_3",
                 "status": 400,
@@ -1064,56 +1137,60 @@ class HistoryCreateView(ApiAuthMixin, APIView):
             return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            history_exists = History.objects.filter(username=member.username, mv_id=mv).exists()
-            if history_exists:
-                history = History.objects.get(username=member.username, mv_id=mv)
-                response_data = {
-                    "history_id": history.id,
-                    "current_play_time": history.current_play_time,
-                    "code": "M008_3",
-                    "status": 409,
-                    "message": "이미 시청한 기록이 있습니다."
-                }
-                logger.warning(f'{client_ip} /music-videos/histories/create/{mv_id} 409 already exists')
-                return Response(response_data, status=status.HTTP_409_CONFLICT)
+            # (username, mv_id) 유니크 제약으로 동시 요청에서도 시청 기록은 하나만 생성된다
+            with transaction.atomic():
+                history, created = History.all_objects.get_or_create(
+                    username=member,
+                    mv_id=mv,
+                    defaults={'current_play_time': 0, 'is_deleted': False}
+                )
+                if not created and history.is_deleted:
+                    # 삭제된 시청 기록은 새 시청으로 되살린다
+                    history.is_deleted = False
+                    history.current_play_time = 0
+                    history.save(update_fields=['is_deleted', 'current_play_time', 'updated_at'])
+                    created = True
         except Exception as e:
             response_data = {
                 "code": "M008_5",
                 "status": 500,
                 "message": "서버 오류가 발생했습니다."
             }
-            logger.error(f'{client_ip} POST /music-videos/histories/create/{mv_id} 500 Internal Server Error - {str(e)}')
+            logger.error(
+                f'{client_ip} POST /music-videos/histories/create/{mv_id} 500 Internal Server Error - {str(e)}')
             return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        try:
-            history = History.objects.create(
-                username=member,
-                mv_id=mv,
-                current_play_time=0,
-                is_deleted=False
-            )
-            mv.views += 1
-            mv.recently_viewed += 1
-            mv.save()
+        record_view_event(mv.id, member.username)
+        apply_chart_view(mv, member, first_view=created)
+
+        if not created:
+            pending_position = get_pending_positions(member.username).get(history.id)
             response_data = {
                 "history_id": history.id,
-                "code": "M008",
-                "status": 201,
-                "message": "시청 기록 추가 성공"
-            }
-            logger.info(f'{client_ip} GET /music-videos/histories/create/{mv_id} 201 success')
-            return Response(response_data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            response_data = {
-                "code": "M008_5",
-                "status": 500,
-                "message": "서버 오류가 발생했습니다."
+                "current_play_time": pending_position[0] if pending_position else history.current_play_time,
+                "code": "M008_3",
+                "status": 409,
+                "message": "이미 시청한 기록이 있습니다."
             }
-            logger.error(
-                f'{client_ip} POST /music-videos/histories/create/{mv_id} 500 Internal Server Error - {str(e)}')
-            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            logger.warning(f'{client_ip} /music-videos/histories/create/{mv_id} 409 already exists')
+            return Response(response_data, status=status.HTTP_409_CONFLICT)
+
+        # 조회수는 Redis 카운터로 원자적으로 증가시킨다
+        cache_history_owner(history.id, member.username)
+        incr_view(mv.id)
+        add_view(mv)
+        trending.add_view(mv.id)
+        record_viewer(mv, member)
+        response_data = {
+            "history_id": history.id,
+            "code": "M008",
+            "status": 201,
+            "message": "시청 기록 추가 성공"
+        }
+        logger.info(f'{client_ip} GET /music-videos/histories/create/{mv_id} 201 success')
+        return Response(response_data, status=status.HTTP_201_CREATED)
 
-class HistoryUpdateView(ApiAuthMixin, APIView):
+class HistoryUpdateView(LazyUserAuthMixin, APIView):
     @swagger_auto_schema(
         operation_summary="뮤직비디오 시청 기록 갱신 API",
         operation_description="사용자의 뮤직비디오 시청 기록을 갱신합니다.",
@@ -1138,6 +1215,16 @@ class HistoryUpdateView(ApiAuthMixin, APIView):
                     }
                 }
             ),
+            400: openapi.Response(
+                description="재생 위치가 올바르지 않습니다.",
+                examples={
+                    "application/json": {
+                        "code": "M009_3",
+                        "status": 400,
+                        "message": "재생 위치가 올바르지 않습니다."
+                    }
+                }
+            ),
             404: openapi.Response(
                 description="시청 기록을 찾을 수 없습니다.",
                 examples={
@@ -1160,41 +1247,54 @@ class HistoryUpdateView(ApiAuthMixin, APIView):
     def patch(self, request, history_id):
         client_ip = request.META.get('REMOTE_ADDR', None)
         member = request.user
-        try:
-            histories = History.objects.get(id=history_id)
-            if not histories.username == member:
-                response_data = {
-                    "code": "M009_2",
-                    "status": 404,
-                    "message": "사용자의 시청 기록이 아닙니다."
-                }
-                logger.warning(
-                    f'{client_ip} PATCH /music-videos/histories/update/{history_id} 404 Not Found')
-                return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
-            current_play_time = request.data.get('current_play_time', histories.current_play_time)
-            histories.current_play_time = current_play_time
-            # histories.updated_at = datetime.now()
-            histories.save()
+        owner = get_history_owner(history_id)
+        if owner is None:
             response_data = {
-                "history_id": histories.id,
-                "code": "M009",
-                "status": 200,
-                "message": "뮤직비디오 시청 기록 갱신 성공"
+                "code": "M009_1",
+                "status": 404,
+                "message": "시청 기록을 찾을 수 없습니다"
             }
-            logger.info(f'{client_ip} PATCH /music-videos/histories/update/{history_id} 200 success')
-            return Response(response_data, status=status.HTTP_200_OK)
+            logger.warning(
+                f'{client_ip} PATCH /music-videos/histories/update/{history_id} 404 Not Found')
+            return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
-        except History.DoesNotExist:
+        if owner != member.username:
             response_data = {
-                "code": "M009_1",
+                "code": "M009_2",
                 "status": 404,
-                "message": "시청 기록을 찾을 수 없습니다"
+                "message": "사용자의 시청 기록이 아닙니다."
             }
             logger.warning(
                 f'{client_ip} PATCH /music-videos/histories/update/{history_id} 404 Not Found')
             return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
+        current_play_time = request.data.get('current_play_time', None)
+        if current_play_time is not None:
+            try:
+                current_play_time = int(current_play_time)
+            except (TypeError, ValueError, OverflowError):
+                current_play_time = -1
+            if current_play_time < 0:
+                response_data = {
+                    "code": "M009_3",
+                    "status": 400,
+                    "message": "재생 위치가 올바르지 않습니다."
+                }
+                logger.warning(
+                    f'{client_ip} PATCH /music-videos/histories/update/{history_id} 400 invalid current_play_time')
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            # 재생 위치는 Redis 에 최신 값만 남기고 주기적으로 MySQL 에 반영한다
+            save_position(member.username, history_id, current_play_time)
+        response_data = {
+            "history_id": history_id,
+            "code": "M009",
+            "status": 200,
+            "message": "뮤직비디오 시청 기록 갱신 성공"
+        }
+        logger.info(f'{client_ip} PATCH /music-videos/histories/update/{history_id} 200 success')
+        return Response(response_data, status=status.HTTP_200_OK)
+
 
 class HistoryDetailView(ApiAuthMixin, APIView):
     @swagger_auto_schema(
@@ -1273,7 +1373,15 @@ class HistoryDetailView(ApiAuthMixin, APIView):
                 f'{client_ip} /music-videos/histories 404 Not Found')
             return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
-        watch_mv_id = member_histories.values_list('mv_id', flat=True)
+        # 아직 반영되지 않은 재생 위치 갱신 시각까지 고려해 최근 시청 순으로 정렬
+        watch_histories = list(member_histories.values_list('id', 'mv_id', 'updated_at'))
+        pending_positions = get_pending_positions(member.username)
+        if pending_positions:
+            watch_histories.sort(
+                key=lambda history: pending_positions[history[0]][1] if history[0] in pending_positions else history[2],
+                reverse=True
+            )
+        watch_mv_id = [mv_id for _, mv_id, _ in watch_histories]
         preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(watch_mv_id)])
         watch_music_videos = MusicVideo.objects.filter(id__in=watch_mv_id).order_by(preserved_order)
 
@@ -1282,7 +1390,7 @@ class HistoryDetailView(ApiAuthMixin, APIView):
         paginator = Paginator(watch_music_videos, size)
         paginated_queryset = paginator.get_page(page)
 
-        serializer = MusicVideoDetailSerializer(paginated_queryset, many=True)
+        serializer = MusicVideoDetailSerializer(apply_pending_views(paginated_queryset), many=True)
 
         response_data = {
             "music_videos": serializer.data,
@@ -1310,6 +1418,7 @@ class MusicVideoSearchView(ApiAuthMixin, APIView):
             openapi.Parameter('sort', openapi.IN_QUERY, description="Sort by field", type=openapi.TYPE_STRING),
             openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
             openapi.Parameter('size', openapi.IN_QUERY, description="Page size", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="이전 응답의 next_cursor (깊은 페이지 조회, page 대신 사용)", type=openapi.TYPE_STRING),
         ],
         responses={
             200: openapi.Response(
@@ -1349,7 +1458,8 @@ class MusicVideoSearchView(ApiAuthMixin, APIView):
                             "page_size": 10,
                             "total_pages": 5,
                             "total_items": 50,
-                            "last_page": False
+                            "last_page": False,
+                            "next_cursor": "string"
                         }
                     }
                 }
@@ -1371,7 +1481,6 @@ class MusicVideoSearchView(ApiAuthMixin, APIView):
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         message = '뮤직비디오 정보 조회 성공'
         mv_name = request.query_params.get('mv_name', None)
-        queryset = MusicVideo.objects.all()
         user = request.user
         if mv_name:
             log_message = {
@@ -1383,21 +1492,46 @@ class MusicVideoSearchView(ApiAuthMixin, APIView):
                 "mv_name": mv_name
             }
             logger.info(json.dumps(log_message, ensure_ascii=False))
-            # Elasticsearch에서 유사한 이름의 뮤직비디오 검색
-            q = MultiMatch(query=mv_name, fields=['subject'], fuzziness='auto')
-            search = MusicVideoDocument.search().query(q)
-            response = search.execute()
-            music_video_ids = [hit.meta.id for hit in response]
-            queryset = queryset.filter(id__in=music_video_ids)
+            record_query(mv_name)
         # 정렬
         sort = request.query_params.get('sort', None)
-
         if sort:
-            queryset = queryset.order_by(f'-{sort}')
+            if sort not in SEARCH_SORT_FIELDS:
+                response_data = {
+                    "code": "S001_2",
+                    "status": 400,
+                    "message": "지원하지 않는 정렬 기준입니다."
+                }
+                logger.warning(f'{client_ip} GET /music-videos/searches 400 invalid sort')
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
             message = f"뮤직비디오 {sort}순 정보 조회 성공"
 
+        # 페이지네이션과 정렬은 Elasticsearch 에서 처리하고 결과는 색인된 문서로 바로 응답한다
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        try:
+            size = max(int(request.query_params.get('size', 10)), 1)
+        except ValueError:
+            size = 10
+        cursor = request.query_params.get('cursor', None)
+        try:
+            if cursor:
+                music_videos, total, next_cursor = search_music_videos_after(cursor, mv_name, sort, size)
+            else:
+                music_videos, total, page, next_cursor = cached_search_music_videos(mv_name, sort, page, size)
+        except ValueError:
+            response_data = {
+                "code": "S001_3",
+                "status": 400,
+                "message": "조회할 수 없는 페이지입니다. cursor 를 사용해주세요."
+            }
+            logger.warning(f'{client_ip} GET /music-videos/searches 400 invalid page')
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
         # 결과가 없는 경우 처리
-        if not queryset.exists():
+        if not total:
             response_data = {
                 "code": "S001_1",
                 "status": 404,
@@ -1406,32 +1540,69 @@ class MusicVideoSearchView(ApiAuthMixin, APIView):
             logger.warning(f'{client_ip} GET /music-videos/searches 404 not found')
             return Response(response_data, status=status.HTTP_404_NOT_FOUND)
 
-        # 페이지네이션
-        page = request.query_params.get('page',1)
-        size = request.query_params.get('size',10)
-        paginator = Paginator(queryset, size)
-        paginated_queryset = paginator.get_page(page)
-
-        serializer = MusicVideoDetailSerializer(paginated_queryset, many=True)
-
+        total_pages = max(math.ceil(total / size), 1)
         response_data = {
-            "music_videos": serializer.data,
+            "music_videos": music_videos,
             "code": "S001",
             "HTTPstatus": 200,
             "message": message,
             "pagination": {
-                "current_page": paginated_queryset.number,
-                "next_page": paginated_queryset.has_next(),
+                "current_page": None if cursor else page,
+                "next_page": next_cursor is not None if cursor else page < total_pages,
                 "page_size": size,
-                "total_pages": paginator.num_pages,
-                "total_items": paginator.count,
-                "last_page": not paginated_queryset.has_next()
+                "total_pages": total_pages,
+                "total_items": total,
+                "last_page": next_cursor is None if cursor else page >= total_pages,
+                "next_cursor": next_cursor
             }
         }
         logger.info(f'{client_ip} GET /music-videos/searches 200 views success')
         return Response(response_data, status=status.HTTP_200_OK)
 
-class MusicVideoStatusView(ApiAuthMixin, APIView):
+class MusicVideoSuggestView(ApiAuthMixin, APIView):
+    @swagger_auto_schema(
+        operation_summary="검색어 자동 완성 API",
+        operation_description="입력 중인 검색어로 시작하는 뮤직비디오 제목을 조회합니다.",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="입력 중인 검색어", type=openapi.TYPE_STRING),
+            openapi.Parameter('size', openapi.IN_QUERY, description=f"최대 개수 (기본값/최대: {SUGGEST_MAX_SIZE})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description="검색어 자동 완성 성공",
+                examples={
+                    "application/json": {
+                        "code": "S002",
+                        "status": 200,
+                        "message": "검색어 자동 완성 성공",
+                        "suggestions": [
+                            {
+                                "id": 0,
+                                "subject": "string"
+                            },
+                        ]
+                    }
+                }
+            ),
+        }
+    )
+    def get(self, request):
+        try:
+            size = min(max(int(request.query_params.get('size', SUGGEST_MAX_SIZE)), 1), SUGGEST_MAX_SIZE)
+        except ValueError:
+            size = SUGGEST_MAX_SIZE
+        suggestions = suggest_music_videos(request.query_params.get('q', ''), size)
+        # 키 입력마다 호출되므로 성공 로그는 남기지 않는다
+        response_data = {
+            "code": "S002",
+            "status": 200,
+            "message": "검색어 자동 완성 성공",
+            "suggestions": suggestions,
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class MusicVideoStatusView(LazyUserAuthMixin, APIView):
     @swagger_auto_schema(
         operation_summary="뮤직비디오 제작 상태 확인 API",
         operation_description="뮤직비디오 제작 작업의 상태를 확인합니다",
@@ -7,6 +7,8 @@ from django.contrib.auth import get_user_model
 import datetime, jwt
 from django.middleware.csrf import CsrfViewMiddleware
 
+from .user_cache import get_member
+
 User = get_user_model()
 
 
@@ -17,6 +19,12 @@ class SafeJWTAuthentication(BaseAuthentication):
     """
 
     def authenticate(self, request):
+        payload = self.decode_token(request)
+        if payload is None:
+            return None
+        return self.authenticate_credentials(request, payload['user_id'])
+
+    def decode_token(self, request):
         authorization_header = request.headers.get('Authorization')
         if not authorization_header:
             return None
@@ -39,7 +47,7 @@ class SafeJWTAuthentication(BaseAuthentication):
             raise exceptions.AuthenticationFailed('Invalid access token')
         except Exception as e:
             raise exceptions.AuthenticationFailed(f'Authentication failed: {str(e)}')
-        return self.authenticate_credentials(request, payload['user_id'])
+        return payload
 
     def authenticate_credentials(self, request, key):
         user = User.objects.filter(id=key).first()
@@ -63,9 +71,85 @@ class SafeJWTAuthentication(BaseAuthentication):
         if reason:
             raise exceptions.PermissionDenied(f'CSRF Failed: {reason}')
 
+class CachedJWTAuthentication(SafeJWTAuthentication):
+    """
+    JWT Authentication (회원 캐시 사용)
+    토큰 검증 후 회원 정보는 (user_id, iat) 기준 로컬 LRU 와 Redis 캐시에서 찾고, 없을 때만 DB 를 조회한다.
+    회원 정보가 저장/삭제되면 member.signals 에서 캐시를 무효화한다.
+    """
+
+    def authenticate(self, request):
+        payload = self.decode_token(request)
+        if payload is None:
+            return None
+
+        user = get_member(payload['user_id'], payload.get('iat'))
+        if user is None:
+            raise exceptions.AuthenticationFailed('User not found')
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User is inactive')
+
+        return (user, None)
+
+class LazyMember:
+    """
+    JWT 클레임(user_id, username)만으로 만든 회원 프록시
+    클레임에 없는 속성을 처음 읽을 때만 회원 캐시/DB 에서 Member 를 불러온다.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, username, issued_at=None):
+        self.id = self.pk = user_id
+        self.username = username
+        self._issued_at = issued_at
+        self._wrapped = None
+
+    def _resolve(self):
+        if self._wrapped is None:
+            member = get_member(self.id, self._issued_at)
+            if member is None:
+                raise exceptions.AuthenticationFailed('User not found')
+            self._wrapped = member
+        return self._wrapped
+
+    def __getattr__(self, name):
+        # 인스턴스에 없는 속성만 여기로 들어온다
+        if name.startswith('__') or name == '_wrapped':
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+
+class LazyJWTAuthentication(CachedJWTAuthentication):
+    """
+    JWT Authentication (지연 로딩)
+    토큰 서명만 검증하고 회원 조회는 클레임에 없는 속성을 읽을 때까지 미룬다.
+    탈퇴/비활성화는 회원 정보를 읽는 시점이나 토큰 만료(60분) 시점에 반영된다.
+    """
+
+    def authenticate(self, request):
+        payload = self.decode_token(request)
+        if payload is None:
+            return None
+        if 'username' not in payload:
+            # username 클레임이 없는 이전 토큰은 회원 정보를 바로 조회한다
+            return super().authenticate(request)
+        return (LazyMember(payload['user_id'], payload['username'], payload.get('iat')), None)
+
 def generate_access_token(user):
     access_token_payload = {
         'user_id': user.id,
+        'username': user.username,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(
             days=0, minutes=60
         ),
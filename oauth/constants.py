@@ -0,0 +1,14 @@
+YOUTUBE_UPLOAD_STATUS_CHOICES = (
+    (0, "대기중"),
+    (1, "업로드 중"),
+    (2, "성공"),
+    (3, "실패"),
+)
+
+YOUTUBE_UPLOAD_PENDING = 0
+YOUTUBE_UPLOAD_UPLOADING = 1
+YOUTUBE_UPLOAD_SUCCESS = 2
+YOUTUBE_UPLOAD_FAIL = 3
+
+# 재개 가능한 업로드는 256KB 의 배수 단위로 보내야 한다
+YOUTUBE_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
@@ -0,0 +1,97 @@
+from functools import lru_cache
+import json
+import threading
+
+from django.conf import settings
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from .user_cache import LocalLRUCache
+
+YOUTUBE_CHANNEL_CALLBACK_PATH = "api/v1/oauth/youtube-channel/callback"
+YOUTUBE_UPLOAD_CALLBACK_PATH = "api/v1/oauth/youtube/callback"
+
+YOUTUBE_CHANNEL_SCOPES = [
+    'https://www.googleapis.com/auth/youtube.readonly',
+    'https://www.googleapis.com/auth/userinfo.email',
+    'openid',
+    'https://www.googleapis.com/auth/userinfo.profile'
+]
+YOUTUBE_UPLOAD_SCOPES = [
+    'https://www.googleapis.com/auth/youtube.upload',
+    'https://www.googleapis.com/auth/userinfo.email',
+    'openid',
+    'https://www.googleapis.com/auth/youtubepartner',
+    'https://www.googleapis.com/auth/youtube.readonly',
+    'https://www.googleapis.com/auth/youtube',
+    'https://www.googleapis.com/auth/userinfo.profile'
+]
+
+YOUTUBE_SERVICE_CACHE_SIZE = 128
+# access token 만료(1시간)보다 짧게 두어 오래된 인증 정보로 만든 서비스 객체를 재사용하지 않는다
+YOUTUBE_SERVICE_CACHE_TTL = 30 * 60
+
+
+@lru_cache(maxsize=None)
+def get_client_config(redirect_path):
+    redirect_uri = settings.BASE_BACKEND_URL + redirect_path
+    return {
+        "web": {
+            "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
+            "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
+            "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+            "token_uri": "https://oauth2.googleapis.com/token",
+            "redirect_uris": [redirect_uri]
+        }
+    }
+
+
+def build_flow(redirect_path, scopes, state=None):
+    # Flow 는 state/토큰을 담으므로 요청마다 새로 만들고, 설정 dict 만 재사용한다
+    flow = Flow.from_client_config(get_client_config(redirect_path), scopes=scopes, state=state)
+    flow.redirect_uri = settings.BASE_BACKEND_URL + redirect_path
+    return flow
+
+
+def build_credentials(token, refresh_token, scopes):
+    # 저장해 둔 토큰으로 인증 정보를 만든다 (client_id/client_secret 은 저장하지 않고 설정에서 채운다)
+    client = get_client_config(YOUTUBE_UPLOAD_CALLBACK_PATH)['web']
+    return Credentials(
+        token=token,
+        refresh_token=refresh_token,
+        token_uri=client['token_uri'],
+        client_id=client['client_id'],
+        client_secret=client['client_secret'],
+        scopes=scopes,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_youtube_discovery_doc():
+    # google-api-python-client 에 포함된 discovery 문서를 프로세스당 한 번만 읽고 파싱한다
+    return json.loads(get_static_doc('youtube', 'v3'))
+
+
+# 서비스 객체의 httplib2 커넥션은 스레드 간에 공유할 수 없으므로 스레드마다 캐시를 둔다
+_thread_local = threading.local()
+
+
+def _service_cache():
+    cache = getattr(_thread_local, 'services', None)
+    if cache is None:
+        cache = LocalLRUCache(YOUTUBE_SERVICE_CACHE_SIZE, YOUTUBE_SERVICE_CACHE_TTL)
+        _thread_local.services = cache
+    return cache
+
+
+def get_youtube_service(credentials):
+    # 같은 인증 정보로 들어온 요청은 만들어 둔 YouTube 서비스 객체를 재사용한다
+    key = (credentials.client_id, credentials.refresh_token or credentials.token, tuple(credentials.scopes or ()))
+    cache = _service_cache()
+    youtube = cache.get(key)
+    if youtube is None:
+        youtube = build_from_document(get_youtube_discovery_doc(), credentials=credentials)
+        cache.set(key, youtube)
+    return youtube
@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import Flow
+from googleapiclient.discovery import build
+
+from oauth.google_clients import (
+    YOUTUBE_UPLOAD_CALLBACK_PATH, YOUTUBE_UPLOAD_SCOPES, build_flow, get_youtube_service,
+)
+
+
+class Command(BaseCommand):
+    help = '유튜브 업로드 요청마다 드는 OAuth Flow/YouTube 서비스 객체 준비 시간을 변경 전/후로 비교합니다. (네트워크 호출 없음)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=100)
+
+    def credentials(self):
+        return Credentials(token='benchmark-token', refresh_token='benchmark-refresh-token',
+                           token_uri='https://oauth2.googleapis.com/token',
+                           client_id=settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
+                           client_secret=settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
+                           scopes=YOUTUBE_UPLOAD_SCOPES)
+
+    def legacy_setup(self):
+        # 변경 전 뷰의 처리 방식: 요청마다 설정 dict, Flow, discovery 문서 파싱, 서비스 객체를 새로 만든다
+        redirect_uri = settings.BASE_BACKEND_URL + YOUTUBE_UPLOAD_CALLBACK_PATH
+        client_config = {
+            "web": {
+                "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
+                "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                "token_uri": "https://oauth2.googleapis.com/token",
+                "redirect_uris": [redirect_uri]
+            }
+        }
+        flow = Flow.from_client_config(client_config, scopes=YOUTUBE_UPLOAD_SCOPES)
+        flow.redirect_uri = redirect_uri
+        build('youtube', 'v3', credentials=self.credentials())
+
+    def cached_setup(self):
+        build_flow(YOUTUBE_UPLOAD_CALLBACK_PATH, YOUTUBE_UPLOAD_SCOPES)
+        get_youtube_service(self.credentials())
+
+    def measure(self, label, func):
+        timings = []
+        for _ in range(self.runs):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'{label:<8} p50 {statistics.median(timings):7.2f}ms  '
+            f'p95 {timings[max(int(len(timings) * 0.95) - 1, 0)]:7.2f}ms  '
+            f'max {timings[-1]:7.2f}ms'
+        )
+
+    def handle(self, *args, **options):
+        self.runs = max(options['runs'], 1)
+        # 첫 호출(discovery 문서 로딩)은 cached 쪽 max 에 포함된다
+        self.measure('cached', self.cached_setup)
+        self.measure('legacy', self.legacy_setup)
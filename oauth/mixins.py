@@ -1,10 +1,15 @@
 from rest_framework.permissions import IsAuthenticated
-from .authenticate import SafeJWTAuthentication
+from .authenticate import CachedJWTAuthentication, LazyJWTAuthentication
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 class ApiAuthMixin:
-    authentication_classes = [SafeJWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
 class PublicApiMixin:
     authentication_classes = ()
-    permission_classes = ()
\ No newline at end of file
+    permission_classes = ()
+
+class LazyUserAuthMixin:
+    # 인증 여부나 id/username 만 필요한 API 용 (회원 조회 없이 토큰 검증만 수행)
+    authentication_classes = [LazyJWTAuthentication]
+    permission_classes = [IsAuthenticatedOrReadOnly]
@@ -1,3 +1,31 @@
 from django.db import models
 
-# Create your models here.
+from member.models import Member
+from music_videos.models import MusicVideo
+from .constants import YOUTUBE_UPLOAD_STATUS_CHOICES, YOUTUBE_UPLOAD_PENDING
+
+
+class YoutubeUpload(models.Model):
+    # 유튜브 업로드 작업 (워커가 재시작되어도 resumable session URI 로 이어서 올린다)
+    # OAuth 토큰은 DB 에 남기지 않고 업로드가 끝날 때까지만 Redis 에 둔다 (youtube_upload.store_credentials)
+    username = models.ForeignKey(Member, to_field='username', on_delete=models.CASCADE)
+    music_video = models.ForeignKey(MusicVideo, on_delete=models.CASCADE)
+    title = models.CharField(max_length=200)
+    description = models.TextField(null=True, blank=True)
+    tags = models.CharField(max_length=500, null=True, blank=True)
+    privacy_status = models.CharField(max_length=20, default='public')
+    thumbnail = models.CharField(max_length=1000, null=True, blank=True)
+    status = models.IntegerField(default=YOUTUBE_UPLOAD_PENDING, choices=YOUTUBE_UPLOAD_STATUS_CHOICES)
+    upload_uri = models.CharField(max_length=2000, null=True, blank=True)
+    bytes_uploaded = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(null=True, blank=True)
+    video_id = models.CharField(max_length=50, null=True, blank=True)
+    error_message = models.CharField(max_length=1000, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['music_video', 'username', 'created_at']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
@@ -1,8 +1,7 @@
-import requests
-
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from music_videos.models import MusicVideo
+from config.http_client import get_client
 
 GOOGLE_ACCESS_TOKEN_OBTAIN_URL = 'https://oauth2.googleapis.com/token'
 GOOGLE_USER_INFO_URL = 'https://www.googleapis.com/oauth2/v3/userinfo'
@@ -18,7 +17,7 @@ def google_get_access_token(google_token_api, code, redirection_uri):
     google_token_api += \
         f"?client_id={client_id}&client_secret={client_secret}&code={code}&grant_type={grant_type}&redirect_uri={redirection_uri}&state={state}"
 
-    token_response = requests.post(google_token_api)
+    token_response = get_client('google').post(google_token_api)
 
     if not token_response.ok:
         raise ValidationError('google_token is invalid')
@@ -28,7 +27,7 @@ def google_get_access_token(google_token_api, code, redirection_uri):
     return access_token
 
 def google_get_user_info(access_token):
-    user_info_response = requests.get(
+    user_info_response = get_client('google').get(
         "https://www.googleapis.com/oauth2/v3/userinfo",
         params={
             'access_token': access_token
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from config.celery import app
+
+from .constants import YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING
+from .models import YoutubeUpload
+from .youtube_upload import RetryableUploadError, fail_upload, run_upload
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 이 시간 동안 진행 위치가 갱신되지 않은 업로드는 멈춘 것으로 보고 다시 실행한다
+STALLED_UPLOAD_AFTER = timedelta(minutes=15)
+
+
+# acks_late: 업로드 중 워커가 죽으면 메시지가 다시 전달되어 저장된 session URI 로 이어서 올린다
+@app.task(bind=True, acks_late=True, max_retries=5)
+def upload_to_youtube(self, upload_id):
+    try:
+        run_upload(upload_id)
+    except RetryableUploadError as e:
+        if self.request.retries >= self.max_retries:
+            logger.error(f'youtube upload {upload_id} failed: {str(e)}')
+            fail_upload(upload_id, str(e))
+            return
+        logger.warning(f'youtube upload {upload_id} interrupted, retrying: {str(e)}')
+        raise self.retry(countdown=30 * 2 ** self.request.retries)
+
+
+@app.task
+def resume_youtube_uploads():
+    # 재시도 메시지까지 잃어버린 업로드를 다시 큐에 넣는다 (진행 중인 업로드는 잠금으로 중복 실행되지 않는다)
+    stalled_ids = list(YoutubeUpload.objects.filter(
+        status__in=(YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING),
+        updated_at__lt=timezone.now() - STALLED_UPLOAD_AFTER,
+    ).values_list('id', flat=True))
+    for upload_id in stalled_ids:
+        upload_to_youtube.delay(upload_id)
+    return len(stalled_ids)
@@ -7,6 +7,7 @@ urlpatterns = [
     path('/youtube/<int:mv_id>', views.YoutubeUploadGoogleView.as_view(), name='youtube_auth'),
     path('/youtube/callback', views.YoutubeUploadGoogleCallbackView.as_view(), name='youtube_callback'),
     path('/youtube/uploads/<int:mv_id>', views.UploadVideoView.as_view(), name='youtube_upload'),
+    path('/youtube/uploads/<int:mv_id>/status', views.UploadVideoStatusView.as_view(), name='youtube_upload_status'),
     path('/youtube-channel', views.AuthYoutubeView.as_view(), name='youtube_channel'),
     path('/youtube-channel/callback', views.AuthYoutubeCallbackView.as_view(), name='youtube_channel_callback'),
 ]
\ No newline at end of file
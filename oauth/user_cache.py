@@ -0,0 +1,129 @@
+from collections import OrderedDict
+import copy
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from redis.exceptions import RedisError
+
+from config.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+AUTH_MEMBER_KEY = 'auth:member:{}'
+
+
+class LocalLRUCache:
+    """
+    프로세스 로컬 LRU 캐시 (항목별 만료 시간 포함)
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_matching(self, predicate):
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+
+def _dump_instance(instance):
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _load_instance(model, fields):
+    # JSON 으로 저장된 값을 필드 타입으로 되돌려 DB 에서 읽은 것과 같은 인스턴스를 만든다
+    field_names = [field.attname for field in model._meta.concrete_fields]
+    values = [field.to_python(fields.get(field.attname)) for field in model._meta.concrete_fields]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+def _dump_member(member):
+    # Redis 는 여러 프로세스가 공유하므로 pickle 대신 필드 값만 JSON 으로 저장한다
+    return json.dumps({
+        'member': _dump_instance(member),
+        'country': _dump_instance(member.country) if member.country_id else None,
+    }, cls=DjangoJSONEncoder)
+
+
+def _load_member(cached):
+    data = json.loads(cached)
+    member = _load_instance(User, data['member'])
+    if data['country'] is not None:
+        member.country = _load_instance(User._meta.get_field('country').related_model, data['country'])
+    return member
+
+
+# 다른 프로세스의 로컬 캐시는 무효화할 수 없으므로 TTL 을 짧게 두어 오래된 값이 남는 시간을 제한한다
+_local_members = LocalLRUCache(settings.AUTH_LOCAL_CACHE_SIZE, settings.AUTH_LOCAL_CACHE_TTL)
+
+
+def get_member(user_id, issued_at):
+    # 로컬 LRU -> Redis -> MySQL 순서로 인증된 회원을 찾는다 (없으면 None)
+    local_key = (user_id, issued_at)
+    member = _local_members.get(local_key)
+    if member is not None:
+        # 요청 처리 중 속성을 바꿔도 캐시된 인스턴스에 영향이 없도록 복사본을 돌려준다
+        return copy.copy(member)
+
+    try:
+        cached = get_redis().get(AUTH_MEMBER_KEY.format(user_id))
+    except RedisError as e:
+        logger.warning(f'auth member cache unavailable: {str(e)}')
+        cached = None
+    member = None
+    if cached is not None:
+        try:
+            member = _load_member(cached)
+        except (ValueError, KeyError, TypeError, ValidationError):
+            # 이전 형식(pickle)이거나 깨진 값은 무시하고 MySQL 에서 다시 읽는다
+            logger.warning(f'discarding malformed auth member cache for {user_id}')
+    if member is None:
+        member = User.objects.select_related('country').filter(id=user_id).first()
+        if member is None:
+            return None
+        try:
+            get_redis().set(AUTH_MEMBER_KEY.format(user_id), _dump_member(member), ex=settings.AUTH_REDIS_CACHE_TTL)
+        except RedisError as e:
+            logger.warning(f'auth member cache unavailable: {str(e)}')
+
+    _local_members.set(local_key, member)
+    return copy.copy(member)
+
+
+def invalidate_member(user_id):
+    _local_members.delete_matching(lambda key: key[0] == user_id)
+    try:
+        get_redis().delete(AUTH_MEMBER_KEY.format(user_id))
+    except RedisError as e:
+        logger.warning(f'auth member cache invalidation failed: {str(e)}')
@@ -1,10 +1,5 @@
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2.credentials import Credentials
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-import googleapiclient
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -18,9 +13,19 @@ from .mixins import PublicApiMixin, ApiAuthMixin
 from .utils import social_user_get_or_create
 from .services import google_get_access_token, google_get_user_info
 from .authenticate import jwt_login
+from .google_clients import (
+    YOUTUBE_CHANNEL_CALLBACK_PATH, YOUTUBE_CHANNEL_SCOPES, YOUTUBE_UPLOAD_CALLBACK_PATH, YOUTUBE_UPLOAD_SCOPES,
+    build_flow, get_youtube_service,
+)
+from .constants import YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING
+from .models import YoutubeUpload
+from .tasks import upload_to_youtube
+from .youtube_upload import fail_upload, store_credentials
 from music_videos.models import MusicVideo
-import requests
-from io import BytesIO
+from music_videos.s3_utils import upload_file_to_s3
+from redis.exceptions import RedisError
+from datetime import datetime
+import os
 
 
 User = get_user_model()
@@ -73,29 +78,8 @@ class LoginGoogleCallbackView(PublicApiMixin, APIView):
 @swagger_auto_schema(auto_schema=None)
 class AuthYoutubeView(PublicApiMixin, APIView):
     def get(self, request):
-        redirect_uri = settings.BASE_BACKEND_URL + "api/v1/oauth/youtube-channel/callback"
-
         # OAuth 2.0 플로우 설정
-        client_config = {
-            "web": {
-                "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
-                "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }
-
-        flow = Flow.from_client_config(
-            client_config,
-            scopes=[
-                'https://www.googleapis.com/auth/youtube.readonly',
-                'https://www.googleapis.com/auth/userinfo.email',
-                'openid',
-                'https://www.googleapis.com/auth/userinfo.profile'
-            ],
-        )
-        flow.redirect_uri = redirect_uri
+        flow = build_flow(YOUTUBE_CHANNEL_CALLBACK_PATH, YOUTUBE_CHANNEL_SCOPES)
 
         # 인증 URL 생성 및 리디렉션
         authorization_url, state = flow.authorization_url(
@@ -113,31 +97,7 @@ class AuthYoutubeCallbackView(PublicApiMixin, APIView):
         if not state:
             return Response({"error": "State parameter is missing from session."}, status=status.HTTP_400_BAD_REQUEST)
 
-        redirect_uri = settings.BASE_BACKEND_URL + "api/v1/oauth/youtube-channel/callback"
-
-        client_config = {
-            "web": {
-                "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
-                "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }
-        #         scope = "https://www.googleapis.com/auth/youtube " + \
-        #                 "https://www.googleapis.com/auth/youtube.readonly " + \
-        #                 "https://www.googleapis.com/auth/youtube.upload"
-        flow = Flow.from_client_config(
-            client_config,
-            scopes=[
-                'https://www.googleapis.com/auth/youtube.readonly',
-                'https://www.googleapis.com/auth/userinfo.email',
-                'openid',
-                'https://www.googleapis.com/auth/userinfo.profile'
-            ],
-            state=state,
-        )
-        flow.redirect_uri = redirect_uri
+        flow = build_flow(YOUTUBE_CHANNEL_CALLBACK_PATH, YOUTUBE_CHANNEL_SCOPES, state=state)
 
         # 사용자 인증 코드 처리
         authorization_response = request.build_absolute_uri()
@@ -150,7 +110,7 @@ class AuthYoutubeCallbackView(PublicApiMixin, APIView):
 
         try:
             # YouTube API 클라이언트 생성
-            youtube = build('youtube', 'v3', credentials=credentials)
+            youtube = get_youtube_service(credentials)
             response = youtube.channels().list(
                 mine=True,
                 part='snippet'
@@ -169,31 +129,7 @@ class AuthYoutubeCallbackView(PublicApiMixin, APIView):
 @swagger_auto_schema(auto_schema=None)
 class YoutubeUploadGoogleView(PublicApiMixin, APIView):
     def get(self, request, mv_id):
-        redirect_uri = settings.BASE_BACKEND_URL + "api/v1/oauth/youtube/callback"
-
-        client_config = {
-            "web": {
-                "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
-                "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }
-
-        flow = Flow.from_client_config(
-            client_config,
-            scopes=[
-                'https://www.googleapis.com/auth/youtube.upload',
-                'https://www.googleapis.com/auth/userinfo.email',
-                'openid',
-                'https://www.googleapis.com/auth/youtubepartner',
-                'https://www.googleapis.com/auth/youtube.readonly',
-                'https://www.googleapis.com/auth/youtube',
-                'https://www.googleapis.com/auth/userinfo.profile'
-            ],
-        )
-        flow.redirect_uri = redirect_uri
+        flow = build_flow(YOUTUBE_UPLOAD_CALLBACK_PATH, YOUTUBE_UPLOAD_SCOPES)
 
         authorization_url, state = flow.authorization_url(
             access_type='offline',
@@ -205,12 +141,10 @@ class YoutubeUploadGoogleView(PublicApiMixin, APIView):
         return redirect(authorization_url)
 
 def credentials_to_dict(credentials):
+    # client_id/client_secret 은 설정에 있으므로 토큰만 보관한다
     return {
         'token': credentials.token,
         'refresh_token': credentials.refresh_token,
-        'token_uri': credentials.token_uri,
-        'client_id': credentials.client_id,
-        'client_secret': credentials.client_secret,
         'scopes': credentials.scopes
     }
 @swagger_auto_schema(auto_schema=None)
@@ -222,32 +156,7 @@ class YoutubeUploadGoogleCallbackView(PublicApiMixin, APIView):
         if not state:
             return Response({"error": "State parameter is missing from session."}, status=status.HTTP_400_BAD_REQUEST)
 
-        redirect_uri = settings.BASE_BACKEND_URL + "api/v1/oauth/youtube/callback"
-
-        client_config = {
-            "web": {
-                "client_id": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
-                "client_secret": settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [redirect_uri]
-            }
-        }
-
-        flow = Flow.from_client_config(
-            client_config,
-            scopes=[
-                'https://www.googleapis.com/auth/youtube.upload',
-                'https://www.googleapis.com/auth/userinfo.email',
-                'openid',
-                'https://www.googleapis.com/auth/youtubepartner',
-                'https://www.googleapis.com/auth/youtube.readonly',
-                'https://www.googleapis.com/auth/youtube',
-                'https://www.googleapis.com/auth/userinfo.profile'
-            ],
-            state=state,
-        )
-        flow.redirect_uri = redirect_uri
+        flow = build_flow(YOUTUBE_UPLOAD_CALLBACK_PATH, YOUTUBE_UPLOAD_SCOPES, state=state)
 
         authorization_response = request.build_absolute_uri()
         try:
@@ -263,14 +172,9 @@ class YoutubeUploadGoogleCallbackView(PublicApiMixin, APIView):
 
         return redirect(frontend_redirect_url)
 
-def download_video(video_url):
-    response = requests.get(video_url, stream=True)
-    response.raise_for_status()  # 요청이 성공적으로 완료되지 않으면 예외 발생
-    return BytesIO(response.content)
-
 class UploadVideoView(ApiAuthMixin, APIView):
     @swagger_auto_schema(
-        operation_description="Upload a video to YouTube",
+        operation_description="Upload a video to YouTube (업로드는 백그라운드에서 진행되며 진행 상황은 status API 로 확인)",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -293,9 +197,6 @@ class UploadVideoView(ApiAuthMixin, APIView):
             }
             return Response(response_data, status=status.HTTP_403_FORBIDDEN)
 
-        credentials = Credentials(**credentials)
-
-        youtube = build('youtube', 'v3', credentials=credentials)
         mv = MusicVideo.objects.get(id=mv_id)
 
         if (str(mv.username) != str(request.user.username)):
@@ -306,73 +207,127 @@ class UploadVideoView(ApiAuthMixin, APIView):
             }
             return Response(response_data, status=status.HTTP_403_FORBIDDEN)
 
-        title = request.data.get('title', mv.subject)
-        description = request.data.get('description')
-        category = '22'
-        tags = request.data.get('tags')
-        privacy_status = request.data.get('privacyStatus', 'public')
-        thumbnail = request.FILES.get('thumbnail')
+        if YoutubeUpload.objects.filter(music_video=mv, username=request.user.username,
+                                        status__in=(YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING)).exists():
+            response_data = {
+                "code": "O003_5",
+                "status": 409,
+                "message": "이미 업로드가 진행 중입니다."
+            }
+            return Response(response_data, status=status.HTTP_409_CONFLICT)
 
-        video_data = download_video(mv.mv_file)
+        thumbnail = request.FILES.get('thumbnail')
+        thumbnail_url = None
+        if thumbnail:
+            # 썸네일은 S3 에 올려 두고 업로드 작업이 가져간다
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            file_extension = os.path.splitext(thumbnail.name)[1]
+            thumbnail_url = upload_file_to_s3(thumbnail, f"youtube_thumbnails/{mv.username_id}_{timestamp}{file_extension}", ExtraArgs={
+                "ContentType": thumbnail.content_type,
+            })
+            if thumbnail_url is None:
+                response_data = {
+                    "code": "O003_3",
+                    "status": 500,
+                    "message": "썸네일 저장을 실패하였습니다."
+                }
+                return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        upload = YoutubeUpload.objects.create(
+            username_id=mv.username_id,
+            music_video=mv,
+            title=request.data.get('title', mv.subject),
+            description=request.data.get('description'),
+            tags=request.data.get('tags'),
+            privacy_status=request.data.get('privacyStatus', 'public'),
+            thumbnail=thumbnail_url,
+        )
+        try:
+            store_credentials(upload.id, credentials)
+        except RedisError as e:
+            fail_upload(upload.id, f'failed to store credentials: {str(e)}')
+            response_data = {
+                "code": "O003_4",
+                "status": 500,
+                "message": "업로드 인증 정보 저장을 실패하였습니다."
+            }
+            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        upload_to_youtube.delay(upload.id)
 
-        body = {
-            'snippet': {
-                'title': title,
-                'description': description,
-                'tags': tags,
-                'categoryId': category
-            },
-            'status': {
-                'privacyStatus': privacy_status
+        response_data = {
+            "code": "O003",
+            "status": 202,
+            "message": "뮤직비디오 업로드가 시작되었습니다.",
+            "data": {
+                "upload_id": upload.id,
             }
         }
+        return Response(response_data, status=status.HTTP_202_ACCEPTED)
 
-        media_body = MediaIoBaseUpload(video_data, mimetype='video/*', chunksize=-1, resumable=True)
-
-        insert_request = youtube.videos().insert(
-            part=','.join(body.keys()),
-            body=body,
-            media_body=media_body
-        )
 
-        try:
-            response = None
-            while response is None:
-                task_status, response = insert_request.next_chunk()
-                if 'id' in response:
-                    video_id = response['id']
-                    try:
-                        if thumbnail:
-                            # 썸네일 업로드
-                            thumbnail_data = BytesIO(thumbnail.read())
-                            youtube.thumbnails().set(
-                                videoId=video_id,
-                                media_body=MediaIoBaseUpload(thumbnail_data, mimetype=thumbnail.content_type)
-                            ).execute()
-                    except googleapiclient.errors.HttpError as e:
-                        error_content = e.resp.content
-                        response_data = {
-                            "code": "O003_4",
-                            "status": 200,
-                            "message": f"뮤직비디오 업로드는 성공하였으나, 권한문제로 인하여 썸네일 업로드를 실패하였습니다. error: {error_content.decode()}"
-                        }
-                        return Response(response_data, status=status.HTTP_200_OK)
-                    response_data = {
-                        "code": "O003",
+class UploadVideoStatusView(ApiAuthMixin, APIView):
+    @swagger_auto_schema(
+        operation_description="가장 최근 유튜브 업로드의 진행 상황",
+        responses={
+            200: openapi.Response(
+                description="Success",
+                examples={
+                    "application/json": {
+                        "code": "O004",
                         "status": 200,
-                        "message": "뮤직비디오가 성공적으로 업로드되었습니다."
+                        "message": "유튜브 업로드 상태 조회 성공",
+                        "data": {
+                            "upload_id": 1,
+                            "status": "업로드 중",
+                            "bytes_uploaded": 16777216,
+                            "total_bytes": 52428800,
+                            "progress": 32,
+                            "video_url": None,
+                            "error_message": None
+                        }
                     }
-                    return Response(response_data,status=status.HTTP_200_OK)
-        except Exception as e:
+                }
+            ),
+            404: openapi.Response(
+                description="Not Found",
+                examples={
+                    "application/json": {
+                        "code": "O004_1",
+                        "status": 404,
+                        "message": "유튜브 업로드 내역이 없습니다."
+                    }
+                }
+            ),
+        }
+    )
+    def get(self, request, mv_id):
+        upload = (YoutubeUpload.objects
+                  .filter(music_video_id=mv_id, username=request.user.username)
+                  .order_by('-created_at').first())
+        if upload is None:
             response_data = {
-                "code": "O003_3",
-                "status": 500,
-                "message": f"뮤직비디오 업로드를 실패하였습니다. error: {str(e)}"
+                "code": "O004_1",
+                "status": 404,
+                "message": "유튜브 업로드 내역이 없습니다."
             }
-            return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response(response_data, status=status.HTTP_404_NOT_FOUND)
+
+        progress = 0
+        if upload.total_bytes:
+            progress = int(upload.bytes_uploaded * 100 / upload.total_bytes)
+
         response_data = {
-            "code": "O003_3",
-            "status": 500,
-            "message": f"뮤직비디오 업로드를 실패하였습니다."
+            "code": "O004",
+            "status": 200,
+            "message": "유튜브 업로드 상태 조회 성공",
+            "data": {
+                "upload_id": upload.id,
+                "status": upload.get_status_display(),
+                "bytes_uploaded": upload.bytes_uploaded,
+                "total_bytes": upload.total_bytes,
+                "progress": progress,
+                "video_url": f"https://www.youtube.com/watch?v={upload.video_id}" if upload.video_id else None,
+                "error_message": upload.error_message,
+            }
         }
-        return Response(response_data, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+        return Response(response_data, status=status.HTTP_200_OK)
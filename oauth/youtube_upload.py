@@ -0,0 +1,226 @@
+from io import BytesIO
+import json
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from google.auth.exceptions import TransportError
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseUpload, MediaUpload, build_http
+from redis.exceptions import LockError, RedisError
+
+from config.redis_client import get_redis
+from music_videos.s3_utils import get_object_range, get_object_size, get_s3_client, s3_key_from_url
+from .constants import (
+    YOUTUBE_UPLOAD_CHUNK_SIZE, YOUTUBE_UPLOAD_FAIL, YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_SUCCESS,
+    YOUTUBE_UPLOAD_UPLOADING,
+)
+from .google_clients import build_credentials, get_youtube_service
+from .models import YoutubeUpload
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_UPLOAD_LOCK_KEY = 'youtube:upload:{}'
+YOUTUBE_UPLOAD_CREDENTIALS_KEY = 'youtube:upload:{}:credentials'
+# 재시도와 멈춘 업로드 재개까지 끝날 만큼의 시간 (성공/실패하면 바로 지운다)
+YOUTUBE_UPLOAD_CREDENTIALS_TTL = 24 * 60 * 60
+# 청크 하나를 보내는 동안 잠금이 풀리지 않을 만큼의 시간 (청크마다 갱신)
+YOUTUBE_UPLOAD_LOCK_TIMEOUT = 10 * 60
+# 유튜브 API 자체 재시도 횟수 (5xx, 429 는 지수 백오프로 재시도된다)
+YOUTUBE_API_RETRIES = 3
+
+
+class RetryableUploadError(Exception):
+    pass
+
+
+class S3RangeMediaUpload(MediaUpload):
+    """
+    S3 객체를 통째로 내려받지 않고, 유튜브가 요청한 위치부터 청크 크기만큼만 Range 요청으로 읽는다.
+    """
+
+    def __init__(self, key, mimetype='video/*', chunksize=YOUTUBE_UPLOAD_CHUNK_SIZE):
+        self._s3 = get_s3_client()
+        self._key = key
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._size = get_object_size(self._s3, key)
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return True
+
+    def getbytes(self, begin, length):
+        length = min(length, self._size - begin)
+        if length <= 0:
+            return b''
+        return get_object_range(self._s3, self._key, begin, length)
+
+
+def store_credentials(upload_id, credentials):
+    # access/refresh token 만 업로드가 끝날 때까지 Redis 에 보관한다
+    get_redis().set(YOUTUBE_UPLOAD_CREDENTIALS_KEY.format(upload_id), json.dumps({
+        'token': credentials['token'],
+        'refresh_token': credentials.get('refresh_token'),
+        'scopes': credentials.get('scopes'),
+    }), ex=YOUTUBE_UPLOAD_CREDENTIALS_TTL)
+
+
+def _load_credentials(upload_id):
+    cached = get_redis().get(YOUTUBE_UPLOAD_CREDENTIALS_KEY.format(upload_id))
+    if cached is None:
+        return None
+    return build_credentials(**json.loads(cached))
+
+
+def _clear_credentials(upload_id):
+    try:
+        get_redis().delete(YOUTUBE_UPLOAD_CREDENTIALS_KEY.format(upload_id))
+    except RedisError as e:
+        logger.warning(f'failed to clear credentials of youtube upload {upload_id}: {str(e)}')
+
+
+def _update(upload, **fields):
+    fields['updated_at'] = timezone.now()
+    YoutubeUpload.objects.filter(pk=upload.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(upload, name, value)
+
+
+def _build_insert_request(youtube, upload, media_body):
+    body = {
+        'snippet': {
+            'title': upload.title,
+            'description': upload.description,
+            'tags': upload.tags,
+            'categoryId': '22'
+        },
+        'status': {
+            'privacyStatus': upload.privacy_status
+        }
+    }
+    return youtube.videos().insert(
+        part=','.join(body.keys()),
+        body=body,
+        media_body=media_body
+    )
+
+
+def _resume_insert_request(credentials, upload, insert_request):
+    """
+    저장된 세션에 받은 위치를 물어(Content-Range: bytes */size) 그 위치부터 이어서 보내도록 설정한다.
+    이미 업로드가 끝난 세션이면 영상 리소스를 돌려준다.
+    """
+    http = AuthorizedHttp(credentials, http=build_http())
+    resp, content = http.request(upload.upload_uri, 'PUT', headers={
+        'Content-Range': f'bytes */{insert_request.resumable.size()}',
+        'Content-Length': '0',
+    })
+    if resp.status in (200, 201):
+        return json.loads(content)
+    if resp.status != 308:
+        raise HttpError(resp, content, uri=upload.upload_uri)
+    # Range 헤더(bytes=0-N)가 없으면 아직 받은 바이트가 없다
+    received = resp.get('range')
+    insert_request.resumable_uri = upload.upload_uri
+    insert_request.resumable_progress = int(received.rsplit('-', 1)[1]) + 1 if received else 0
+    return None
+
+
+def _upload_thumbnail(youtube, upload):
+    s3_response = get_s3_client().get_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                                             Key=s3_key_from_url(upload.thumbnail))
+    youtube.thumbnails().set(
+        videoId=upload.video_id,
+        media_body=MediaIoBaseUpload(BytesIO(s3_response['Body'].read()), mimetype=s3_response['ContentType'])
+    ).execute(num_retries=YOUTUBE_API_RETRIES)
+
+
+def run_upload(upload_id):
+    """
+    S3 의 뮤직비디오를 유튜브 resumable upload 로 청크 단위 전송한다.
+    청크마다 session URI 와 진행 위치를 저장하므로 워커가 재시작되어도 이어서 올릴 수 있다.
+    일시적인 오류는 RetryableUploadError 로 알린다.
+    """
+    lock = get_redis().lock(YOUTUBE_UPLOAD_LOCK_KEY.format(upload_id), timeout=YOUTUBE_UPLOAD_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        # 같은 업로드를 다른 워커가 진행 중
+        return None
+    try:
+        upload = YoutubeUpload.objects.select_related('music_video').filter(id=upload_id).first()
+        if upload is None or upload.status not in (YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING):
+            return upload
+
+        try:
+            credentials = _load_credentials(upload_id)
+        except RedisError as e:
+            raise RetryableUploadError(str(e))
+        if credentials is None:
+            _update(upload, status=YOUTUBE_UPLOAD_FAIL, error_message='구글 계정 인증 정보가 만료되었습니다.')
+            return upload
+        youtube = get_youtube_service(credentials)
+        try:
+            media_body = S3RangeMediaUpload(s3_key_from_url(upload.music_video.mv_file))
+        except ValueError as e:
+            _update(upload, status=YOUTUBE_UPLOAD_FAIL, error_message=str(e))
+            _clear_credentials(upload_id)
+            return upload
+        _update(upload, status=YOUTUBE_UPLOAD_UPLOADING, total_bytes=media_body.size())
+
+        insert_request = _build_insert_request(youtube, upload, media_body)
+        response = None
+        try:
+            if upload.upload_uri:
+                response = _resume_insert_request(credentials, upload, insert_request)
+            while response is None:
+                _, response = insert_request.next_chunk(num_retries=YOUTUBE_API_RETRIES)
+                if response is None:
+                    _update(upload, upload_uri=insert_request.resumable_uri,
+                            bytes_uploaded=insert_request.resumable_progress)
+                    lock.reacquire()
+        except HttpError as e:
+            if e.resp.status in (404, 410) and upload.upload_uri:
+                # 업로드 세션이 만료되었으므로 처음부터 새 세션으로 다시 올린다
+                _update(upload, upload_uri=None, bytes_uploaded=0)
+                raise RetryableUploadError(f'upload session expired: {e.resp.status}')
+            if e.resp.status >= 500 or e.resp.status == 429:
+                raise RetryableUploadError(str(e))
+            _update(upload, status=YOUTUBE_UPLOAD_FAIL, error_message=str(e)[:1000])
+            _clear_credentials(upload_id)
+            return upload
+        except (IOError, TransportError) as e:
+            raise RetryableUploadError(str(e))
+
+        _update(upload, video_id=response['id'], bytes_uploaded=upload.total_bytes)
+
+        error_message = None
+        if upload.thumbnail:
+            try:
+                _upload_thumbnail(youtube, upload)
+            except HttpError as e:
+                error_message = f"뮤직비디오 업로드는 성공하였으나, 권한문제로 인하여 썸네일 업로드를 실패하였습니다. error: {e.resp.content.decode()}"[:1000]
+        _update(upload, status=YOUTUBE_UPLOAD_SUCCESS, error_message=error_message)
+        _clear_credentials(upload_id)
+        logger.info(f'uploaded music video {upload.music_video_id} to youtube as {upload.video_id}')
+        return upload
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            # 청크 전송이 잠금 시간보다 오래 걸려 잠금이 이미 풀린 경우 (원래 오류를 가리지 않는다)
+            logger.warning(f'youtube upload {upload_id} lock expired before release')
+
+
+def fail_upload(upload_id, message):
+    YoutubeUpload.objects.filter(id=upload_id, status__in=(YOUTUBE_UPLOAD_PENDING, YOUTUBE_UPLOAD_UPLOADING)).update(
+        status=YOUTUBE_UPLOAD_FAIL, error_message=message[:1000], updated_at=timezone.now())
+    _clear_credentials(upload_id)